@@ -0,0 +1,196 @@
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+import pandas as pd
+from storage import get_storage
+
+AGGREGATES_FILE = "aggregates.json"
+# Jeda minimum antar penulisan file agregat; file yang tertinggal (proses berhenti di
+# tengah jeda, atau pesanan ditulis proses lain) dihitung ulang saat dimuat karena
+# sidik tabel pesanan yang tersimpan tidak lagi cocok
+SAVE_INTERVAL = 5.0
+MEASURES = ["orders", "quantity", "price", "total_harga"]
+GROUPS = {"per_reseller": "email", "per_product": "product_name", "per_status": "status"}
+# Kolom pesanan yang dibutuhkan agregat (proyeksi kolom saat menghitung ulang)
+ORDER_COLUMNS = [*GROUPS.values(), *MEASURES[1:]]
+
+
+def _summarize(orders):
+    # Hitung total keseluruhan dan per grup dari DataFrame pesanan
+    orders = orders.assign(orders=1)
+    orders[MEASURES] = orders[MEASURES].apply(pd.to_numeric, errors="coerce").fillna(0)
+    result = {"total": {m: float(orders[m].sum()) for m in MEASURES}}
+    for name, column in GROUPS.items():
+        grouped = orders.groupby(column, observed=True)[MEASURES].sum()
+        result[name] = grouped.astype(float).to_dict("index")
+    return result
+
+
+def _add(target, source, sign=1):
+    for m in MEASURES:
+        target[m] = target.get(m, 0.0) + sign * source.get(m, 0.0)
+
+
+class SalesAggregates:
+    """Agregat pengeluaran/penjualan yang diperbarui inkremental dan disimpan ke JSON."""
+    def __init__(self, storage=None, path=None):
+        self._storage = storage
+        self._path = path
+        self._lock = threading.Lock()
+        self._data = None
+        self._dirty = False
+        self._last_save = 0.0
+        atexit.register(self.flush)
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    @property
+    def path(self):
+        if self._path:
+            return self._path
+        return os.path.join(getattr(self.storage, "data_dir", "."), AGGREGATES_FILE)
+
+    def _orders_version(self):
+        version = self.storage.version("orders")
+        return list(version) if version is not None else None
+
+    def _orders_fingerprint(self):
+        fingerprint = self.storage.fingerprint("orders")
+        return list(fingerprint) if fingerprint is not None else None
+
+    def _load(self):
+        # Di dalam proses agregat dicocokkan dengan versi tabel pesanan; file agregat
+        # dari proses sebelumnya dengan sidik tabel di disk. Jika tidak cocok, hitung ulang
+        version = self._orders_version()
+        if self._data is not None and self._data["version"] == version:
+            return self._data
+        if self._data is None and os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            if data.get("fingerprint", False) == self._orders_fingerprint():
+                data["version"] = self._orders_version()
+                self._data = data
+                return data
+        return self._rebuild(version)
+
+    def _rebuild(self, version):
+        try:
+            orders = self.storage.load_table("orders", ORDER_COLUMNS)
+        except FileNotFoundError:
+            orders = pd.DataFrame(columns=ORDER_COLUMNS)
+        self._data = {"version": version, **_summarize(orders)}
+        self._save()
+        return self._data
+
+    def _save(self):
+        # Sidik diambil sebelum versi dicek: jika versi masih sama dengan agregat, isi
+        # file pesanan saat sidik diambil sudah tercakup. Jika tidak, file disimpan
+        # tanpa sidik dan dihitung ulang saat dimuat proses berikutnya
+        fingerprint = self._orders_fingerprint()
+        if self._data["version"] == self._orders_version():
+            self._data["fingerprint"] = fingerprint
+        else:
+            self._data.pop("fingerprint", None)
+        with open(self.path + ".tmp", "w") as f:
+            json.dump(self._data, f)
+        os.replace(self.path + ".tmp", self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+    def flush(self):
+        # Simpan perubahan inkremental yang belum ditulis (dipanggil juga saat proses berhenti)
+        with self._lock:
+            if self._dirty and self._data is not None:
+                self._save()
+
+    def rebuild(self):
+        with self._lock:
+            return self._rebuild(self._orders_version())
+
+    def verify(self):
+        # Bandingkan agregat inkremental dengan hasil hitung ulang penuh
+        with self._lock:
+            current = self._load()
+            orders = self.storage.load_table("orders", ORDER_COLUMNS)
+            expected = _summarize(orders)
+            return all(_close(current[name], expected[name]) for name in expected)
+
+    def _apply(self, before, after, update):
+        # Terapkan delta hanya jika agregat sesuai versi sebelum penulisan;
+        # jika tidak, biarkan _load() menghitung ulang saat dibaca berikutnya
+        with self._lock:
+            data = self._load() if self._data is None else self._data
+            if data["version"] != (list(before) if before is not None else None):
+                return
+            update(data)
+            data["version"] = list(after) if after is not None else None
+            self._dirty = True
+            if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def record_orders(self, orders, before, after):
+        # Dipanggil setelah pesanan baru ditambahkan (before/after = versi tabel pesanan)
+        def update(data):
+            delta = _summarize(orders)
+            _add(data["total"], delta["total"])
+            for name in GROUPS:
+                for key, values in delta[name].items():
+                    _add(data[name].setdefault(key, {}), values)
+        self._apply(before, after, update)
+
+    def record_status_changes(self, orders, new_status, before, after):
+        # Dipanggil setelah sekumpulan pesanan (dengan status lamanya) pindah ke new_status
+        def update(data):
+            moved = _summarize(pd.DataFrame(orders))
+            for old_status, values in moved["per_status"].items():
+                _add(data["per_status"].setdefault(old_status, {}), values, -1)
+            _add(data["per_status"].setdefault(new_status, {}), moved["total"])
+        self._apply(before, after, update)
+
+    def total_expenditure(self):
+        with self._lock:
+            return self._load()["total"]["price"]
+
+    def summary(self, name):
+        # DataFrame agregat untuk per_reseller, per_product, atau per_status
+        with self._lock:
+            return pd.DataFrame.from_dict(self._load()[name], orient="index", columns=MEASURES)
+
+
+def _close(current, expected):
+    # Bandingkan dict bertingkat; grup yang hilang dianggap bernilai nol
+    keys = set(current) | set(expected)
+    if all(isinstance(v, float) for v in [*current.values(), *expected.values()]):
+        return all(abs(current.get(k, 0.0) - expected.get(k, 0.0)) < 1e-6 for k in keys)
+    return all(_close(current.get(k, {}), expected.get(k, {})) for k in keys)
+
+
+_aggregates = SalesAggregates()
+
+
+def get_aggregates():
+    return _aggregates
+
+
+def set_aggregates(aggregates):
+    # Mengganti agregat aktif, misalnya agregat terpisah untuk data benchmark
+    global _aggregates
+    _aggregates = aggregates
+    return aggregates
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        data = get_aggregates().rebuild()
+        print(f"Agregat dihitung ulang: total pengeluaran {data['total']['price']}")
+    elif sys.argv[1:] == ["verify"]:
+        ok = get_aggregates().verify()
+        print("Agregat konsisten." if ok else "Agregat TIDAK konsisten, jalankan: python aggregates.py rebuild")
+        sys.exit(0 if ok else 1)
+    else:
+        print("Penggunaan: python aggregates.py rebuild|verify")
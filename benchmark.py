@@ -0,0 +1,219 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from storage import CsvBackend, SqliteBackend, TABLE_FILES, migrate_csv_to_sqlite, set_storage, get_storage
+from stock_management import AdminStockManagement, ResellerStockManagement
+from bulk_onboarding import build_registration_chain
+from user_directory import get_user_directory
+from aggregates import SalesAggregates, get_aggregates, set_aggregates
+from data_cache import get_data_cache
+from event_log import get_projections
+from order_queue import get_order_queue
+from exports import export_file
+
+PASSWORD = "Passw0rd!"
+
+
+def generate_data(data_dir, rows, seed=0):
+    # Membuat data_stock.csv, resellers.csv, dan reseller_products.csv sintetis
+    rng = np.random.default_rng(seed)
+    items = pd.Series(np.arange(rows)).map("P{:07d}".format)
+    pd.DataFrame({
+        "Item": items,
+        "Quantity": rng.integers(1000, 100000, rows),
+        "Price": rng.integers(10, 1000, rows) * 1000,
+    }).to_csv(os.path.join(data_dir, TABLE_FILES["stock"]), index=False)
+
+    emails = pd.Series(np.arange(rows)).map("reseller{}@example.com".format)
+    pd.DataFrame({
+        "email": emails,
+        "password": PASSWORD,
+        "name": "Reseller",
+        "address": "Jl. Contoh No. 1",
+        "contact": "081234567890",
+        "status": "verified",
+        "role": "reseller",
+    }).to_csv(os.path.join(data_dir, TABLE_FILES["users"]), index=False)
+
+    quantity = rng.integers(1, 10, rows)
+    price = rng.integers(10, 1000, rows) * 1000.0
+    pd.DataFrame({
+        "order_id": np.arange(1, rows + 1),
+        "email": emails.sample(rows, replace=True, random_state=seed).values,
+        "product_name": items.sample(rows, replace=True, random_state=seed + 1).values,
+        "quantity": quantity,
+        "price": price,
+        "status": rng.choice(["delivered", "packed", "unpacked"], rows, p=[0.98, 0.01, 0.01]),
+        "total_harga": quantity * price,
+        "payment_id": None,
+        # Waktu pesanan tersebar sepanjang 2024
+        "created_at": (pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366 * 86400, rows), unit="s"))
+        .strftime("%Y-%m-%dT%H:%M:%S"),
+    }).to_csv(os.path.join(data_dir, TABLE_FILES["orders"]), index=False)
+
+
+def make_backend(name, data_dir):
+    if name == "sqlite":
+        db_path = os.path.join(data_dir, "harmon.db")
+        if not os.path.exists(db_path):
+            migrate_csv_to_sqlite(data_dir, db_path)
+        return SqliteBackend(db_path)
+    return CsvBackend(data_dir)
+
+
+def reset_caches():
+    # Mulai setiap backend dari kondisi cache dingin
+    get_data_cache().invalidate()
+    get_user_directory().invalidate()
+
+
+def measure(operation, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        operation(i)
+        timings.append((time.perf_counter() - start) * 1000)
+    return {
+        "first_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+        "repeat": repeat,
+    }
+
+
+def operations(rows):
+    admin = AdminStockManagement()
+    reseller = ResellerStockManagement()
+    chain = build_registration_chain()
+    directory = get_user_directory()
+    queue = get_order_queue()
+    target = "P{:07d}".format(rows // 2)
+    login_email = "reseller{}@example.com".format(rows // 2)
+
+    def login(i):
+        user = directory.get(login_email)
+        assert user is not None and user["password"] == PASSWORD
+
+    def register(i):
+        result = chain.handle({
+            "email": f"bench{i}@example.com", "password": PASSWORD, "confirm_password": PASSWORD,
+            "name": "Bench", "address": "Bench", "contact": "0800", "role": "reseller",
+        })
+        assert result == "Registrasi berhasil.", result
+
+    def dispatch_batch(i):
+        # Kemas hingga 100 pesanan sekaligus (satu penulisan tabel pesanan)
+        queue.transition_many([order["order_id"] for order in queue.page("unpacked", 1, 100)], "packed")
+
+    def export_orders(i):
+        # Ekspor seluruh riwayat transaksi per potongan; jumlah baris dipakai untuk rows_per_sec
+        export_orders.rows = export_file(os.devnull, "orders", "csv")
+
+    return [
+        ("add_stock", lambda i: admin.add_stock(f"BENCH{i}", 10, 1000)),
+        ("edit_stock", lambda i: admin.edit_stock(target, 5000 + i, 2000)),
+        # Produk yang dihapus berasal dari data sintetis (dari belakang), tidak bergantung pada add_stock
+        ("delete_stock", lambda i: admin.delete_stock("P{:07d}".format(rows - 1 - i))),
+        ("update_stock_after_payment", lambda i: admin.update_stock_after_payment(target, 1)),
+        ("checkout", lambda i: reseller.checkout(login_email, [
+            {"product_name": target, "price": 2000, "quantity": 1, "total_harga": 2000}
+        ])),
+        ("get_total_expenditure", lambda i: admin.get_total_expenditure()),
+        ("view_transactions", lambda i: admin.view_transactions()),
+        ("dispatch_batch", dispatch_batch),
+        ("export_orders_csv", export_orders),
+        ("registration_chain", register),
+        ("login_lookup", login),
+    ]
+
+
+def run(scales, backends, repeat, data_dir=None):
+    results = []
+    previous = get_storage() if data_dir is None else None
+    previous_aggregates = get_aggregates()
+    for rows in scales:
+        workdir = tempfile.mkdtemp(prefix=f"harmon-bench-{rows}-", dir=data_dir)
+        try:
+            generate_data(workdir, rows)
+            for backend_name in backends:
+                # Setiap backend memakai salinan data yang sama agar hasilnya sebanding
+                backend_dir = os.path.join(workdir, backend_name)
+                os.makedirs(backend_dir)
+                for filename in TABLE_FILES.values():
+                    if os.path.exists(os.path.join(workdir, filename)):
+                        shutil.copy(os.path.join(workdir, filename), backend_dir)
+                storage = set_storage(make_backend(backend_name, backend_dir))
+                # Agregat sendiri per backend: file agregat ditulis di direktori benchmark,
+                # tidak pernah ke direktori data aplikasi
+                set_aggregates(SalesAggregates(storage))
+                reset_caches()
+                # Impor data awal ke log event di luar pengukuran
+                get_projections().catch_up()
+                for name, operation in operations(rows):
+                    result = measure(operation, repeat)
+                    if hasattr(operation, "rows"):
+                        result["rows_per_sec"] = round(operation.rows / (result["median_ms"] / 1000))
+                    results.append({"backend": backend_name, "rows": rows, "operation": name, **result})
+                    rate = f" {result['rows_per_sec']:>12} baris/detik" if "rows_per_sec" in result else ""
+                    print(f"{backend_name:7} {rows:>10} {name:28} {result['median_ms']:>10.2f} ms{rate}")
+                # Simpan sekarang agar flush saat proses berhenti tidak menulis ke direktori yang sudah dihapus
+                get_aggregates().flush()
+        finally:
+            get_aggregates().flush()
+            shutil.rmtree(workdir, ignore_errors=True)
+    set_aggregates(previous_aggregates)
+    if previous is not None:
+        set_storage(previous)
+    return results
+
+
+def compare(results, baseline_path, threshold):
+    # Tandai operasi yang median-nya lebih lambat dari baseline melebihi ambang batas
+    with open(baseline_path) as f:
+        baseline = {
+            (r["backend"], r["rows"], r["operation"]): r["median_ms"] for r in json.load(f)["results"]
+        }
+    regressions = []
+    for r in results:
+        old = baseline.get((r["backend"], r["rows"], r["operation"]))
+        if old and r["median_ms"] > old * threshold:
+            regressions.append({**r, "baseline_ms": old, "ratio": round(r["median_ms"] / old, 2)})
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark operasi stok, pesanan, dan autentikasi")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", choices=["csv", "sqlite"], default=["csv", "sqlite"])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data-dir", help="Direktori untuk data sintetis (default: direktori temp)")
+    parser.add_argument("--output", help="Simpan hasil dalam format JSON ke file ini")
+    parser.add_argument("--baseline", help="File JSON hasil sebelumnya untuk dibandingkan")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Rasio perlambatan yang dianggap regresi")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": pd.Timestamp.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+        },
+        "results": run(args.scales, args.backends, args.repeat, args.data_dir),
+    }
+    if args.baseline:
+        report["regressions"] = compare(report["results"], args.baseline, args.threshold)
+        for r in report["regressions"]:
+            print(f"REGRESI {r['backend']} {r['rows']} {r['operation']}: {r['baseline_ms']} -> {r['median_ms']} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,69 @@
+import argparse
+import pandas as pd
+from handlers import (
+    EmailValidationHandler,
+    PasswordValidationHandler,
+    ConfirmPasswordHandler,
+    EmailExistsHandler,
+    SaveUserHandler,
+)
+
+CHUNK_SIZE = 10000
+
+
+def build_registration_chain():
+    # Chain of Responsibility yang sama dengan formulir registrasi
+    handler = EmailValidationHandler()
+    (
+        handler.set_next(PasswordValidationHandler())
+        .set_next(ConfirmPasswordHandler())
+        .set_next(EmailExistsHandler())
+        .set_next(SaveUserHandler())
+    )
+    return handler
+
+
+def onboard_from_csv(source, role="reseller", status="unverified", chunksize=CHUNK_SIZE):
+    """Registrasi massal dari CSV (path atau file upload), diproses per chunk.
+
+    Jika kolom confirm_password tidak ada, password dianggap sudah dikonfirmasi.
+    Mengembalikan (jumlah_berhasil, laporan_error) dengan laporan berisi kolom
+    row (nomor baris data, mulai dari 1), email, dan error.
+    """
+    chain = build_registration_chain()
+    saved = 0
+    reports = []
+    for batch in pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunksize):
+        batch.columns = batch.columns.str.strip()
+        batch = batch.apply(lambda column: column.str.strip())
+        if "confirm_password" not in batch:
+            batch["confirm_password"] = batch.get("password", "")
+        if "role" not in batch:
+            batch["role"] = role
+        if "status" not in batch:
+            batch["status"] = status
+        errors = chain.handle_batch(batch, pd.Series(None, index=batch.index, dtype=object))
+        failed = errors.notna()
+        saved += int((~failed).sum())
+        reports.append(pd.DataFrame({
+            "row": batch.index[failed] + 1,
+            "email": batch.loc[failed, "email"] if "email" in batch else "",
+            "error": errors[failed],
+        }))
+    report = pd.concat(reports, ignore_index=True) if reports else pd.DataFrame(columns=["row", "email", "error"])
+    return saved, report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Registrasi massal reseller dari file CSV")
+    parser.add_argument("input", help="File CSV dengan kolom email, password, name, address, contact")
+    parser.add_argument("--report", help="Simpan laporan error ke file CSV")
+    parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    saved, report = onboard_from_csv(args.input, chunksize=args.chunksize)
+    print(f"{saved} reseller berhasil diregistrasi, {len(report)} baris gagal.")
+    if args.report:
+        report.to_csv(args.report, index=False)
+    elif not report.empty:
+        print(report.to_string(index=False))
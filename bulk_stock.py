@@ -0,0 +1,177 @@
+import argparse
+import numpy as np
+import pandas as pd
+from storage import ROW_VERSION, ConflictError, get_storage
+from event_log import get_event_log
+
+STOCK_FIELDS = ["Quantity", "Price"]
+ACTIONS = {"insert": "tambah", "update": "ubah", "delete": "hapus"}
+
+
+class StockDiff:
+    """Selisih antara stok tersimpan dan stok yang diinginkan (hasil edit atau file).
+
+    inserts: Item, Quantity, Price; updates: Item, Quantity, Price, nilai lama, dan
+    row_version saat diff dihitung; deletes: Item, Quantity, Price, row_version;
+    errors: baris yang ditolak validasi (row, Item, error). Diff hanya bisa diterapkan
+    jika errors kosong.
+    """
+    def __init__(self, inserts, updates, deletes, errors):
+        self.inserts = inserts
+        self.updates = updates
+        self.deletes = deletes
+        self.errors = errors
+
+    @property
+    def empty(self):
+        return self.inserts.empty and self.updates.empty and self.deletes.empty
+
+    def summary(self):
+        return {"tambah": len(self.inserts), "ubah": len(self.updates), "hapus": len(self.deletes), "error": len(self.errors)}
+
+    def preview(self):
+        # Satu tabel untuk ditampilkan sebelum diterapkan: aksi, Item, nilai lama -> baru
+        frames = [
+            self.inserts.assign(aksi=ACTIONS["insert"]),
+            self.updates.assign(aksi=ACTIONS["update"]),
+            self.deletes.rename(columns={f: f"{f}_lama" for f in STOCK_FIELDS}).assign(aksi=ACTIONS["delete"]),
+        ]
+        columns = ["aksi", "Item", "Quantity_lama", "Quantity", "Price_lama", "Price"]
+        preview = pd.concat([f.reindex(columns=columns) for f in frames], ignore_index=True)
+        return preview.astype({c: "Int64" for c in columns[2:]})
+
+
+def read_stock_sheet(source):
+    # Lembar harga/stok (path atau file upload): kolom Item wajib, Quantity/Price opsional
+    sheet = pd.read_csv(source, dtype={"Item": str}, keep_default_na=False, na_values={"Quantity": [""], "Price": [""]})
+    sheet.columns = sheet.columns.str.strip()
+    if "Item" not in sheet:
+        raise ValueError("File stok harus memiliki kolom Item.")
+    sheet["Item"] = sheet["Item"].str.strip()
+    return sheet
+
+
+def _invalid(sheet, reason, mask):
+    return pd.DataFrame({"row": sheet.index[mask] + 1, "Item": sheet.loc[mask, "Item"], "error": reason})
+
+
+def diff_stock(current, desired, delete_missing=False):
+    """Hitung diff stok secara vektor.
+
+    desired: DataFrame dengan kolom Item dan (sebagian) Quantity/Price; kolom yang tidak
+    ada berarti nilainya tidak diubah. delete_missing=True: produk yang tidak ada di
+    desired dihapus (misalnya hasil edit seluruh tabel).
+    """
+    current = current.astype({"Item": object}).drop_duplicates("Item")
+    desired = desired.reset_index(drop=True).copy()
+    desired["Item"] = desired["Item"].astype(object).where(desired["Item"].notna(), "").astype(str).str.strip()
+    fields = [f for f in STOCK_FIELDS if f in desired]
+    for field in fields:
+        desired[field] = pd.to_numeric(desired[field], errors="coerce")
+
+    # Validasi per baris; baris yang gagal dilaporkan dan tidak ikut diff
+    checks = [("Nama produk kosong", desired["Item"] == ""),
+              ("Nama produk duplikat di file", desired["Item"].duplicated(keep=False) & (desired["Item"] != ""))]
+    for field, minimum in [("Quantity", 0), ("Price", 1)]:
+        if field in fields:
+            value = desired[field]
+            bad = value.notna() & ((value < minimum) | (value != value.round()))
+            checks.append((f"{field} harus bilangan bulat >= {minimum}", bad))
+    exists = desired["Item"].isin(current["Item"])
+    for field in STOCK_FIELDS:
+        missing = desired[field].isna() if field in fields else pd.Series(True, index=desired.index)
+        checks.append((f"{field} wajib diisi untuk produk baru", ~exists & missing))
+        if field in fields:
+            checks.append((f"{field} bukan angka", exists & missing))
+    failed = np.zeros(len(desired), dtype=bool)
+    errors = []
+    for reason, mask in checks:
+        mask = mask.to_numpy(dtype=bool) & ~failed
+        if mask.any():
+            errors.append(_invalid(desired, reason, mask))
+            failed |= mask
+    errors = (pd.concat(errors).sort_values("row", kind="stable").reset_index(drop=True) if errors
+              else pd.DataFrame(columns=["row", "Item", "error"]))
+
+    valid = desired[~failed]
+    old = current[["Item", *STOCK_FIELDS, ROW_VERSION]].rename(columns={f: f"{f}_lama" for f in STOCK_FIELDS})
+    merged = old.merge(valid[["Item", *fields]], on="Item", how="outer", indicator=True)
+    for field in STOCK_FIELDS:
+        if field not in fields:
+            merged[field] = merged[f"{field}_lama"]
+        else:
+            merged[field] = merged[field].fillna(merged[f"{field}_lama"])
+    both = merged["_merge"] == "both"
+    changed = both & np.logical_or.reduce([merged[f] != merged[f"{f}_lama"] for f in STOCK_FIELDS])
+    right_only = merged["_merge"] == "right_only"
+    # Produk yang tidak ada di file hanya dihapus jika diminta, dan bukan karena barisnya gagal validasi
+    left_only = (merged["_merge"] == "left_only") & delete_missing & ~merged["Item"].isin(desired["Item"][failed])
+
+    integer = {f: "int64" for f in STOCK_FIELDS}
+    inserts = merged.loc[right_only, ["Item", *STOCK_FIELDS]].astype(integer).reset_index(drop=True)
+    updates = merged.loc[changed, ["Item", "Quantity_lama", "Quantity", "Price_lama", "Price", ROW_VERSION]]
+    updates = updates.astype({**integer, "Quantity_lama": "int64", "Price_lama": "int64", ROW_VERSION: "int64"})
+    deletes = merged.loc[left_only, ["Item", "Quantity_lama", "Price_lama", ROW_VERSION]].rename(
+        columns={f"{f}_lama": f for f in STOCK_FIELDS})
+    return StockDiff(inserts, updates.reset_index(drop=True), deletes.reset_index(drop=True), errors)
+
+
+def apply_stock_diff(diff, storage=None):
+    """Terapkan diff dalam satu transaksi: satu kali tulis tabel stok dan satu batch event.
+
+    ConflictError jika produk yang diubah/dihapus sudah diubah sesi lain sejak diff
+    dihitung, atau produk baru sudah ditambahkan sesi lain. Mengembalikan pesan ringkas.
+    """
+    if not diff.errors.empty:
+        raise ValueError(f"{len(diff.errors)} baris gagal validasi; perbaiki dulu sebelum diterapkan.")
+    if diff.empty:
+        return "Tidak ada perubahan stok."
+    storage = storage or get_storage()
+    events = get_event_log(storage)
+    with events.recording():
+        with storage.transaction():
+            stock = storage.load_table("stock").astype({"Item": object})
+            versions = stock.drop_duplicates("Item").set_index("Item")[ROW_VERSION]
+            for frame in (diff.updates, diff.deletes):
+                seen = frame.set_index("Item")[ROW_VERSION]
+                actual = versions.reindex(seen.index)
+                stale = actual.isna() | (actual != seen)
+                if stale.any():
+                    item = stale.index[stale][0]
+                    raise ConflictError("stock", item, int(seen[item]), 0 if pd.isna(actual[item]) else int(actual[item]))
+            taken = diff.inserts["Item"][diff.inserts["Item"].isin(versions.index)]
+            if not taken.empty:
+                raise ConflictError("stock", taken.iloc[0], 0, int(versions[taken.iloc[0]]))
+
+            stock = stock[~stock["Item"].isin(diff.deletes["Item"])].copy()
+            updates = diff.updates.set_index("Item")
+            mask = stock["Item"].isin(updates.index)
+            for field in STOCK_FIELDS:
+                stock.loc[mask, field] = stock.loc[mask, "Item"].map(updates[field])
+            stock.loc[mask, ROW_VERSION] += 1
+            stock = pd.concat([stock, diff.inserts.assign(**{ROW_VERSION: 1})], ignore_index=True)
+            storage.save_table("stock", stock)
+        events.append(
+            [("stock_added", {"item": r.Item, "quantity": int(r.Quantity), "price": int(r.Price)}) for r in diff.inserts.itertuples()]
+            + [("stock_updated", {"item": r.Item, "quantity": int(r.Quantity), "price": int(r.Price)}) for r in diff.updates.itertuples()]
+            + [("stock_removed", {"item": item}) for item in diff.deletes["Item"]]
+        )
+    summary = diff.summary()
+    return f"Stok diperbarui: {summary['tambah']} ditambah, {summary['ubah']} diubah, {summary['hapus']} dihapus."
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perbarui stok massal dari file CSV (Item, Quantity, Price)")
+    parser.add_argument("input", help="File CSV dengan kolom Item dan Quantity/Price")
+    parser.add_argument("--delete-missing", action="store_true", help="Hapus produk yang tidak ada di file")
+    parser.add_argument("--apply", action="store_true", help="Terapkan perubahan (tanpa ini hanya pratinjau)")
+    args = parser.parse_args()
+
+    diff = diff_stock(get_storage().load_table("stock"), read_stock_sheet(args.input), args.delete_missing)
+    print(diff.summary())
+    if not diff.errors.empty:
+        print(diff.errors.to_string(index=False))
+    elif args.apply:
+        print(apply_stock_diff(diff))
+    elif not diff.empty:
+        print(diff.preview().to_string(index=False))
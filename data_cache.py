@@ -0,0 +1,60 @@
+import threading
+from storage import get_storage, query_frame
+from instrumentation import get_metrics
+
+
+class DataCache:
+    """Cache DataFrame tingkat proses yang dipakai bersama oleh semua sesi Streamlit.
+
+    Setiap tabel disimpan bersama versinya (mtime/ukuran file CSV atau penghitung
+    SQLite); tabel hanya dibaca ulang jika versinya berubah setelah ada penulisan.
+    DataFrame yang dikembalikan dipakai bersama, jadi jangan diubah langsung.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._stats = {}
+
+    def _count(self, table, outcome):
+        stats = self._stats.setdefault(table, {"hits": 0, "misses": 0})
+        stats[outcome] += 1
+        get_metrics().record(f"cache.{outcome}", table)
+
+    def load_table(self, table, storage=None):
+        storage = storage or get_storage()
+        key = (id(storage), table)
+        version = storage.version(table)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and version is not None:
+                self._count(table, "hits")
+                return entry[1]
+            self._count(table, "misses")
+            data = storage.load_table(table)
+            self._entries[key] = (version, data)
+            return data
+
+    def query(self, table, storage=None, **criteria):
+        # Satu halaman tabel (lihat storage.query_frame): SQLite menjalankan query-nya
+        # sendiri, backend lain memfilter DataFrame di cache tanpa membaca ulang file
+        storage = storage or get_storage()
+        if storage.native_query:
+            return storage.query(table, **criteria)
+        return query_frame(self.load_table(table, storage), **criteria)
+
+    def invalidate(self, table=None):
+        with self._lock:
+            for key in list(self._entries):
+                if table is None or key[1] == table:
+                    del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {table: dict(values) for table, values in self._stats.items()}
+
+
+_cache = DataCache()
+
+
+def get_data_cache():
+    return _cache
@@ -0,0 +1,748 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from contextlib import contextmanager
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from storage import ROW_VERSION, TABLE_COLUMNS, get_storage
+from instrumentation import get_metrics
+
+try:
+    import fcntl
+except ImportError:  # fcntl tidak ada di Windows: log hanya dikunci antar thread dalam satu proses
+    fcntl = None
+
+EVENTS_FILE = "events.jsonl"
+CHECKPOINT_DIR = "projections"
+# Checkpoint proyeksi ditulis setiap sekian event yang diterapkan (dan saat proses berhenti)
+CHECKPOINT_EVERY = 1000
+
+# Status pesanan yang masih antre dan event yang memindahkan pesanan ke status berikutnya
+QUEUE_STATUSES = ("unpacked", "packed")
+STATUS_EVENTS = {"packed": "order_packed", "delivered": "order_delivered"}
+EVENT_STATUSES = {event_type: status for status, event_type in STATUS_EVENTS.items()}
+
+# Kubus rollup: fakta (pesanan reseller, penjualan yang dilaporkan) x satuan waktu x produk x reseller
+ROLLUP_FACTS = ("orders", "sales")
+ROLLUP_GRAINS = ("day", "week", "month")
+ROLLUP_MEASURES = ["count", "quantity", "amount"]
+# Nilai dimensi untuk "semua produk" / "semua reseller" (sel marginal kubus)
+ANY = "*"
+
+
+def _plain(value):
+    # Tipe NumPy/pandas -> tipe Python agar bisa ditulis sebagai JSON
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Tipe {type(value).__name__} tidak bisa disimpan di log event")
+
+
+def records(df):
+    # DataFrame -> list dict dengan NaN diganti None, untuk data event
+    df = df.astype(object)
+    return df.where(df.notna(), None).to_dict("records")
+
+
+def _lock_file(f, shared=False):
+    # Kunci advisory antar proses; dilepas saat file ditutup
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+
+
+def order_fields(order):
+    # Data pesanan yang disertakan di event perubahan status (event berdiri sendiri)
+    return {column: order.get(column) for column in ["order_id", "email", "product_name", "quantity", "price"]}
+
+
+class EventLog:
+    """Log event append-only (JSON Lines) untuk siklus hidup pesanan, stok, dan penjualan.
+
+    Setiap baris adalah satu event dengan nomor urut (seq); event tidak pernah diubah
+    atau dihapus. Posisi byte setelah sebuah event dipakai proyeksi sebagai checkpoint.
+    Penulisan dikunci antar thread dan antar proses. Perubahan tabel dan event-nya
+    ditulis di dalam recording(), sehingga reconcile() tidak pernah melihat tabel yang
+    sudah berubah sementara event-nya masih akan ditulis.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._seq = None
+        self._size = None
+        self._fence = threading.Condition()
+        self._writers = 0
+        self._exclusive = False
+        self._local = threading.local()
+
+    @contextmanager
+    def recording(self):
+        # Dipegang penulis dari perubahan tabel sampai event-nya ditulis (boleh bersarang);
+        # banyak penulis boleh berjalan bersamaan, exclusive() menunggu semuanya selesai
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            with self._fence:
+                self._fence.wait_for(lambda: not self._exclusive)
+                self._writers += 1
+            try:
+                self._local.fence = open(self.path + ".lock", "a")
+                _lock_file(self._local.fence, shared=True)
+            except BaseException:
+                self._leave()
+                raise
+        self._local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                self._local.fence.close()
+                self._leave()
+
+    def _leave(self):
+        with self._fence:
+            self._writers -= 1
+            self._fence.notify_all()
+
+    @contextmanager
+    def exclusive(self):
+        # Tahan semua penulis (di semua proses) selama tabel dibandingkan dengan log
+        with self._fence:
+            self._fence.wait_for(lambda: not self._exclusive)
+            self._exclusive = True
+            self._fence.wait_for(lambda: self._writers == 0)
+        try:
+            with open(self.path + ".lock", "a") as f:
+                _lock_file(f)
+                yield self
+        finally:
+            with self._fence:
+                self._exclusive = False
+                self._fence.notify_all()
+
+    def size(self):
+        try:
+            return os.path.getsize(self.path)
+        except FileNotFoundError:
+            return 0
+
+    def _recover(self):
+        # Baca seq terakhir dari ujung file; baris terakhir yang terpotong (penulisan
+        # terputus) dibuang agar event berikutnya dimulai di baris baru
+        self._seq, self._size = 0, 0
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            block = 1 << 16
+            while True:
+                start = max(0, end - block)
+                f.seek(start)
+                tail = f.read()
+                complete = tail[:tail.rfind(b"\n") + 1]
+                lines = complete.splitlines()
+                if len(lines) > 1 or start == 0:
+                    break
+                block *= 2
+            if start + len(complete) < end:
+                f.truncate(start + len(complete))
+            if lines:
+                self._seq = json.loads(lines[-1])["seq"]
+            self._size = f.seek(0, os.SEEK_END)
+
+    def append(self, events):
+        # events: list (tipe, data); mengembalikan event yang ditulis lengkap dengan seq
+        if not events:
+            return []
+        start = time.perf_counter()
+        with self._lock, open(self.path, "ab") as f:
+            _lock_file(f)
+            if self._seq is None or os.fstat(f.fileno()).st_size != self._size:
+                # Pertama kali, atau proses lain menambahkan event sejak penulisan terakhir
+                self._recover()
+            timestamp = pd.Timestamp.now().isoformat(timespec="seconds")
+            written = []
+            for event_type, data in events:
+                self._seq += 1
+                written.append({"seq": self._seq, "type": event_type, "timestamp": timestamp, "data": data})
+            payload = "".join(json.dumps(event, default=_plain) + "\n" for event in written).encode("utf-8")
+            f.write(payload)
+            f.flush()
+            self._size = os.fstat(f.fileno()).st_size
+        get_metrics().record("events.append", rows=len(written), nbytes=len(payload),
+                             seconds=time.perf_counter() - start)
+        return written
+
+    def read(self, offset=0):
+        # Iterasi (offset sesudah event, event) mulai dari posisi byte tertentu;
+        # baris terakhir yang belum lengkap diabaikan
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    return
+                offset += len(line)
+                yield offset, json.loads(line)
+
+    def history(self, order_id):
+        # Semua event yang menyentuh satu pesanan, urut dari yang paling lama
+        order_id = int(order_id)
+        history = []
+        for _, event in self.read():
+            data = event["data"]
+            orders = data.get("orders", [data])
+            if any(order.get("order_id") == order_id for order in orders):
+                history.append(event)
+        return history
+
+    def import_tables(self, storage):
+        # Dipanggil sekali saat log belum ada: isi tabel saat ini menjadi event awal
+        events = []
+        for table, convert in [
+            ("stock", lambda df: [("stock_added", {"item": r["Item"], "quantity": r["Quantity"], "price": r["Price"]})
+                                  for r in records(df)]),
+            ("orders", lambda df: [("order_imported", r) for r in records(df.reindex(columns=TABLE_COLUMNS["orders"]))]),
+            ("sales", lambda df: [("sales_reported", {"email": email, "items": records(
+                group.reindex(columns=["product_name", "quantity", "price", "timestamp"]))})
+                                  for email, group in df.groupby("email", sort=False)]),
+        ]:
+            try:
+                events.extend(convert(storage.load_table(table)))
+            except FileNotFoundError:
+                pass
+        open(self.path, "ab").close()
+        self.append(events)
+
+
+class Projection(ABC):
+    """Abstract Base Class untuk proyeksi yang dibangun inkremental dari log event."""
+    name = None
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.seq = 0
+        self.state = self.initial()
+
+    @abstractmethod
+    def initial(self):
+        pass
+
+    @abstractmethod
+    def apply(self, event):
+        pass
+
+    def dump(self):
+        return self.state
+
+    def restore(self, state):
+        self.state = state
+
+
+class StockProjection(Projection):
+    """Stok per produk: item -> {"quantity", "price"}."""
+    name = "stock"
+
+    def initial(self):
+        return {}
+
+    def apply(self, event):
+        data, stock = event["data"], self.state
+        if event["type"] == "stock_added":
+            item = stock.setdefault(data["item"], {"quantity": 0, "price": data["price"]})
+            item["quantity"] += data["quantity"]
+            item["price"] = data["price"]
+        elif event["type"] == "stock_updated":
+            stock[data["item"]] = {"quantity": data["quantity"], "price": data["price"]}
+        elif event["type"] == "stock_removed":
+            stock.pop(data["item"], None)
+        elif event["type"] == "stock_decremented":
+            for product_name, quantity in data["items"].items():
+                if product_name in stock:
+                    stock[product_name]["quantity"] -= quantity
+        elif event["type"] == "order_placed":
+            for order in data["orders"]:
+                if order["product_name"] in stock:
+                    stock[order["product_name"]]["quantity"] -= order["quantity"]
+
+    def frame(self):
+        rows = [{"Item": item, "Quantity": v["quantity"], "Price": v["price"]} for item, v in self.state.items()]
+        return pd.DataFrame(rows, columns=["Item", "Quantity", "Price"])
+
+
+class InventoryProjection(Projection):
+    """Inventaris reseller: email -> produk -> {"delivered", "sold", "price"}."""
+    name = "inventory"
+
+    def initial(self):
+        return {}
+
+    def _item(self, email, product_name):
+        products = self.state.setdefault(email, {})
+        return products.setdefault(product_name, {"delivered": 0, "sold": 0, "price": 0.0})
+
+    def apply(self, event):
+        data = event["data"]
+        if event["type"] == "order_delivered" or (event["type"] == "order_imported" and data["status"] == "delivered"):
+            item = self._item(data["email"], data["product_name"])
+            item["delivered"] += int(data["quantity"])
+            item["price"] = float(data["price"])
+        elif event["type"] == "sales_reported":
+            for sale in data["items"]:
+                self._item(data["email"], sale["product_name"])["sold"] += int(sale["quantity"])
+
+    def items(self, email):
+        # Salinan inventaris satu reseller
+        return {product: dict(item) for product, item in self.state.get(email, {}).items()}
+
+
+class QueueProjection(Projection):
+    """Antrian pesanan yang belum terkirim: baris pesanan per ID dan urutan per status."""
+    name = "queues"
+
+    def initial(self):
+        # status -> {order_id: baris}, dict dipakai sebagai ordered set
+        return {status: {} for status in QUEUE_STATUSES}
+
+    def _add(self, order):
+        if order["status"] in self.state:
+            self.state[order["status"]][int(order["order_id"])] = order
+
+    def apply(self, event):
+        data = event["data"]
+        if event["type"] == "order_imported":
+            self._add(dict(data))
+        elif event["type"] == "order_placed":
+            for order in data["orders"]:
+                order = {column: order.get(column) for column in TABLE_COLUMNS["orders"]}
+                self._add({**order, "status": "unpacked", ROW_VERSION: 1})
+        elif event["type"] == "order_synced":
+            # Koreksi dari reconcile(): baris antrian mengikuti tabel (status None = tidak ada lagi)
+            for orders in self.state.values():
+                orders.pop(int(data["order_id"]), None)
+            self._add(dict(data))
+        elif event["type"] in EVENT_STATUSES:
+            status = EVENT_STATUSES[event["type"]]
+            for orders in self.state.values():
+                order = orders.pop(int(data["order_id"]), None)
+                if order is not None:
+                    self._add({**order, "status": status, ROW_VERSION: order[ROW_VERSION] + 1})
+                    break
+
+    def find(self, order_id):
+        for orders in self.state.values():
+            if order_id in orders:
+                return orders[order_id]
+        return None
+
+    def dump(self):
+        return {status: list(orders.values()) for status, orders in self.state.items()}
+
+    def restore(self, state):
+        self.state = self.initial()
+        for orders in state.values():
+            for order in orders:
+                self._add(order)
+
+
+@functools.lru_cache(maxsize=4096)
+def bucket_of(grain, day):
+    # day: "YYYY-MM-DD" -> label bucket (hari, Senin awal minggu, atau "YYYY-MM")
+    if grain == "day":
+        return day
+    if grain == "month":
+        return day[:7]
+    start = date.fromisoformat(day)
+    return (start - timedelta(days=start.weekday())).isoformat()
+
+
+def buckets_between(grain, start, end):
+    # Semua label bucket dari tanggal start sampai end (inklusif), termasuk yang kosong
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    if grain == "month":
+        return [period.strftime("%Y-%m") for period in pd.period_range(start, end, freq="M")]
+    if grain == "week":
+        start -= pd.Timedelta(days=start.weekday())
+    return [day.date().isoformat() for day in pd.date_range(start, end, freq="W-MON" if grain == "week" else "D")]
+
+
+class RollupProjection(Projection):
+    """Rollup pesanan dan penjualan per hari/minggu/bulan x produk x reseller.
+
+    Setiap catatan menambah sel (produk, reseller), (produk, *), (*, reseller), dan
+    (*, *) pada bucket hari, minggu, dan bulannya, sehingga grafik cukup membaca satu
+    sel per bucket berapa pun panjang riwayatnya. Sel berisi [count, quantity, amount];
+    pesanan lama tanpa created_at tidak masuk rollup.
+    """
+    name = "rollups"
+
+    def initial(self):
+        # fakta -> satuan waktu -> bucket -> "produk\treseller" -> [count, quantity, amount]
+        return {fact: {grain: {} for grain in ROLLUP_GRAINS} for fact in ROLLUP_FACTS}
+
+    def _add(self, fact, when, product_name, email, quantity, amount):
+        if not when:
+            return
+        day = str(when)[:10]
+        cells = [f"{product_name}\t{email}", f"{product_name}\t{ANY}", f"{ANY}\t{email}", f"{ANY}\t{ANY}"]
+        for grain in ROLLUP_GRAINS:
+            bucket = self.state[fact][grain].setdefault(bucket_of(grain, day), {})
+            for cell in cells:
+                values = bucket.setdefault(cell, [0, 0, 0.0])
+                values[0] += 1
+                values[1] += quantity
+                values[2] += amount
+
+    def _add_order(self, order, when):
+        self._add("orders", when, order["product_name"], order["email"],
+                  int(order["quantity"] or 0), float(order["total_harga"] or 0))
+
+    def apply(self, event):
+        data = event["data"]
+        if event["type"] == "order_placed":
+            # Event lama tanpa created_at ditulis saat checkout: waktu event dipakai
+            for order in data["orders"]:
+                self._add_order(order, order.get("created_at", event["timestamp"]))
+        elif event["type"] == "order_imported":
+            self._add_order(data, data.get("created_at"))
+        elif event["type"] == "sales_reported":
+            for sale in data["items"]:
+                quantity = int(sale["quantity"] or 0)
+                self._add("sales", sale.get("timestamp", data.get("timestamp", event["timestamp"])),
+                          sale["product_name"], data["email"], quantity, quantity * float(sale["price"] or 0))
+
+    def series(self, fact, grain, start, end, product_name=None, email=None):
+        # Satu baris per bucket dalam rentang (bucket kosong bernilai nol)
+        cube = self.state[fact][grain]
+        cell = f"{product_name or ANY}\t{email or ANY}"
+        buckets = buckets_between(grain, start, end)
+        rows = [cube.get(bucket, {}).get(cell, [0, 0, 0.0]) for bucket in buckets]
+        return pd.DataFrame(rows, columns=ROLLUP_MEASURES, index=pd.Index(buckets, name="bucket"))
+
+    def breakdown(self, fact, grain, start, end, by="product_name", product_name=None, email=None):
+        # Total per produk (by="product_name") atau per reseller (by="email") dalam rentang
+        cube = self.state[fact][grain]
+        totals = {}
+        for bucket in buckets_between(grain, start, end):
+            for cell, values in cube.get(bucket, {}).items():
+                product, reseller = cell.split("\t")
+                if by == "product_name":
+                    key, match = product, product != ANY and reseller == (email or ANY)
+                else:
+                    key, match = reseller, reseller != ANY and product == (product_name or ANY)
+                if match:
+                    total = totals.setdefault(key, [0, 0, 0.0])
+                    for i, value in enumerate(values):
+                        total[i] += value
+        frame = pd.DataFrame.from_dict(totals, orient="index", columns=ROLLUP_MEASURES)
+        return frame.rename_axis(by).sort_values("amount", ascending=False)
+
+
+class Projections:
+    """Proyeksi stok, inventaris reseller, antrian pesanan, dan rollup dari satu log event.
+
+    Setiap proyeksi menyimpan checkpoint (state + posisi byte di log) di direktori
+    projections/; setelah restart hanya event sesudah checkpoint yang diputar ulang.
+    """
+    def __init__(self, log, checkpoint_dir):
+        self.log = log
+        self.checkpoint_dir = checkpoint_dir
+        self.stock = StockProjection()
+        self.inventory = InventoryProjection()
+        self.queues = QueueProjection()
+        self.rollups = RollupProjection()
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._since_checkpoint = 0
+        atexit.register(self.checkpoint)
+
+    def all(self):
+        return [self.stock, self.inventory, self.queues, self.rollups]
+
+    def _path(self, projection):
+        return os.path.join(self.checkpoint_dir, f"{projection.name}.json")
+
+    def _load_checkpoints(self):
+        size = self.log.size()
+        for projection in self.all():
+            try:
+                with open(self._path(projection)) as f:
+                    data = json.load(f)
+            except (FileNotFoundError, ValueError):
+                continue
+            # Checkpoint melewati ujung log (log diganti): putar ulang dari awal
+            if data["offset"] <= size:
+                projection.offset, projection.seq = data["offset"], data["seq"]
+                projection.restore(data["state"])
+        self._loaded = True
+
+    def _catch_up(self):
+        if not self._loaded:
+            self._load_checkpoints()
+        begin = min(projection.offset for projection in self.all())
+        if begin == self.log.size():
+            return 0
+        start = time.perf_counter()
+        applied = 0
+        for offset, event in self.log.read(begin):
+            for projection in self.all():
+                if projection.offset < offset:
+                    projection.apply(event)
+                    projection.offset, projection.seq = offset, event["seq"]
+            applied += 1
+        self._since_checkpoint += applied
+        if self._since_checkpoint >= CHECKPOINT_EVERY:
+            self._save()
+        get_metrics().record("projections.catch_up", rows=applied, seconds=time.perf_counter() - start)
+        return applied
+
+    def catch_up(self):
+        # Terapkan event baru sejak checkpoint/pembacaan terakhir; mengembalikan jumlah event
+        with self._lock:
+            return self._catch_up()
+
+    @contextmanager
+    def current(self):
+        # Proyeksi yang sudah mengejar ujung log, dikunci selama dibaca
+        with self._lock:
+            self._catch_up()
+            yield self
+
+    def _save(self):
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        for projection in self.all():
+            path = self._path(projection)
+            # json.dumps memakai encoder C; json.dump ke file jauh lebih lambat untuk state besar (kubus rollup)
+            data = json.dumps({"offset": projection.offset, "seq": projection.seq, "state": projection.dump()},
+                              default=_plain)
+            with open(path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        self._since_checkpoint = 0
+
+    def checkpoint(self):
+        with self._lock:
+            if self._loaded:
+                self._save()
+
+    def rebuild(self, storage=None):
+        # Buang checkpoint lalu putar ulang seluruh log dari awal; dengan storage, event
+        # yang hilang dilengkapi dari tabel (reconcile). Mengembalikan jumlah event koreksi
+        with self._lock:
+            for projection in self.all():
+                projection.reset()
+            self._loaded = True
+            self._catch_up()
+        corrections = reconcile(self, storage) if storage is not None else 0
+        with self._lock:
+            self._save()
+        return corrections
+
+
+def _monthly_totals(when, quantity, amount):
+    # {bulan: [count, quantity, amount]} dari baris yang punya waktu
+    dated = when.notna()
+    grouped = pd.DataFrame({"quantity": quantity, "amount": amount})[dated].groupby(when[dated].astype(str).str[:7])
+    totals = grouped.agg(rows=("quantity", "size"), quantity=("quantity", "sum"), amount=("amount", "sum"))
+    return {r.Index: [int(r.rows), int(r.quantity), float(r.amount)] for r in totals.itertuples()}
+
+
+def verify(projections, storage):
+    # Bandingkan proyeksi dengan tabel; mengembalikan list ketidaksesuaian per proyeksi
+    problems = []
+    with projections.current():
+        # Kolom kategori (registry skema) dibandingkan sebagai teks biasa
+        stock = storage.load_table("stock").astype({"Item": object}).groupby("Item")["Quantity"].sum()
+        projected = projections.stock.frame().set_index("Item")["Quantity"]
+        if not stock.sort_index().astype("int64").equals(projected.sort_index().astype("int64")):
+            problems.append("stock")
+
+        try:
+            orders = storage.load_table("orders", ["order_id", "email", "product_name", "quantity", "status", ROW_VERSION]
+                                        ).astype({"product_name": object, "status": object})
+        except FileNotFoundError:
+            orders = pd.DataFrame(columns=TABLE_COLUMNS["orders"])
+        # Versi baris ikut dibandingkan: antrian memakai versi proyeksi untuk compare-and-set
+        pending = orders[orders["status"].isin(QUEUE_STATUSES)]
+        expected = {status: set(zip(group["order_id"], group[ROW_VERSION])) for status, group in pending.groupby("status")}
+        queued = {status: {(order_id, order[ROW_VERSION]) for order_id, order in orders.items()}
+                  for status, orders in projections.queues.state.items() if orders}
+        if expected != queued:
+            problems.append("queues")
+
+        delivered = orders[orders["status"] == "delivered"].groupby(["email", "product_name"])["quantity"].sum()
+        try:
+            sales = storage.load_table("sales").astype({"product_name": object}).groupby(
+                ["email", "product_name"])["quantity"].sum()
+        except FileNotFoundError:
+            sales = delivered.iloc[:0]
+        remaining = delivered.sub(sales, fill_value=0)
+        projected = pd.Series({
+            (email, product): item["delivered"] - item["sold"]
+            for email, products in projections.inventory.state.items() for product, item in products.items()
+        }, dtype="float64")
+        # Dibandingkan sebagai dict: tabel kosong menghasilkan indeks dengan tipe berbeda
+        if remaining[remaining != 0].astype("int64").to_dict() != projected[projected != 0].astype("int64").to_dict():
+            problems.append("inventory")
+
+        # Rollup bulanan (semua produk dan reseller) dibandingkan dengan baris tabel yang bertanggal
+        for fact, table, columns, when in [
+            ("orders", "orders", ["quantity", "total_harga", "created_at"], "created_at"),
+            ("sales", "sales", ["quantity", "price", "timestamp"], "timestamp"),
+        ]:
+            try:
+                rows = storage.load_table(table, columns)
+            except FileNotFoundError:
+                rows = pd.DataFrame(columns=columns)
+            amount = rows["total_harga"] if fact == "orders" else rows["quantity"] * rows["price"]
+            expected = _monthly_totals(rows[when], rows["quantity"], amount)
+            actual = {month: cells[f"{ANY}\t{ANY}"] for month, cells in projections.rollups.state[fact]["month"].items()}
+            if set(expected) != set(actual) or any(
+                    expected[m][:2] != actual[m][:2] or abs(expected[m][2] - actual[m][2]) > 0.01 for m in expected):
+                problems.append(f"rollups.{fact}")
+    return problems
+
+
+def _table(storage, table):
+    try:
+        return storage.load_table(table)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=TABLE_COLUMNS[table])
+
+
+def reconcile(projections, storage):
+    """Lengkapi log dengan event koreksi sampai proyeksi sesuai tabel; mengembalikan jumlahnya.
+
+    Tabel adalah sumber kebenaran. Event bisa hilang jika proses berhenti (atau
+    gagal) di antara commit tabel dan penulisan event. Pesanan dan laporan penjualan
+    yang tidak ada di log ditambahkan sebagai event aslinya (order_placed,
+    sales_reported), sehingga stok, inventaris, dan rollup ikut terkoreksi. Sisa
+    selisih antrian (status, versi baris) dan stok disamakan dengan event koreksi.
+    Penulis lain ditahan selama pembandingan (EventLog.exclusive).
+    """
+    log = projections.log
+    with log.exclusive(), projections.current():
+        known, reported = set(), Counter()
+        for _, event in log.read():
+            data = event["data"]
+            if event["type"] == "order_placed":
+                known.update(int(order["order_id"]) for order in data["orders"])
+            elif event["type"] == "order_imported":
+                known.add(int(data["order_id"]))
+            elif event["type"] == "sales_reported":
+                reported.update((data["email"], sale["product_name"], int(sale["quantity"])) for sale in data["items"])
+
+        orders = _table(storage, "orders").reindex(columns=TABLE_COLUMNS["orders"]).astype(
+            {"product_name": object, "status": object})
+        corrections = []
+        missing = orders[~orders["order_id"].isin(known)]
+        if len(missing):
+            corrections.append(("order_placed", {"orders": records(missing.drop(columns=["status", ROW_VERSION]))}))
+        # Baris penjualan dicocokkan per (email, produk, jumlah); yang tidak ada di log dilaporkan ulang
+        unreported = {}
+        for sale in records(_table(storage, "sales").astype({"product_name": object})):
+            key = (sale["email"], sale["product_name"], int(sale["quantity"]))
+            if reported[key]:
+                reported[key] -= 1
+            else:
+                unreported.setdefault(sale["email"], []).append(
+                    {column: sale[column] for column in ["product_name", "quantity", "price", "timestamp"]})
+        corrections.extend(("sales_reported", {"email": email, "items": items}) for email, items in unreported.items())
+        log.append(corrections)
+        projections.catch_up()
+
+        fixes = []
+        for order in records(orders):
+            queued = projections.queues.find(int(order["order_id"]))
+            if order["status"] in QUEUE_STATUSES:
+                if queued is None or (queued["status"], queued[ROW_VERSION]) != (order["status"], order[ROW_VERSION]):
+                    fixes.append(("order_synced", order))
+            elif queued is not None:
+                # Sudah terkirim di tabel tetapi event pengirimannya hilang
+                fixes.append(("order_delivered", order_fields(order)) if order["status"] == "delivered"
+                             else ("order_synced", order))
+        existing = set(orders["order_id"])
+        fixes.extend(("order_synced", {"order_id": order_id, "status": None})
+                     for queue in projections.queues.state.values() for order_id in queue if order_id not in existing)
+
+        stock = _table(storage, "stock").astype({"Item": object}).groupby("Item").agg(
+            Quantity=("Quantity", "sum"), Price=("Price", "last"))
+        for item, row in stock.iterrows():
+            projected = projections.stock.state.get(item)
+            if projected is None or (projected["quantity"], projected["price"]) != (row["Quantity"], row["Price"]):
+                fixes.append(("stock_updated", {"item": item, "quantity": int(row["Quantity"]), "price": int(row["Price"])}))
+        fixes.extend(("stock_removed", {"item": item}) for item in projections.stock.state if item not in stock.index)
+        log.append(fixes)
+        projections.catch_up()
+    return len(corrections) + len(fixes)
+
+
+_logs = {}
+_projections = {}
+_registry_lock = threading.Lock()
+
+
+def get_event_log(storage=None):
+    # Satu log per direktori data; log dibuat dari isi tabel saat pertama kali dipakai.
+    # Ambil log sebelum menulis ke tabel agar perubahan itu tidak ikut terimpor dua kali
+    storage = storage or get_storage()
+    path = os.path.join(getattr(storage, "data_dir", "."), EVENTS_FILE)
+    with _registry_lock:
+        log = _logs.get(path)
+        if log is None:
+            log = EventLog(path)
+            if not os.path.exists(path):
+                log.import_tables(storage)
+            _logs[path] = log
+        return log
+
+
+def get_projections(storage=None):
+    storage = storage or get_storage()
+    log = get_event_log(storage)
+    with _registry_lock:
+        projections = _projections.get(log.path)
+        if projections is None:
+            checkpoint_dir = os.path.join(os.path.dirname(log.path), CHECKPOINT_DIR)
+            projections = _projections[log.path] = Projections(log, checkpoint_dir)
+        return projections
+
+
+if __name__ == "__main__":
+    command = sys.argv[1:2]
+    if command == ["rebuild"]:
+        projections = get_projections()
+        corrections = projections.rebuild(get_storage())
+        print(f"Proyeksi dibangun ulang sampai event #{projections.stock.seq} ({corrections} event koreksi dari tabel).")
+    elif command == ["reconcile"]:
+        print(f"{reconcile(get_projections(), get_storage())} event koreksi ditambahkan.")
+    elif command == ["verify"]:
+        problems = verify(get_projections(), get_storage())
+        print("Proyeksi konsisten dengan tabel." if not problems else
+              f"Proyeksi TIDAK konsisten: {', '.join(problems)}")
+        sys.exit(1 if problems else 0)
+    elif command == ["restore-stock"]:
+        # Tulis ulang tabel stok dari proyeksi log event
+        projections = get_projections()
+        with projections.current():
+            stock = projections.stock.frame()
+        get_storage().save_table("stock", stock)
+        print(f"Tabel stok ditulis ulang dari log: {len(stock)} produk.")
+    elif command == ["history"] and len(sys.argv) == 3:
+        for event in get_event_log().history(sys.argv[2]):
+            print(json.dumps(event))
+    else:
+        print("Penggunaan: python event_log.py rebuild|reconcile|verify|restore-stock|history <order_id>")
@@ -0,0 +1,139 @@
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from storage import ROW_VERSION, TABLE_COLUMNS, get_storage
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl ada di requirements.txt; tanpa openpyxl ekspor XLSX gagal dengan pesan jelas
+    Workbook = None
+
+EXPORT_CHUNK_ROWS = 50000
+# Kolom tanggal per tabel untuk filter rentang tanggal (teks ISO)
+DATE_COLUMNS = {"orders": "created_at", "sales": "timestamp", "payments": "timestamp"}
+# Kolom yang tidak pernah ikut diekspor
+EXCLUDED_COLUMNS = {"password", ROW_VERSION}
+EXPORT_FORMATS = ["csv", "xlsx"]
+# Baris data maksimum per lembar Excel (satu baris dipakai header)
+XLSX_SHEET_ROWS = 1048575
+
+
+def export_columns(table):
+    return [c for c in TABLE_COLUMNS[table] if c not in EXCLUDED_COLUMNS]
+
+
+def _check_filters(table, start, end, equals):
+    for column in equals:
+        if column not in TABLE_COLUMNS[table]:
+            raise ValueError(f"Tabel {table} tidak memiliki kolom {column}.")
+    if (start or end) and table not in DATE_COLUMNS:
+        raise ValueError(f"Tabel {table} tidak memiliki kolom tanggal untuk filter rentang tanggal.")
+
+
+def filter_chunk(table, chunk, start=None, end=None, **equals):
+    # equals: kolom -> nilai persis (kosong = tanpa filter); start/end: tanggal, end inklusif
+    mask = np.ones(len(chunk), dtype=bool)
+    for column, value in equals.items():
+        if value:
+            mask &= (chunk[column].astype(object) == value).to_numpy()
+    if start or end:
+        dates = pd.to_datetime(chunk[DATE_COLUMNS[table]], errors="coerce", format="ISO8601")
+        if start:
+            mask &= (dates >= pd.Timestamp(start)).to_numpy()
+        if end:
+            mask &= (dates < pd.Timestamp(end) + pd.Timedelta(days=1)).to_numpy()
+    return chunk[mask]
+
+
+def iter_export(table, storage=None, chunksize=EXPORT_CHUNK_ROWS, start=None, end=None, **equals):
+    """Baris tabel yang lolos filter, per potongan DataFrame.
+
+    Memori sebatas satu potongan: tabel dibaca lewat storage.iter_table(), bukan
+    load_table(). Filter: start/end (tanggal) dan kolom=nilai, misalnya email,
+    status, atau product_name.
+    """
+    _check_filters(table, start, end, equals)
+    storage = storage or get_storage()
+    columns = export_columns(table)
+    for chunk in storage.iter_table(table, chunksize):
+        chunk = filter_chunk(table, chunk, start, end, **equals)
+        if len(chunk):
+            yield chunk.reindex(columns=columns)
+
+
+def csv_stream(table, storage=None, chunksize=EXPORT_CHUNK_ROWS, **filters):
+    # CSV sebagai generator bytes: header lalu satu blok per potongan
+    yield pd.DataFrame(columns=export_columns(table)).to_csv(index=False).encode()
+    for chunk in iter_export(table, storage, chunksize, **filters):
+        yield chunk.to_csv(index=False, header=False).encode()
+
+
+def write_csv(path, table, storage=None, progress=None, chunksize=EXPORT_CHUNK_ROWS, **filters):
+    rows = 0
+    with open(path, "wb") as f:
+        f.write(pd.DataFrame(columns=export_columns(table)).to_csv(index=False).encode())
+        for chunk in iter_export(table, storage, chunksize, **filters):
+            f.write(chunk.to_csv(index=False, header=False).encode())
+            rows += len(chunk)
+            if progress is not None:
+                progress(rows)
+    return rows
+
+
+def write_xlsx(path, table, storage=None, progress=None, chunksize=EXPORT_CHUNK_ROWS, **filters):
+    # Workbook write-only openpyxl menulis baris ke file sementara, bukan ke memori
+    if Workbook is None:
+        raise RuntimeError("Ekspor XLSX membutuhkan paket openpyxl (pip install -r requirements.txt).")
+    columns = export_columns(table)
+    workbook = Workbook(write_only=True)
+    sheet, sheet_rows, rows = None, XLSX_SHEET_ROWS, 0
+    for chunk in iter_export(table, storage, chunksize, **filters):
+        values = chunk.astype(object).where(chunk.notna(), None)
+        for row in values.itertuples(index=False, name=None):
+            if sheet_rows == XLSX_SHEET_ROWS:
+                sheet = workbook.create_sheet(f"{table}_{len(workbook.worksheets) + 1}")
+                sheet.append(columns)
+                sheet_rows = 0
+            sheet.append(row)
+            sheet_rows += 1
+        rows += len(chunk)
+        if progress is not None:
+            progress(rows)
+    if sheet is None:
+        workbook.create_sheet(table).append(columns)
+    workbook.save(path)
+    return rows
+
+
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+def export_file(path, table, fmt="csv", storage=None, progress=None, **filters):
+    # Tulis ekspor ke file; progress(jumlah baris) dipanggil per potongan. Mengembalikan jumlah baris
+    return WRITERS[fmt](path, table, storage, progress, **filters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ekspor tabel per potongan dengan filter")
+    parser.add_argument("table", choices=list(TABLE_COLUMNS))
+    parser.add_argument("--format", choices=list(WRITERS), default="csv")
+    parser.add_argument("--output", help="File tujuan (default: CSV ke stdout)")
+    parser.add_argument("--start", help="Tanggal awal (YYYY-MM-DD)")
+    parser.add_argument("--end", help="Tanggal akhir, inklusif (YYYY-MM-DD)")
+    parser.add_argument("--email", help="Hanya reseller ini")
+    parser.add_argument("--status")
+    parser.add_argument("--product", dest="product_name")
+    parser.add_argument("--chunksize", type=int, default=EXPORT_CHUNK_ROWS)
+    args = parser.parse_args()
+    if args.format != "csv" and not args.output:
+        parser.error("--output wajib untuk format selain csv")
+
+    filters = {k: v for k, v in [("start", args.start), ("end", args.end), ("email", args.email),
+                                 ("status", args.status), ("product_name", args.product_name)] if v}
+    if args.output:
+        count = export_file(args.output, args.table, args.format, chunksize=args.chunksize, **filters)
+        print(f"{count} baris ditulis ke {args.output}")
+    else:
+        for block in csv_stream(args.table, chunksize=args.chunksize, **filters):
+            sys.stdout.buffer.write(block)
@@ -1,10 +1,19 @@
 from abc import ABC, abstractmethod
 import re
 import pandas as pd
+from user_directory import get_user_directory
 
 # File CSV untuk menyimpan data reseller
 DATA_FILE = "resellers.csv"
 
+# Regex dikompilasi sekali dan dipakai ulang oleh mode tunggal maupun massal
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+UPPERCASE_PATTERN = re.compile(r"[A-Z]")
+LOWERCASE_PATTERN = re.compile(r"[a-z]")
+DIGIT_PATTERN = re.compile(r"[0-9]")
+
+PASSWORD_RULE_MESSAGE = "Password harus mengandung setidaknya 8 karakter, satu huruf besar, satu huruf kecil, dan satu angka."
+
 class Handler(ABC):
     @abstractmethod
     def set_next(self, handler):
@@ -27,24 +36,57 @@ class AbstractHandler(Handler):
             return self._next_handler.handle(request)
         return None
 
+    def handle_batch(self, batch, errors):
+        # Mode massal: batch adalah DataFrame, errors adalah Series pesan error per baris
+        # (None = belum ada error). Setiap handler hanya memeriksa baris yang masih lolos.
+        if self._next_handler:
+            return self._next_handler.handle_batch(batch, errors)
+        return errors
+
+def _column(batch, name):
+    if name not in batch:
+        return pd.Series("", index=batch.index)
+    return batch[name].fillna("").astype(str)
+
+def _flag(errors, mask, message):
+    errors[errors.isna() & mask] = message
+
 class EmailValidationHandler(AbstractHandler):
     def handle(self, request):
         email = request.get("email")
         if not email:
             return "Email tidak boleh kosong."
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", email):
+        if not EMAIL_PATTERN.match(email):
             return "Format email tidak valid."
         return super().handle(request)
 
+    def handle_batch(self, batch, errors):
+        email = _column(batch, "email")
+        _flag(errors, email == "", "Email tidak boleh kosong.")
+        _flag(errors, ~email.str.match(EMAIL_PATTERN), "Format email tidak valid.")
+        return super().handle_batch(batch, errors)
+
 class PasswordValidationHandler(AbstractHandler):
     def handle(self, request):
         password = request.get("password")
         if not password:
             return "Password tidak boleh kosong."
-        if len(password) < 8 or not re.search(r"[A-Z]", password) or not re.search(r"[a-z]", password) or not re.search(r"[0-9]", password):
-            return "Password harus mengandung setidaknya 8 karakter, satu huruf besar, satu huruf kecil, dan satu angka."
+        if len(password) < 8 or not UPPERCASE_PATTERN.search(password) or not LOWERCASE_PATTERN.search(password) or not DIGIT_PATTERN.search(password):
+            return PASSWORD_RULE_MESSAGE
         return super().handle(request)
 
+    def handle_batch(self, batch, errors):
+        password = _column(batch, "password")
+        _flag(errors, password == "", "Password tidak boleh kosong.")
+        weak = (
+            (password.str.len() < 8)
+            | ~password.str.contains(UPPERCASE_PATTERN)
+            | ~password.str.contains(LOWERCASE_PATTERN)
+            | ~password.str.contains(DIGIT_PATTERN)
+        )
+        _flag(errors, weak, PASSWORD_RULE_MESSAGE)
+        return super().handle_batch(batch, errors)
+
 class ConfirmPasswordHandler(AbstractHandler):
     def handle(self, request):
         if not request.get("confirm_password"):
@@ -53,19 +95,33 @@ class ConfirmPasswordHandler(AbstractHandler):
             return "Konfirmasi password tidak sesuai."
         return super().handle(request)
 
+    def handle_batch(self, batch, errors):
+        confirm_password = _column(batch, "confirm_password")
+        _flag(errors, confirm_password == "", "Konfirmasi password tidak boleh kosong.")
+        _flag(errors, confirm_password != _column(batch, "password"), "Konfirmasi password tidak sesuai.")
+        return super().handle_batch(batch, errors)
+
 class EmailExistsHandler(AbstractHandler):
     def handle(self, request):
         email = request.get("email")
         if not email:
             return "Email tidak boleh kosong."
         try:
-            df = pd.read_csv(DATA_FILE)
-            if email in df['email'].values:
+            if get_user_directory().exists(email):
                 return "Email sudah terdaftar."
         except FileNotFoundError:
             pass
         return super().handle(request)
 
+    def handle_batch(self, batch, errors):
+        email = _column(batch, "email")
+        _flag(errors, email == "", "Email tidak boleh kosong.")
+        try:
+            _flag(errors, get_user_directory().exists_many(email), "Email sudah terdaftar.")
+        except FileNotFoundError:
+            pass
+        return super().handle_batch(batch, errors)
+
 class SaveUserHandler(AbstractHandler):
     def handle(self, request):
         for key in ["name", "address", "contact"]:
@@ -80,20 +136,37 @@ class SaveUserHandler(AbstractHandler):
             "status": request.get("status", "unverified"),
             "role": request.get("role")
         }
-        try:
-            df = pd.read_csv(DATA_FILE)
-            df = pd.concat([df, pd.DataFrame([user_data])], ignore_index=True)
-        except FileNotFoundError:
-            df = pd.DataFrame([user_data])
-        df.to_csv(DATA_FILE, index=False)
+        # Tambahkan satu baris ke tabel pengguna (file dibuat jika belum ada)
+        get_user_directory().append_users(pd.DataFrame([user_data]))
         return "Registrasi berhasil."
 
+    def handle_batch(self, batch, errors):
+        for key in ["name", "address", "contact"]:
+            _flag(errors, _column(batch, key) == "", f"{key.capitalize()} tidak boleh kosong.")
+        # Email ganda di dalam batch yang sama, dicek setelah semua validasi lain: baris
+        # pertama yang benar-benar disimpan diterima
+        email = _column(batch, "email")
+        _flag(errors, email.where(errors.isna()).duplicated() & email.ne(""), "Email ganda di dalam batch.")
+        valid = batch[errors.isna()]
+        if not valid.empty:
+            users = pd.DataFrame({
+                "email": valid["email"],
+                "password": valid["password"],
+                "name": valid["name"],
+                "address": valid["address"],
+                "contact": valid["contact"],
+                "status": _column(valid, "status").replace("", "unverified"),
+                "role": _column(valid, "role"),
+            })
+            # Seluruh baris valid disimpan dengan satu kali append
+            get_user_directory().append_users(users)
+        return errors
+
 class VerificationStatusHandler(AbstractHandler):
     def handle(self, request):
         email = request.get("email")
         try:
-            df = pd.read_csv(DATA_FILE)
-            user = df[df["email"] == email].iloc[0] if email in df["email"].values else None
+            user = get_user_directory().get(email)
 
             if user is not None and user["status"] != "verified":
                 return "Akun Anda belum diverifikasi oleh admin."
@@ -0,0 +1,178 @@
+import functools
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+# Batas atas bucket histogram latensi (milidetik)
+LATENCY_BUCKETS_MS = [1, 5, 10, 50, 100, 500, 1000, 5000, float("inf")]
+MAX_EVENTS = 10000
+
+
+class Metrics:
+    """Pencatat jumlah operasi, baris, byte, dan latensi per rerun dan per peran."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._rerun_ids = itertools.count(1)
+        self._events = deque(maxlen=MAX_EVENTS)
+        self._totals = {}
+        self._reruns = deque(maxlen=100)
+
+    def start_rerun(self, role, fragment=None):
+        # Dipanggil di awal setiap eksekusi script Streamlit (atau satu fragmen saja)
+        rerun = {
+            "rerun_id": next(self._rerun_ids), "role": role, "fragment": fragment,
+            "started": time.time(), "elapsed_ms": None, "operations": {},
+        }
+        self._local.rerun = rerun
+        with self._lock:
+            self._reruns.append(rerun)
+        return rerun["rerun_id"]
+
+    def end_rerun(self):
+        # Dipanggil di akhir eksekusi; operasi sesudahnya tidak lagi masuk rerun ini
+        rerun = self.current_rerun()
+        if rerun is not None:
+            rerun["elapsed_ms"] = round((time.time() - rerun["started"]) * 1000, 3)
+            self._local.rerun = None
+
+    def current_rerun(self):
+        return getattr(self._local, "rerun", None)
+
+    def record(self, operation, table=None, rows=0, nbytes=0, seconds=0.0):
+        rerun = self.current_rerun()
+        role = rerun["role"] if rerun else "system"
+        event = {
+            "ts": time.time(),
+            "rerun_id": rerun["rerun_id"] if rerun else None,
+            "role": role,
+            "operation": operation,
+            "table": table,
+            "rows": rows,
+            "bytes": nbytes,
+            "ms": round(seconds * 1000, 3),
+        }
+        with self._lock:
+            self._events.append(event)
+            for key in [(operation, table, "*"), (operation, table, role)]:
+                self._accumulate(self._totals.setdefault(key, self._empty()), event)
+            if rerun is not None:
+                self._accumulate(rerun["operations"].setdefault((operation, table), self._empty()), event)
+
+    @staticmethod
+    def _empty():
+        return {"count": 0, "rows": 0, "bytes": 0, "ms": 0.0, "histogram": [0] * len(LATENCY_BUCKETS_MS)}
+
+    @staticmethod
+    def _accumulate(stats, event):
+        stats["count"] += 1
+        stats["rows"] += event["rows"] or 0
+        stats["bytes"] += event["bytes"] or 0
+        stats["ms"] += event["ms"]
+        for i, limit in enumerate(LATENCY_BUCKETS_MS):
+            if event["ms"] <= limit:
+                stats["histogram"][i] += 1
+                break
+
+    def summary(self, by_role=False):
+        # List baris ringkasan per operasi (dan per peran jika by_role=True)
+        with self._lock:
+            return [
+                {"operation": op, "table": table, "role": role, **self._row(stats)}
+                for (op, table, role), stats in self._totals.items()
+                if (role != "*") == by_role
+            ]
+
+    def rerun_summaries(self):
+        with self._lock:
+            return [
+                {
+                    "rerun_id": r["rerun_id"],
+                    "role": r["role"],
+                    "fragment": r["fragment"],
+                    "elapsed_ms": r["elapsed_ms"],
+                    "operations": sum(s["count"] for s in r["operations"].values()),
+                    "rows": sum(s["rows"] for s in r["operations"].values()),
+                    "bytes": sum(s["bytes"] for s in r["operations"].values()),
+                    "ms": round(sum(s["ms"] for s in r["operations"].values()), 3),
+                }
+                for r in self._reruns
+            ]
+
+    @staticmethod
+    def _row(stats):
+        labels = ["<=" + (f"{b:g}ms" if b != float("inf") else "inf") for b in LATENCY_BUCKETS_MS]
+        return {
+            "count": stats["count"],
+            "rows": stats["rows"],
+            "bytes": stats["bytes"],
+            "mean_ms": round(stats["ms"] / stats["count"], 3) if stats["count"] else 0.0,
+            **dict(zip(labels, stats["histogram"])),
+        }
+
+    def export_jsonl(self, path=None):
+        # Semua event terakhir dalam format JSON lines; ditulis ke file jika path diberikan
+        with self._lock:
+            lines = "".join(json.dumps(event) + "\n" for event in self._events)
+        if path:
+            with open(path, "a") as f:
+                f.write(lines)
+        return lines
+
+
+_metrics = Metrics()
+
+
+def get_metrics():
+    return _metrics
+
+
+def _rows_of(value):
+    if isinstance(value, tuple) and value:
+        # query(): (halaman, total)
+        return _rows_of(value[0])
+    if hasattr(value, "shape"):
+        return int(value.shape[0])
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    return 0
+
+
+def instrumented(operation):
+    """Dekorator untuk method backend penyimpanan: method(self, table, ...)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, table, *args, **kwargs):
+            size_before = self.size(table)
+            start = time.perf_counter()
+            result = func(self, table, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            rows = _rows_of(result) or (_rows_of(args[0]) if args else 0)
+            size_after = self.size(table)
+            # Baca: ukuran file yang diparse; tulis: selisih (append) atau ukuran file baru
+            if operation in ("load_table", "load_rows"):
+                nbytes = size_after
+            elif operation == "append_rows":
+                nbytes = size_after - size_before
+            else:
+                nbytes = size_after if size_after != size_before else 0
+            _metrics.record(f"{self.name}.{operation}", table, rows, nbytes, seconds)
+            return result
+        return wrapper
+    return decorator
+
+
+def timed(operation):
+    """Dekorator untuk mencatat latensi fungsi/method apa pun (misalnya pembayaran)."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _metrics.record(operation, seconds=time.perf_counter() - start)
+        return wrapper
+    return decorator
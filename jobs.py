@@ -0,0 +1,315 @@
+import atexit
+import json
+import os
+import shutil
+import threading
+import time
+import traceback
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from storage import get_storage
+
+JOBS_DIR = "jobs"
+JOBS_FILE = "jobs.json"
+JOB_WORKERS = int(os.environ.get("HARMON_JOB_WORKERS", "2"))
+# Jeda minimum antar penyimpanan progres ke disk (status selalu langsung disimpan)
+PROGRESS_SAVE_INTERVAL = 1.0
+# Jumlah tugas selesai yang disimpan; yang lebih lama dihapus beserta artefaknya
+KEEP_FINISHED = 50
+
+STATUS_LABELS = {
+    "queued": "menunggu", "running": "berjalan", "done": "selesai", "failed": "gagal", "cancelled": "dibatalkan",
+}
+FINISHED = ("done", "failed", "cancelled")
+
+# Jenis tugas: nama -> (label, fungsi(context, **params) -> nama file artefak atau None)
+JOB_TYPES = {}
+
+
+def job_type(name, label):
+    # Daftarkan fungsi tugas; parameter tugas harus bisa disimpan sebagai JSON
+    def decorator(func):
+        JOB_TYPES[name] = (label, func)
+        return func
+    return decorator
+
+
+class JobCancelled(Exception):
+    """Dilempar di dalam tugas saat pembatalan diminta."""
+
+
+class JobContext:
+    """Penghubung antara fungsi tugas dan runner: progres, pembatalan, dan direktori artefak."""
+    def __init__(self, runner, job_id, directory):
+        self._runner = runner
+        self.job_id = job_id
+        self.directory = directory
+
+    @property
+    def cancelled(self):
+        return self._runner._cancel_requested(self.job_id)
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+    def progress(self, done, total, message=None):
+        # Laporkan progres (sekaligus titik pembatalan); total=None: jumlah akhir belum diketahui
+        fraction = None if total is None else done / total if total else 1.0
+        self._runner._set_progress(self.job_id, fraction, message)
+        self.check()
+
+    def path(self, filename):
+        return os.path.join(self.directory, filename)
+
+
+class JobRunner:
+    """Tugas latar belakang di thread pool dengan antrian yang disimpan ke disk.
+
+    Setiap tugas punya direktori jobs/<id>/ untuk file input dan artefak hasil. Tugas
+    yang masih menunggu saat aplikasi berhenti dijalankan lagi saat runner dimuat;
+    tugas yang sedang berjalan ditandai gagal. Pembatalan bersifat kooperatif: tugas
+    berhenti pada pemanggilan context.progress()/check() berikutnya.
+    """
+    def __init__(self, directory=None, workers=JOB_WORKERS):
+        self._directory = directory
+        self.workers = workers
+        self._lock = threading.RLock()
+        self._jobs = None
+        self._cancel = set()
+        self._futures = {}
+        self._executor = None
+        self._last_save = 0.0
+        atexit.register(self.flush)
+
+    @property
+    def directory(self):
+        if self._directory:
+            return self._directory
+        return os.path.join(getattr(get_storage(), "data_dir", "."), JOBS_DIR)
+
+    def _job_dir(self, job_id):
+        return os.path.join(self.directory, job_id)
+
+    def _load(self):
+        if self._jobs is not None:
+            return self._jobs
+        path = os.path.join(self.directory, JOBS_FILE)
+        self._jobs = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self._jobs = json.load(f)
+        for job in self._jobs.values():
+            if job["status"] == "running":
+                job.update(status="failed", error="Terhenti karena aplikasi dimulai ulang.", finished=time.time())
+        self._save()
+        for job_id, job in self._jobs.items():
+            if job["status"] == "queued":
+                self._enqueue(job_id)
+        return self._jobs
+
+    def _save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, JOBS_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self._jobs, f)
+        os.replace(path + ".tmp", path)
+        self._last_save = time.monotonic()
+
+    def flush(self):
+        with self._lock:
+            if self._jobs is not None:
+                self._save()
+
+    def _enqueue(self, job_id):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="harmon-job")
+        self._futures[job_id] = self._executor.submit(self._run, job_id)
+
+    def submit(self, kind, owner=None, files=None, **params):
+        """Antrikan tugas; files: nama file -> bytes yang disimpan di direktori tugas.
+
+        Mengembalikan ID tugas.
+        """
+        if kind not in JOB_TYPES:
+            raise ValueError(f"Jenis tugas tidak dikenal: {kind}")
+        job_id = uuid.uuid4().hex[:12]
+        os.makedirs(self._job_dir(job_id))
+        for filename, data in (files or {}).items():
+            with open(os.path.join(self._job_dir(job_id), filename), "wb") as f:
+                f.write(data)
+        with self._lock:
+            self._load()[job_id] = {
+                "id": job_id, "kind": kind, "label": JOB_TYPES[kind][0], "owner": owner, "params": params,
+                "status": "queued", "progress": 0.0, "message": "", "artifact": None, "error": None,
+                "created": time.time(), "started": None, "finished": None,
+            }
+            self._save()
+            self._enqueue(job_id)
+        return job_id
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._load()[job_id]
+            if job["status"] != "queued":
+                return
+            job.update(status="running", started=time.time())
+            self._save()
+        context = JobContext(self, job_id, self._job_dir(job_id))
+        update = {}
+        try:
+            context.check()
+            artifact = JOB_TYPES[job["kind"]][1](context, **job["params"])
+        except JobCancelled:
+            update = {"status": "cancelled"}
+        except Exception as e:
+            traceback.print_exc()
+            update = {"status": "failed", "error": str(e) or type(e).__name__}
+        else:
+            update = {"status": "done", "progress": 1.0, "artifact": artifact}
+        with self._lock:
+            job.update(update, finished=time.time())
+            self._cancel.discard(job_id)
+            self._futures.pop(job_id, None)
+            self._prune()
+            self._save()
+
+    def _prune(self):
+        finished = sorted((j for j in self._jobs.values() if j["status"] in FINISHED), key=lambda j: j["finished"])
+        for job in finished[:max(0, len(finished) - KEEP_FINISHED)]:
+            del self._jobs[job["id"]]
+            shutil.rmtree(self._job_dir(job["id"]), ignore_errors=True)
+
+    def _set_progress(self, job_id, progress, message):
+        with self._lock:
+            job = self._load()[job_id]
+            if progress is not None:
+                job["progress"] = round(min(max(progress, 0.0), 1.0), 4)
+            if message is not None:
+                job["message"] = message
+            if time.monotonic() - self._last_save >= PROGRESS_SAVE_INTERVAL:
+                self._save()
+
+    def _cancel_requested(self, job_id):
+        with self._lock:
+            return job_id in self._cancel
+
+    def cancel(self, job_id):
+        # Batalkan tugas yang menunggu atau sedang berjalan; False jika sudah selesai
+        with self._lock:
+            job = self._load().get(job_id)
+            if job is None or job["status"] in FINISHED:
+                return False
+            future = self._futures.get(job_id)
+            if job["status"] == "queued" and (future is None or future.cancel()):
+                job.update(status="cancelled", finished=time.time())
+                self._futures.pop(job_id, None)
+            else:
+                self._cancel.add(job_id)
+                job["message"] = "Membatalkan..."
+            self._save()
+            return True
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._load().get(job_id)
+            return None if job is None else dict(job)
+
+    def jobs(self, owner=None):
+        # Tugas terbaru lebih dulu; owner=None: semua pengguna
+        with self._lock:
+            jobs = [dict(j) for j in self._load().values() if owner is None or j["owner"] == owner]
+        return sorted(jobs, key=lambda j: j["created"], reverse=True)
+
+    def active(self, owner=None):
+        return any(j["status"] not in FINISHED for j in self.jobs(owner))
+
+    def artifact_path(self, job_id):
+        job = self.get(job_id)
+        if job is None or not job["artifact"]:
+            return None
+        return os.path.join(self._job_dir(job_id), job["artifact"])
+
+    def wait(self, job_id, timeout=None):
+        # Tunggu tugas selesai (untuk skrip/CLI); mengembalikan data tugas terakhir
+        future = self._futures.get(job_id)
+        if future is not None:
+            future.result(timeout)
+        return self.get(job_id)
+
+
+def _zip_files(context, filename, paths):
+    with zipfile.ZipFile(context.path(filename), "w", zipfile.ZIP_DEFLATED) as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+    return filename
+
+
+@job_type("export_table", "Ekspor tabel")
+def export_table(context, table, fmt="csv", **filters):
+    # Ekspor per potongan (exports.py) dengan filter opsional; memori sebatas satu potongan
+    from exports import export_file
+    filename = f"{table}.{fmt}"
+    rows = export_file(context.path(filename), table, fmt,
+                       progress=lambda rows: context.progress(rows, None, f"{rows} baris"), **filters)
+    context.progress(1, 1, f"{rows} baris diekspor")
+    return filename
+
+
+@job_type("manifests", "Arsip manifest pengiriman")
+def export_manifests(context, status):
+    # Satu CSV per pengiriman dalam satu arsip zip
+    from manifests import pending_manifests
+    _, lines = pending_manifests(status)
+    filename = f"manifest_{status}.zip"
+    groups = lines.groupby("shipment_id", sort=False)
+    with zipfile.ZipFile(context.path(filename), "w", zipfile.ZIP_DEFLATED) as archive:
+        for i, (shipment_id, shipment) in enumerate(groups, start=1):
+            archive.writestr(f"manifest_{status}_{shipment_id:04d}.csv", shipment.to_csv(index=False))
+            context.progress(i, groups.ngroups, f"{i} dari {groups.ngroups} pengiriman")
+    return filename
+
+
+@job_type("reconcile", "Rekonsiliasi pembayaran")
+def reconcile_settlement(context, settlement, chunksize=100000):
+    # settlement: nama file input di direktori tugas (disimpan saat submit)
+    from reconciliation import reconcile_file
+    output_dir = context.path("hasil")
+    os.makedirs(output_dir, exist_ok=True)
+    counts = reconcile_file(context.path(settlement), output_dir, chunksize=chunksize)
+    context.progress(1, 1, ", ".join(f"{category}: {count}" for category, count in counts.items()))
+    return _zip_files(context, "rekonsiliasi.zip", [os.path.join(output_dir, name) for name in sorted(os.listdir(output_dir))])
+
+
+@job_type("rebuild_projections", "Bangun ulang proyeksi")
+def rebuild_projections(context):
+    from event_log import get_projections, verify
+    context.progress(0, 2, "Memutar ulang log event dan mencocokkan dengan tabel")
+    projections = get_projections()
+    corrections = projections.rebuild(get_storage())
+    context.progress(1, 2, f"{corrections} event koreksi; memeriksa proyeksi")
+    problems = verify(projections, get_storage())
+    context.progress(2, 2, "Proyeksi sesuai tabel" if not problems else f"{len(problems)} selisih ditemukan")
+    return None
+
+
+@job_type("rebuild_aggregates", "Hitung ulang agregat")
+def rebuild_aggregates(context):
+    from aggregates import get_aggregates
+    get_aggregates().rebuild()
+    context.progress(1, 1, "Agregat dihitung ulang")
+    return None
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    # Satu runner untuk seluruh proses sehingga tugas bertahan antar rerun dan sesi
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
@@ -0,0 +1,76 @@
+import argparse
+import os
+import pandas as pd
+from storage import get_storage
+from order_queue import NEXT_STATUS, PENDING_STATUSES, OrderQueue, get_order_queue
+
+SHIPMENT_COLUMNS = ["shipment_id", "name", "email", "address", "contact", "orders", "quantity", "total_harga"]
+LINE_COLUMNS = [
+    "shipment_id", "name", "email", "address", "contact", "order_id", "product_name", "quantity", "price", "total_harga",
+]
+UNKNOWN_ADDRESS = "(alamat tidak diketahui)"
+
+
+def build_manifests(orders, users):
+    """Kelompokkan pesanan per reseller dan alamat tujuan menjadi manifest pengiriman.
+
+    orders: DataFrame pesanan (misalnya satu status dari antrian); users: tabel users
+    untuk nama, alamat, dan kontak. Mengembalikan (shipments, lines): satu baris per
+    pengiriman beserta totalnya, dan baris pesanan dengan shipment_id-nya. Nomor
+    pengiriman berurutan menurut alamat lalu email.
+    """
+    if orders.empty:
+        return pd.DataFrame(columns=SHIPMENT_COLUMNS), pd.DataFrame(columns=LINE_COLUMNS)
+    contacts = users.drop_duplicates("email").set_index("email")[["name", "address", "contact"]].astype(object)
+    lines = orders.join(contacts, on="email")
+    lines["address"] = lines["address"].fillna(UNKNOWN_ADDRESS)
+    lines["name"] = lines["name"].fillna(lines["email"])
+    lines["contact"] = lines["contact"].fillna("")
+    lines = lines.sort_values(["address", "email", "order_id"], kind="stable")
+    lines["shipment_id"] = lines.groupby(["address", "email"], sort=False).ngroup() + 1
+    lines = lines[LINE_COLUMNS].reset_index(drop=True)
+
+    shipments = lines.groupby("shipment_id", sort=False).agg(
+        name=("name", "first"), email=("email", "first"), address=("address", "first"),
+        contact=("contact", "first"), orders=("order_id", "size"),
+        quantity=("quantity", "sum"), total_harga=("total_harga", "sum"),
+    ).reset_index()
+    return shipments[SHIPMENT_COLUMNS], lines
+
+
+def manifest_csv(lines, shipment_id):
+    # Manifest satu pengiriman (berdiri sendiri: tujuan diulang di setiap baris)
+    return lines[lines["shipment_id"] == shipment_id].to_csv(index=False)
+
+
+def write_manifests(lines, output_dir, prefix="manifest"):
+    # Satu file CSV per pengiriman; mengembalikan jumlah file yang ditulis
+    os.makedirs(output_dir, exist_ok=True)
+    count = 0
+    for shipment_id, shipment in lines.groupby("shipment_id", sort=False):
+        shipment.to_csv(os.path.join(output_dir, f"{prefix}_{shipment_id:04d}.csv"), index=False)
+        count += 1
+    return count
+
+
+def pending_manifests(status, storage=None):
+    # Manifest untuk semua pesanan pada satu status antrian; pesanan dan pengguna
+    # dibaca dari backend yang sama
+    storage = storage or get_storage()
+    orders = pd.DataFrame(OrderQueue(storage=storage).orders(status))
+    return build_manifests(orders, storage.load_table("users"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Buat manifest pengiriman per reseller dan alamat")
+    parser.add_argument("status", choices=PENDING_STATUSES, help="Status pesanan yang akan diproses")
+    parser.add_argument("--output-dir", default="manifest", help="Direktori untuk file manifest")
+    parser.add_argument("--advance", action="store_true",
+                        help="Pindahkan semua pesanan di manifest ke status berikutnya (satu penulisan)")
+    args = parser.parse_args()
+
+    shipments, lines = pending_manifests(args.status)
+    print(f"{write_manifests(lines, args.output_dir, f'manifest_{args.status}')} manifest ditulis ke {args.output_dir}")
+    if args.advance and not lines.empty:
+        moved = get_order_queue().transition_many(lines["order_id"].tolist(), NEXT_STATUS[args.status])
+        print(f"{len(moved)} dari {len(lines)} pesanan dipindahkan ke {NEXT_STATUS[args.status]}")
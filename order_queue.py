@@ -0,0 +1,86 @@
+import threading
+from itertools import islice
+from storage import ROW_VERSION, ConflictError, get_storage
+from aggregates import get_aggregates
+from event_log import QUEUE_STATUSES, STATUS_EVENTS, get_projections, order_fields
+
+# Urutan status pesanan dan transisi yang diperbolehkan
+ORDER_STATUSES = ["unpacked", "packed", "delivered"]
+NEXT_STATUS = {"unpacked": "packed", "packed": "delivered"}
+PENDING_STATUSES = QUEUE_STATUSES
+
+
+class OrderQueue:
+    """Antrian pesanan per status dengan ID pesanan yang stabil.
+
+    Antrian dibaca dari proyeksi log event (event_log.py), sehingga riwayat pesanan
+    terkirim tidak pernah dibaca; setiap perpindahan status dicatat sebagai event.
+    """
+    def __init__(self, statuses=PENDING_STATUSES, storage=None):
+        self.statuses = tuple(statuses)
+        self._storage = storage
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    def count(self, status):
+        with get_projections(self.storage).current() as projections:
+            return len(projections.queues.state.get(status, {}))
+
+    def get(self, order_id):
+        with get_projections(self.storage).current() as projections:
+            order = projections.queues.find(order_id)
+            return None if order is None else dict(order)
+
+    def page(self, status, page=1, page_size=50):
+        # Mengembalikan list baris pesanan pada halaman tertentu (halaman mulai dari 1)
+        with get_projections(self.storage).current() as projections:
+            orders = projections.queues.state.get(status, {}).values()
+            return [dict(order) for order in islice(orders, (page - 1) * page_size, page * page_size)]
+
+    def orders(self, status):
+        # Semua pesanan pada satu status (untuk manifest pengiriman)
+        with get_projections(self.storage).current() as projections:
+            return [dict(order) for order in projections.queues.state.get(status, {}).values()]
+
+    def transition(self, order_id, new_status):
+        # Pindahkan pesanan ke status berikutnya; False jika status pesanan sudah berubah
+        return bool(self.transition_many([order_id], new_status))
+
+    def transition_many(self, order_ids, new_status):
+        """Pindahkan banyak pesanan ke status berikutnya dalam satu penulisan.
+
+        Pesanan yang tidak ada atau statusnya tidak mendahului new_status dilewati.
+        Mengembalikan list ID pesanan yang dipindahkan; list kosong jika salah satu
+        pesanan diubah pihak lain sejak event terakhir (tidak ada yang ditulis).
+        """
+        storage = self.storage
+        events = get_projections(storage).log
+        with self._lock:
+            rows = [row for row in map(self.get, dict.fromkeys(order_ids))
+                    if row is not None and NEXT_STATUS.get(row["status"]) == new_status]
+            if not rows:
+                return []
+            before = storage.version("orders")
+            with events.recording():
+                try:
+                    # Compare-and-set per baris: gagal jika salah satu baris sudah diubah
+                    storage.update_many(
+                        "orders", "order_id", [row["order_id"] for row in rows], {"status": new_status},
+                        expected_versions={row["order_id"]: row[ROW_VERSION] for row in rows},
+                    )
+                except ConflictError:
+                    return []
+                # Inventaris reseller dan antrian mengikuti event ini saat dibaca berikutnya
+                events.append([(STATUS_EVENTS[new_status], order_fields(row)) for row in rows])
+            get_aggregates().record_status_changes(rows, new_status, before, storage.version("orders"))
+            return [row["order_id"] for row in rows]
+
+_queue = OrderQueue()
+
+
+def get_order_queue():
+    # Antrian pesanan tertunda dipakai bersama oleh tampilan admin dan jasa pengiriman
+    return _queue
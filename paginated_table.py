@@ -0,0 +1,75 @@
+import math
+import streamlit as st
+from storage import query_frame
+from data_cache import get_data_cache
+
+PAGE_SIZES = [25, 50, 100]
+ALL = "(semua)"
+
+
+def table_source(table, storage=None):
+    # Sumber halaman dari tabel penyimpanan: query SQLite atau DataFrame di cache data
+    def fetch(**criteria):
+        try:
+            return get_data_cache().query(table, storage, **criteria)
+        except FileNotFoundError:
+            return None, 0
+    return fetch
+
+
+def frame_source(df):
+    # Sumber halaman dari DataFrame yang sudah ada di memori (misalnya hasil proyeksi)
+    return lambda **criteria: query_frame(df, **criteria)
+
+
+def paginated_table(key, source, columns, search=(), choices=None, sort_columns=None,
+                    empty_message="Belum ada data."):
+    """Tabel berhalaman dengan filter dan urutan yang dijalankan di server.
+
+    Hanya baris pada halaman aktif yang diambil dari sumber dan dikirim ke browser.
+    search: kolom yang dicari sebagai teks; choices: kolom -> daftar nilai untuk filter
+    persis. Mengembalikan jumlah baris yang cocok dengan filter.
+    """
+    choices = choices or {}
+    controls = st.columns(len(search) + len(choices) + 3)
+    contains = {
+        column: controls[i].text_input(f"Cari {column}", key=f"{key}_search_{column}").strip()
+        for i, column in enumerate(search)
+    }
+    equals = {}
+    for i, (column, values) in enumerate(choices.items(), start=len(search)):
+        value = controls[i].selectbox(column, [ALL, *values], key=f"{key}_filter_{column}")
+        if value != ALL:
+            equals[column] = value
+    sort = controls[-3].selectbox("Urutkan", sort_columns or columns, key=f"{key}_sort")
+    descending = controls[-2].toggle("Menurun", key=f"{key}_desc")
+    page_size = controls[-1].selectbox("Baris", PAGE_SIZES, key=f"{key}_size")
+
+    # Filter/urutan berubah: kembali ke halaman pertama
+    page_key = f"{key}_page"
+    signature = (tuple(contains.items()), tuple(equals.items()), sort, descending, page_size)
+    if st.session_state.get(f"{key}_signature") != signature:
+        st.session_state[f"{key}_signature"] = signature
+        st.session_state[page_key] = 1
+
+    def fetch(page):
+        return source(equals=equals, contains=contains, sort=sort, descending=descending,
+                      offset=(page - 1) * page_size, limit=page_size)
+
+    page = st.session_state.get(page_key, 1)
+    rows, total = fetch(page)
+    pages = max(1, math.ceil(total / page_size))
+    if page > pages:
+        # Data berkurang sejak halaman ini dipilih
+        page = st.session_state[page_key] = pages
+        rows, total = fetch(page)
+    if total == 0:
+        st.warning(empty_message if not equals and not any(contains.values()) else "Tidak ada data yang cocok.")
+        return 0
+
+    st.dataframe(rows.reindex(columns=columns), hide_index=True)
+    left, right = st.columns(2)
+    left.number_input(f"Halaman (dari {pages})", min_value=1, max_value=pages, step=1, key=page_key)
+    start = (page - 1) * page_size + 1
+    right.caption(f"Baris {start}–{start + len(rows) - 1} dari {total}")
+    return total
@@ -0,0 +1,255 @@
+import asyncio
+import itertools
+import os
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from instrumentation import get_metrics
+
+# Konfigurasi gateway simulasi dan engine (bisa diganti lewat environment variable)
+GATEWAY_LATENCY = float(os.environ.get("HARMON_GATEWAY_LATENCY", "0.05"))
+GATEWAY_FAILURE_RATE = float(os.environ.get("HARMON_GATEWAY_FAILURE_RATE", "0.0"))
+GATEWAY_DECLINE_RATE = float(os.environ.get("HARMON_GATEWAY_DECLINE_RATE", "0.0"))
+POOL_SIZE = 4
+TIMEOUT = 5.0
+RETRIES = 3
+BACKOFF = 0.1
+# Hasil otorisasi per idempotency key disimpan terbatas: jumlah maksimum dan masa simpan
+# (detik). Key yang sudah dibuang tetap aman karena gateway mendeduplikasi berdasarkan key
+RESULT_CACHE_SIZE = 10000
+RESULT_TTL = 60 * 60
+
+
+class PaymentResult:
+    """Hasil otorisasi pembayaran dari gateway."""
+    def __init__(self, status, method, amount, idempotency_key, reference=None, message="", attempts=0):
+        self.status = status  # "authorized", "declined", "failed", atau "voided"
+        self.method = method
+        self.amount = amount
+        self.idempotency_key = idempotency_key
+        self.reference = reference
+        self.message = message
+        self.attempts = attempts
+
+    @property
+    def authorized(self):
+        return self.status == "authorized"
+
+
+class GatewayError(Exception):
+    """Kesalahan sementara (jaringan/timeout) yang boleh dicoba ulang."""
+
+
+class PaymentGateway(ABC):
+    """Abstract Base Class for Payment Gateways."""
+    @abstractmethod
+    async def connect(self):
+        pass
+
+    @abstractmethod
+    async def authorize(self, connection, method, amount, idempotency_key):
+        pass
+
+    @abstractmethod
+    async def void(self, connection, reference):
+        pass
+
+
+class SimulatedGateway(PaymentGateway):
+    """Gateway lokal pengganti dengan latensi dan tingkat kegagalan yang bisa diatur.
+
+    Seperti gateway sungguhan, charge dicatat per idempotency key sehingga
+    permintaan ulang dengan key yang sama tidak menagih dua kali.
+    """
+    def __init__(self, latency=GATEWAY_LATENCY, failure_rate=GATEWAY_FAILURE_RATE,
+                 decline_rate=GATEWAY_DECLINE_RATE, seed=None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.decline_rate = decline_rate
+        self._random = random.Random(seed)
+        self._charges = {}
+        self._references = itertools.count(1)
+        self.connections_opened = 0
+
+    async def connect(self):
+        await asyncio.sleep(self.latency)  # handshake
+        self.connections_opened += 1
+        return {"id": self.connections_opened}
+
+    async def authorize(self, connection, method, amount, idempotency_key):
+        await asyncio.sleep(self.latency * (0.5 + self._random.random()))
+        if idempotency_key not in self._charges:
+            if self._random.random() < self.decline_rate:
+                self._charges[idempotency_key] = ("declined", None)
+            else:
+                self._charges[idempotency_key] = ("authorized", f"SIM-{next(self._references):08d}")
+        # Kegagalan setelah charge tercatat: respons hilang di jaringan
+        if self._random.random() < self.failure_rate:
+            raise GatewayError("Gateway tidak merespons.")
+        return self._charges[idempotency_key]
+
+    async def void(self, connection, reference):
+        await asyncio.sleep(self.latency)
+        for key, (status, ref) in self._charges.items():
+            if ref == reference:
+                self._charges[key] = ("voided", ref)
+        return True
+
+
+class ConnectionPool:
+    """Pool koneksi gateway yang dipakai ulang antar pembayaran."""
+    def __init__(self, gateway, size=POOL_SIZE):
+        self.gateway = gateway
+        self.size = size
+        self._idle = asyncio.LifoQueue()
+        self._slots = asyncio.Semaphore(size)
+
+    @asynccontextmanager
+    async def connection(self):
+        async with self._slots:
+            connection = self._idle.get_nowait() if not self._idle.empty() else await self.gateway.connect()
+            try:
+                yield connection
+            except (asyncio.TimeoutError, ConnectionError):
+                # Koneksi yang putus atau macet tidak dikembalikan ke pool
+                raise
+            except BaseException:
+                self._idle.put_nowait(connection)
+                raise
+            else:
+                self._idle.put_nowait(connection)
+
+
+class PaymentEngine:
+    """Engine pembayaran asyncio dengan pool koneksi, idempotency key, timeout, dan retry.
+
+    Engine berjalan di event loop pada thread latar belakang sehingga pool koneksi
+    bertahan antar rerun Streamlit; kode sinkron memakai submit()/authorize_sync().
+    """
+    def __init__(self, gateway=None, pool_size=POOL_SIZE, timeout=TIMEOUT, retries=RETRIES, backoff=BACKOFF):
+        self.gateway = gateway or SimulatedGateway()
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self._results = OrderedDict()  # idempotency key -> (waktu simpan, hasil), urut waktu
+        self._inflight = {}
+        self._pool = None
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    @staticmethod
+    def new_idempotency_key():
+        return uuid.uuid4().hex
+
+    async def authorize(self, method, amount, idempotency_key):
+        # Key yang sama selalu menghasilkan satu charge: hasil lama dikembalikan,
+        # permintaan yang masih berjalan ditunggu bersama
+        result = self._cached(idempotency_key)
+        if result is not None:
+            if result.amount != amount:
+                return PaymentResult("failed", method, amount, idempotency_key,
+                                     message="Idempotency key sudah dipakai untuk jumlah berbeda.")
+            return result
+        if idempotency_key not in self._inflight:
+            self._inflight[idempotency_key] = asyncio.ensure_future(
+                self._authorize(method, amount, idempotency_key)
+            )
+        try:
+            return await asyncio.shield(self._inflight[idempotency_key])
+        finally:
+            self._inflight.pop(idempotency_key, None)
+
+    async def _authorize(self, method, amount, idempotency_key):
+        if self._pool is None:
+            self._pool = ConnectionPool(self.gateway, self.pool_size)
+        last_error = None
+        for attempt in range(1, self.retries + 1):
+            start = asyncio.get_running_loop().time()
+            try:
+                async with self._pool.connection() as connection:
+                    status, reference = await asyncio.wait_for(
+                        self.gateway.authorize(connection, method, amount, idempotency_key), self.timeout
+                    )
+                get_metrics().record("payment.authorize", seconds=asyncio.get_running_loop().time() - start)
+                message = "Pembayaran disetujui." if status == "authorized" else "Pembayaran ditolak oleh gateway."
+                result = PaymentResult(status, method, amount, idempotency_key, reference, message, attempt)
+                self._remember(result)
+                return result
+            except (GatewayError, asyncio.TimeoutError, ConnectionError) as error:
+                last_error = error if str(error) else "timeout"
+                await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+        # Tidak disimpan sebagai hasil akhir: percobaan berikutnya dengan key yang sama
+        # tetap aman karena gateway mendeduplikasi berdasarkan key
+        return PaymentResult("failed", method, amount, idempotency_key,
+                             message=f"Gateway gagal setelah {self.retries} percobaan: {last_error}",
+                             attempts=self.retries)
+
+    def _cached(self, idempotency_key):
+        entry = self._results.get(idempotency_key)
+        if entry is None or time.monotonic() - entry[0] > RESULT_TTL:
+            return None
+        return entry[1]
+
+    def _remember(self, result):
+        # Hanya dipanggil dari event loop engine, jadi tidak perlu lock
+        now = time.monotonic()
+        self._results[result.idempotency_key] = (now, result)
+        self._results.move_to_end(result.idempotency_key)
+        while self._results:
+            stored, _ = next(iter(self._results.values()))
+            if len(self._results) <= RESULT_CACHE_SIZE and now - stored <= RESULT_TTL:
+                break
+            self._results.popitem(last=False)
+
+    async def void(self, result):
+        # Batalkan otorisasi, misalnya jika stok ternyata habis saat commit
+        if self._pool is None:
+            self._pool = ConnectionPool(self.gateway, self.pool_size)
+        async with self._pool.connection() as connection:
+            await asyncio.wait_for(self.gateway.void(connection, result.reference), self.timeout)
+        result.status = "voided"
+        return result
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="payment-engine", daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def submit(self, coroutine):
+        # Jalankan coroutine di loop engine; mengembalikan concurrent.futures.Future
+        return asyncio.run_coroutine_threadsafe(coroutine, self._ensure_loop())
+
+    def authorize_sync(self, method, amount, idempotency_key):
+        return self.submit(self.authorize(method, amount, idempotency_key)).result()
+
+    def void_sync(self, result):
+        return self.submit(self.void(result)).result()
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_payment_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PaymentEngine()
+        return _engine
+
+
+def set_payment_engine(engine):
+    # Mengganti engine aktif, misalnya dengan gateway sungguhan
+    global _engine
+    with _engine_lock:
+        _engine = engine
+    return engine
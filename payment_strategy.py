@@ -1,27 +1,45 @@
 from abc import ABC, abstractmethod
+from instrumentation import timed
+from payment_engine import get_payment_engine
 
 
 class PaymentStrategy(ABC):
     """Abstract Base Class for Payment Strategies."""
+    name = None
+
     @abstractmethod
     def pay(self, total_amount):
         pass
 
+    async def pay_async(self, total_amount, idempotency_key, engine=None):
+        # Otorisasi lewat engine pembayaran; key yang sama tidak menagih dua kali
+        engine = engine or get_payment_engine()
+        return await engine.authorize(self.name, total_amount, idempotency_key)
+
 
 class CreditCardPayment(PaymentStrategy):
     """Concrete Strategy for Credit Card Payment."""
+    name = "Kartu Kredit"
+
+    @timed("payment.CreditCardPayment.pay")
     def pay(self, total_amount):
         return f"Pembayaran menggunakan Kartu Kredit sebesar Rp{total_amount} berhasil."
 
 
 class DigitalWalletPayment(PaymentStrategy):
     """Concrete Strategy for Digital Wallet Payment."""
+    name = "Dompet Digital"
+
+    @timed("payment.DigitalWalletPayment.pay")
     def pay(self, total_amount):
         return f"Pembayaran menggunakan Dompet Digital sebesar Rp{total_amount} berhasil."
 
 
 class BankTransferPayment(PaymentStrategy):
     """Concrete Strategy for Bank Transfer Payment."""
+    name = "Transfer Bank"
+
+    @timed("payment.BankTransferPayment.pay")
     def pay(self, total_amount):
         return f"Pembayaran melalui Transfer Bank sebesar Rp{total_amount} berhasil."
 
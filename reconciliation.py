@@ -0,0 +1,181 @@
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from storage import get_storage
+
+# Kolom file settlement dari gateway; method opsional
+SETTLEMENT_COLUMNS = ["reference", "amount", "method"]
+# Selisih nominal (rupiah) yang masih dianggap cocok, untuk pembulatan di sisi gateway
+AMOUNT_TOLERANCE = 0.5
+CATEGORIES = ["matched", "mismatched", "missing_in_settlement", "missing_in_records", "duplicates"]
+RECORD_COLUMNS = ["payment_id", "method", "amount", "status", "reference", "timestamp", "order_total"]
+# Kolom hasil per kategori: potongan dari feed() dan finish() punya kolom berbeda, jadi
+# setiap bagian disamakan dulu sebelum digabung atau di-append ke file yang sama
+RESULT_COLUMNS = {
+    "matched": [*RECORD_COLUMNS, "amount_settlement", "method_settlement", "reason"],
+    "mismatched": [*RECORD_COLUMNS, "amount_settlement", "method_settlement", "reason"],
+    "missing_in_settlement": [*RECORD_COLUMNS, "reason"],
+    "missing_in_records": [*SETTLEMENT_COLUMNS, "reason"],
+    "duplicates": ["source", *RECORD_COLUMNS, "reason"],
+}
+
+
+def load_payment_records(storage=None):
+    # Catatan pembayaran beserta total pesanan yang terhubung lewat payment_id
+    storage = storage or get_storage()
+    try:
+        payments = storage.load_table("payments")
+    except FileNotFoundError:
+        payments = pd.DataFrame(columns=RECORD_COLUMNS[:-1])
+    try:
+        orders = storage.load_table("orders", ["payment_id", "total_harga"])
+        order_totals = orders.groupby("payment_id")["total_harga"].sum() if "payment_id" in orders else pd.Series(dtype=float)
+    except FileNotFoundError:
+        order_totals = pd.Series(dtype=float)
+    payments = payments.copy()
+    payments["reference"] = payments["reference"].astype("string")
+    payments["amount"] = payments["amount"].astype(float)
+    payments["order_total"] = payments["payment_id"].map(order_totals).astype(float)
+    return payments
+
+
+def normalize_settlement(settlement):
+    # Samakan tipe kolom file settlement agar bisa digabung dengan catatan pembayaran
+    missing = {"reference", "amount"} - set(settlement.columns)
+    if missing:
+        raise ValueError(f"Kolom settlement tidak lengkap: {', '.join(sorted(missing))}")
+    settlement = settlement.reindex(columns=SETTLEMENT_COLUMNS)
+    settlement["reference"] = settlement["reference"].astype("string").str.strip()
+    settlement["amount"] = pd.to_numeric(settlement["amount"], errors="coerce")
+    return settlement
+
+
+class Reconciler:
+    """Mencocokkan catatan pembayaran dengan file settlement, potongan demi potongan.
+
+    Catatan pembayaran dimuat sekali dan diindeks berdasarkan reference gateway;
+    setiap potongan settlement dicocokkan secara vektor (get_indexer + NumPy)
+    sehingga file sebesar apa pun bisa diproses dengan memori yang tetap.
+    """
+    def __init__(self, records):
+        records = records.reset_index(drop=True)
+        has_reference = records["reference"].notna()
+        # Reference ganda di catatan sendiri dilaporkan sebagai duplikat
+        duplicated = has_reference & records["reference"].duplicated(keep="first")
+        self.record_duplicates = records[duplicated].assign(source="records", reason="Reference ganda di catatan pembayaran")
+        self.records = records[has_reference & ~duplicated].reset_index(drop=True)
+        self.unreferenced = records[~has_reference]
+        self._index = pd.Index(self.records["reference"])
+        self._seen = np.zeros(len(self.records), dtype=np.int64)
+        self._unknown = set()
+
+    def feed(self, chunk):
+        # Cocokkan satu potongan settlement; mengembalikan dict kategori -> DataFrame
+        chunk = normalize_settlement(chunk).reset_index(drop=True)
+        positions = self._index.get_indexer(chunk["reference"])
+        known = positions >= 0
+
+        # Kemunculan pertama per reference di potongan ini, lalu cek potongan sebelumnya
+        first = ~chunk["reference"].duplicated(keep="first").to_numpy()
+        seen_before = np.zeros(len(chunk), dtype=bool)
+        seen_before[known] = self._seen[positions[known]] > 0
+        seen_before[~known] = chunk["reference"][~known].isin(self._unknown).to_numpy()
+        is_duplicate = ~first | seen_before
+        np.add.at(self._seen, positions[known], 1)
+        self._unknown.update(chunk["reference"][~known & ~is_duplicate].dropna())
+
+        duplicates = chunk[is_duplicate].assign(source="settlement", reason="Reference muncul lebih dari sekali di settlement")
+        missing_in_records = chunk[~known & ~is_duplicate].assign(reason="Tidak ada catatan pembayaran")
+
+        rows = known & ~is_duplicate
+        matched_records = self.records.iloc[positions[rows]].reset_index(drop=True)
+        settled = chunk[rows].reset_index(drop=True)
+        both = matched_records.join(settled[["amount", "method"]].add_suffix("_settlement"))
+        amount_differs = (both["amount_settlement"] - both["amount"]).abs().fillna(np.inf) > AMOUNT_TOLERANCE
+        method_differs = both["method_settlement"].notna() & (both["method_settlement"] != both["method"])
+        voided = both["status"] != "authorized"
+        reason = np.select(
+            [voided, amount_differs, method_differs],
+            ["Pembayaran sudah dibatalkan tetapi diselesaikan gateway",
+             "Nominal berbeda dengan settlement",
+             "Metode pembayaran berbeda dengan settlement"],
+            default="",
+        )
+        both["reason"] = reason
+        return {
+            "matched": both[reason == ""],
+            "mismatched": both[reason != ""],
+            "missing_in_records": missing_in_records,
+            "duplicates": duplicates,
+        }
+
+    def finish(self):
+        # Sisa hasil setelah seluruh settlement diproses
+        not_settled = (self._seen == 0) & (self.records["status"] == "authorized").to_numpy()
+        missing_in_settlement = self.records[not_settled].assign(reason="Tidak ada di settlement")
+        authorized = pd.concat([self.records, self.unreferenced])
+        authorized = authorized[authorized["status"] == "authorized"]
+        order_differs = (authorized["order_total"] - authorized["amount"]).abs().fillna(np.inf) > AMOUNT_TOLERANCE
+        return {
+            "mismatched": authorized[order_differs].assign(reason="Nominal berbeda dengan total pesanan"),
+            "missing_in_settlement": missing_in_settlement,
+            "duplicates": self.record_duplicates,
+        }
+
+
+def _merge(results, parts):
+    for category, frame in parts.items():
+        if not frame.empty:
+            results[category].append(frame)
+
+
+def reconcile(settlement, records=None, storage=None):
+    # Rekonsiliasi di memori; mengembalikan dict kategori -> DataFrame
+    records = load_payment_records(storage) if records is None else records
+    reconciler = Reconciler(records)
+    results = {category: [] for category in CATEGORIES}
+    _merge(results, reconciler.feed(settlement))
+    _merge(results, reconciler.finish())
+    return {
+        category: pd.concat(frames, ignore_index=True).reindex(columns=RESULT_COLUMNS[category])
+        if frames else pd.DataFrame(columns=RESULT_COLUMNS[category])
+        for category, frames in results.items()
+    }
+
+
+def reconcile_file(path, output_dir, records=None, storage=None, chunksize=100000):
+    # Mode streaming: settlement dibaca per potongan dan setiap kategori selain matched
+    # ditulis bertahap ke reconciliation_<kategori>.csv; mengembalikan jumlah baris per kategori
+    records = load_payment_records(storage) if records is None else records
+    reconciler = Reconciler(records)
+    counts = dict.fromkeys(CATEGORIES, 0)
+    paths = {category: os.path.join(output_dir, f"reconciliation_{category}.csv") for category in CATEGORIES}
+    for category_path in paths.values():
+        if os.path.exists(category_path):
+            os.remove(category_path)
+
+    def write(parts):
+        for category, frame in parts.items():
+            counts[category] += len(frame)
+            if frame.empty or category == "matched":
+                continue
+            target = paths[category]
+            frame.reindex(columns=RESULT_COLUMNS[category]).to_csv(
+                target, mode="a", header=not os.path.exists(target), index=False)
+
+    for chunk in pd.read_csv(path, dtype={"reference": str}, chunksize=chunksize):
+        write(reconciler.feed(chunk))
+    write(reconciler.finish())
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rekonsiliasi catatan pembayaran dengan file settlement gateway")
+    parser.add_argument("settlement", help="File CSV settlement (kolom: reference, amount, method)")
+    parser.add_argument("--output-dir", default=".", help="Direktori untuk file hasil rekonsiliasi")
+    parser.add_argument("--chunksize", type=int, default=100000)
+    args = parser.parse_args()
+
+    for category, count in reconcile_file(args.settlement, args.output_dir, chunksize=args.chunksize).items():
+        print(f"{category}: {count}")
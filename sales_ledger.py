@@ -0,0 +1,69 @@
+import threading
+import pandas as pd
+from storage import get_storage
+from event_log import get_projections
+
+
+class SalesLedger:
+    """Buku besar penjualan reseller (append-only) dan inventaris per reseller.
+
+    Inventaris = jumlah barang terkirim (event order_delivered) dikurangi jumlah yang
+    sudah dilaporkan terjual (event sales_reported), per (email reseller, produk);
+    dibaca dari proyeksi log event sehingga tabel pesanan tidak perlu dibaca ulang.
+    """
+    def __init__(self, storage=None):
+        self._storage = storage
+        self._lock = threading.Lock()
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    def _entry(self, email):
+        with get_projections(self.storage).current() as projections:
+            return projections.inventory.items(email)
+
+    def inventory(self, email):
+        # DataFrame stok reseller: product_name, quantity (tersisa), price
+        rows = [
+            {"product_name": product, "quantity": item["delivered"] - item["sold"], "price": item["price"]}
+            for product, item in self._entry(email).items()
+        ]
+        return pd.DataFrame(rows, columns=["product_name", "quantity", "price"])
+
+    def record_sales(self, email, items):
+        # Tambahkan laporan penjualan (list dict product_name, quantity) ke buku besar.
+        # Mengembalikan (berhasil, pesan).
+        with self._lock:
+            entry = self._entry(email)
+            sales = pd.DataFrame(items)
+            sold = sales.groupby("product_name")["quantity"].sum()
+            for product_name, quantity in sold.items():
+                item = entry.get(product_name)
+                available = 0 if item is None else item["delivered"] - item["sold"]
+                if quantity > available:
+                    return False, f"Penjualan {product_name} melebihi stok Anda (tersisa {available})."
+            sales["email"] = email
+            sales["price"] = sales["product_name"].map(lambda p: entry[p]["price"])
+            sales["total_penghasilan"] = sales["quantity"] * sales["price"]
+            sales["timestamp"] = pd.Timestamp.now().isoformat(timespec="seconds")
+
+            events = get_projections(self.storage).log
+            with events.recording():
+                self.storage.append_rows("sales", sales[["email", "product_name", "quantity", "price", "total_penghasilan", "timestamp"]])
+                events.append([("sales_reported", {
+                    "email": email,
+                    "timestamp": sales["timestamp"].iloc[0],
+                    "items": [
+                        {"product_name": row.product_name, "quantity": int(row.quantity), "price": float(row.price)}
+                        for row in sales.itertuples()
+                    ],
+                })])
+        return True, "Laporan berhasil disubmit dan stok telah diperbarui."
+
+
+_ledger = SalesLedger()
+
+
+def get_sales_ledger():
+    return _ledger
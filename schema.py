@@ -0,0 +1,128 @@
+import sys
+import numpy as np
+import pandas as pd
+
+# Kategori tetap; nilai di luar daftar tetap dipertahankan sebagai kategori tambahan
+ORDER_STATUSES = pd.CategoricalDtype(["unpacked", "packed", "delivered"])
+USER_STATUSES = pd.CategoricalDtype(["unverified", "verified"])
+ROLES = pd.CategoricalDtype(["admin", "reseller", "jasa pengiriman"])
+PAYMENT_STATUSES = pd.CategoricalDtype(["authorized", "declined", "failed", "voided"])
+
+# Tipe kolom per tabel:
+# - "str": teks (object), "contact": teks nomor telepon tanpa akhiran ".0"
+# - "category": kategori dari isi data (misalnya nama produk), CategoricalDtype: kategori tetap
+# - "int64": bilangan bulat, "rupiah": nominal dibulatkan ke rupiah utuh (int64)
+# Kolom bilangan bulat yang masih kosong (data lama) dibiarkan float sampai diisi storage.py
+TABLE_SCHEMAS = {
+    "stock": {"Item": "category", "Quantity": "int64", "Price": "rupiah", "row_version": "int64"},
+    "users": {
+        "email": "str", "password": "str", "name": "str", "address": "str", "contact": "contact",
+        "status": USER_STATUSES, "role": ROLES,
+    },
+    "orders": {
+        "order_id": "int64", "email": "str", "product_name": "category", "quantity": "int64",
+        "price": "rupiah", "status": ORDER_STATUSES, "total_harga": "rupiah", "payment_id": "str",
+        "created_at": "str", "row_version": "int64",
+    },
+    "sales": {
+        "email": "str", "product_name": "category", "quantity": "int64", "price": "rupiah",
+        "total_penghasilan": "rupiah", "timestamp": "str",
+    },
+    "payments": {
+        "payment_id": "str", "method": "category", "amount": "rupiah", "status": PAYMENT_STATUSES,
+        "reference": "str", "timestamp": "str",
+    },
+}
+
+
+def read_dtypes(table, strict=True):
+    # Argumen dtype untuk read_csv agar pandas tidak perlu menebak tipe kolom.
+    # strict=False: kolom angka ditebak pandas (file lama dengan sel kosong/bukan angka)
+    dtypes = {}
+    for column, kind in TABLE_SCHEMAS.get(table, {}).items():
+        if kind in ("str", "contact"):
+            dtypes[column] = str
+        elif kind == "category" or isinstance(kind, pd.CategoricalDtype):
+            # Kategori tetap diterapkan setelah dibaca agar nilai tak dikenal tidak hilang
+            dtypes[column] = "category"
+        elif strict:
+            dtypes[column] = "int64" if kind == "int64" else "float64"
+    return dtypes
+
+
+def _categories(series, dtype):
+    # Kategori tetap ditambah nilai yang belum dikenal, agar tidak ada data yang hilang
+    values = series.cat.categories if isinstance(series.dtype, pd.CategoricalDtype) else series.dropna().unique()
+    extra = [value for value in values if value not in set(dtype.categories)]
+    return pd.CategoricalDtype([*dtype.categories, *extra]) if extra else dtype
+
+
+def apply_schema(table, df):
+    # Ubah kolom DataFrame ke tipe registry (di tempat); kolom di luar registry dibiarkan
+    for column, kind in TABLE_SCHEMAS.get(table, {}).items():
+        if column not in df:
+            continue
+        series = df[column]
+        if isinstance(kind, pd.CategoricalDtype):
+            target = _categories(series, kind)
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = series.astype(target)
+            elif not series.cat.categories.equals(target.categories):
+                # astype menganggap dtype tak berurut sama walau urutan kategorinya beda
+                df[column] = series.cat.set_categories(target.categories)
+        elif kind == "category":
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = series.astype("category")
+        elif kind in ("str", "contact"):
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                df[column] = series.astype(object)
+            elif series.dtype != object:
+                # Kolom yang terbaca sebagai angka (misalnya kosong semua atau dari SQLite)
+                series = series.astype(object)
+                df[column] = series.where(series.isna(), series.map(str, na_action="ignore"))
+            if kind == "contact":
+                # Nomor yang dulu tersimpan sebagai float: 98528135127.0 -> 98528135127
+                df[column] = df[column].str.replace(r"\.0$", "", regex=True)
+        elif series.dtype != np.int64:
+            try:
+                numeric = pd.to_numeric(series)
+            except (ValueError, TypeError):
+                continue
+            if numeric.isna().any():
+                df[column] = numeric
+            else:
+                df[column] = (numeric.round() if kind == "rupiah" else numeric).astype("int64")
+    return df
+
+
+def memory_report(storage=None):
+    # Pemakaian memori per tabel: inferensi default pandas (sebelum) vs registry (sesudah)
+    from storage import TABLE_FILES, get_storage
+    storage = storage or get_storage()
+    rows = []
+    for table in TABLE_FILES:
+        try:
+            typed = storage.load_table(table)
+        except FileNotFoundError:
+            continue
+        if hasattr(storage, "path"):
+            before = pd.read_csv(storage.path(table), low_memory=False)
+        else:
+            before = typed.astype({c: object for c in typed.columns if isinstance(typed[c].dtype, pd.CategoricalDtype)})
+        before_bytes = int(before.memory_usage(deep=True).sum())
+        after_bytes = int(typed.memory_usage(deep=True).sum())
+        rows.append({
+            "table": table,
+            "rows": len(typed),
+            "before_kb": round(before_bytes / 1024, 1),
+            "after_kb": round(after_bytes / 1024, 1),
+            "saved_pct": round(100 * (1 - after_bytes / before_bytes), 1) if before_bytes else 0.0,
+        })
+    return pd.DataFrame(rows, columns=["table", "rows", "before_kb", "after_kb", "saved_pct"])
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["report"]:
+        print(memory_report().to_string(index=False))
+    else:
+        print("Penggunaan: python schema.py report")
@@ -0,0 +1,193 @@
+import io
+import json
+import os
+import threading
+import uuid
+import zlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow opsional: tanpa pyarrow snapshot disimpan sebagai kolom .npy
+    feather = None
+
+SNAPSHOT_DIR = "snapshots"
+# Tabel riwayat yang dibaca berulang kali dan mendapat snapshot kolumnar di samping CSV-nya
+SNAPSHOT_TABLES = ("orders", "sales", "payments")
+# Ekor CSV (byte di luar snapshot) yang memicu compaction
+COMPACT_TAIL_BYTES = 1 << 20
+# Jumlah byte sebelum batas snapshot yang dicek untuk memastikan awal file tidak berubah
+BOUNDARY_BYTES = 64
+META_FILE = "meta.json"
+NUMERIC_KINDS = ("integer", "floating", "mixed-integer-float")
+
+
+def _numeric_array(series):
+    # Kolom angka sebagai array NumPy biasa (nullable Int64 dengan NA menjadi float NaN)
+    if series.hasnans and series.dtype.kind in "iub":
+        return series.to_numpy(dtype="float64", na_value=np.nan)
+    return series.to_numpy(dtype=getattr(series.dtype, "numpy_dtype", series.dtype))
+
+
+def _boundary(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - BOUNDARY_BYTES))
+        return zlib.crc32(f.read(min(offset, BOUNDARY_BYTES)))
+
+
+class ColumnarSnapshot:
+    """Snapshot kolumnar biner satu tabel CSV yang dibaca lewat memory map.
+
+    Snapshot mencakup awal file CSV sampai byte tertentu; baris yang di-append
+    sesudahnya (ekor) dibaca dari CSV lalu digabung. File CSV yang ditulis ulang
+    (inode berbeda) membuat snapshot tidak berlaku sampai ditulis lagi. Format:
+    Feather (uncompressed) jika pyarrow terpasang, jika tidak satu file .npy per kolom
+    (kolom teks disimpan sebagai kode kamus int32 + daftar nilai). Kolom teks dibaca
+    sebagai kategori; tipe akhirnya ditentukan registry skema (schema.py).
+    """
+    def __init__(self, directory, csv_path):
+        self.directory = directory
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+
+    def _meta(self):
+        try:
+            with open(os.path.join(self.directory, META_FILE)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _valid(self, meta):
+        # (berlaku, stat CSV saat ini)
+        try:
+            info = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return False, None
+        if meta is None or meta["ino"] != info.st_ino or info.st_size < meta["offset"]:
+            return False, info
+        if meta["format"] == "feather" and feather is None:
+            return False, info
+        return _boundary(self.csv_path, meta["offset"]) == meta["boundary"], info
+
+    def tail_bytes(self):
+        # Ukuran bagian CSV yang belum masuk snapshot
+        meta = self._meta()
+        valid, info = self._valid(meta)
+        if info is None:
+            return 0
+        return info.st_size - meta["offset"] if valid else info.st_size
+
+    def read(self, columns=None):
+        # DataFrame dari snapshot + ekor CSV; None jika snapshot tidak ada/tidak berlaku.
+        # ValueError jika kolom yang diminta tidak ada (sama seperti usecols read_csv)
+        meta = self._meta()
+        valid, info = self._valid(meta)
+        if not valid:
+            return None
+        missing = set(columns or []) - set(meta["columns"])
+        if missing:
+            raise ValueError(f"Kolom tidak ada di snapshot: {', '.join(sorted(missing))}")
+        columns = [c for c in meta["columns"] if columns is None or c in columns]
+        try:
+            if meta["format"] == "feather":
+                table = feather.read_table(os.path.join(self.directory, meta["files"]["feather"]),
+                                           columns=columns, memory_map=True)
+                data = table.to_pandas()
+                # Kode kategori hasil to_pandas() menunjuk langsung ke buffer Arrow yang read-only;
+                # salin (kodenya saja, kecil) agar pemanggil bisa mengubah tabel yang dimuat
+                for column in data.select_dtypes("category"):
+                    data[column] = data[column].copy()
+            else:
+                data = pd.DataFrame({c: self._load_column(meta, c) for c in columns}, columns=columns)
+        except (FileNotFoundError, ValueError, KeyError):
+            # Snapshot sedang diganti oleh penulis lain: baca CSV saja
+            return None
+        if info.st_size > meta["offset"]:
+            with open(self.csv_path, "rb") as f:
+                f.seek(meta["offset"])
+                tail = f.read(info.st_size - meta["offset"])
+            tail = pd.read_csv(io.BytesIO(meta["header"].encode("utf-8") + tail), usecols=columns)
+            data = pd.concat([data, tail], ignore_index=True)
+        return data
+
+    def _load_column(self, meta, column):
+        files = meta["files"][column]
+        if meta["kinds"][column] == "str":
+            # Kode disalin dari memory map agar kolom bisa diubah (kategori tidak menyalin kodenya)
+            codes = np.array(np.load(os.path.join(self.directory, files[0]), mmap_mode="r"))
+            values = np.load(os.path.join(self.directory, files[1])).astype(object)
+            # Dikembalikan sebagai kategori; registry skema menentukan tipe akhirnya
+            return pd.Categorical.from_codes(codes, values)
+        # Salinan dari memory map: hanya kolom yang diminta yang dibaca dari disk
+        return np.array(np.load(os.path.join(self.directory, files[0]), mmap_mode="r"))
+
+    def write(self, df, info=None):
+        # Simpan df sebagai snapshot untuk isi CSV saat ini (info = os.stat CSV yang sesuai df)
+        info = info or os.stat(self.csv_path)
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            generation = uuid.uuid4().hex[:12]
+            meta = {
+                "columns": [str(c) for c in df.columns],
+                "rows": len(df),
+                "ino": info.st_ino,
+                "offset": info.st_size,
+                "boundary": _boundary(self.csv_path, info.st_size),
+                "kinds": {},
+                "files": {},
+            }
+            with open(self.csv_path, "rb") as f:
+                meta["header"] = f.readline().decode("utf-8")
+            written = self._write_feather(df, generation, meta) if feather is not None else False
+            if not written:
+                self._write_npy(df, generation, meta)
+            path = os.path.join(self.directory, META_FILE)
+            with open(path + ".tmp", "w") as f:
+                json.dump(meta, f)
+            os.replace(path + ".tmp", path)
+            # Hapus file generasi lama yang tidak lagi dirujuk meta
+            current = {META_FILE, *[name for files in meta["files"].values() for name in
+                                    ([files] if isinstance(files, str) else files)]}
+            for name in os.listdir(self.directory):
+                if name not in current and not name.endswith(".tmp"):
+                    os.remove(os.path.join(self.directory, name))
+
+    def _write_feather(self, df, generation, meta):
+        name = f"data.{generation}.feather"
+        frame = df.reset_index(drop=True)
+        for column in frame.columns:
+            # Kolom teks disimpan sebagai kamus (kategori terurut seperti hasil read_csv):
+            # lebih kecil, dan nilai kosong tetap NaN saat dibaca
+            if frame[column].dtype == object and pd.api.types.infer_dtype(frame[column], skipna=True) == "string":
+                frame[column] = frame[column].astype("category")
+        try:
+            feather.write_feather(frame, os.path.join(self.directory, name), compression="uncompressed")
+        except (ValueError, TypeError):
+            # Kolom campuran yang tidak bisa dikonversi ke Arrow: pakai format .npy
+            return False
+        meta["format"] = "feather"
+        meta["files"] = {"feather": name}
+        return True
+
+    def _write_npy(self, df, generation, meta):
+        meta["format"] = "npy"
+        for position, column in enumerate(df.columns):
+            series = df[column]
+            base = f"{position}.{generation}"
+            if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in NUMERIC_KINDS:
+                # Angka di kolom object (misalnya hasil concat) disimpan seperti hasil read_csv
+                series = pd.to_numeric(series)
+            if series.dtype.kind in "biufM":
+                np.save(os.path.join(self.directory, f"{base}.npy"), _numeric_array(series))
+                meta["kinds"][column], meta["files"][column] = "num", [f"{base}.npy"]
+            elif series.isna().all():
+                # Kolom kosong dibaca read_csv sebagai float NaN
+                np.save(os.path.join(self.directory, f"{base}.npy"), np.full(len(series), np.nan))
+                meta["kinds"][column], meta["files"][column] = "num", [f"{base}.npy"]
+            else:
+                codes, values = pd.factorize(series.map(str, na_action="ignore"), sort=True)
+                np.save(os.path.join(self.directory, f"{base}.codes.npy"), codes.astype(np.int32))
+                np.save(os.path.join(self.directory, f"{base}.values.npy"), np.asarray(values, dtype=str))
+                meta["kinds"][column] = "str"
+                meta["files"][column] = [f"{base}.codes.npy", f"{base}.values.npy"]
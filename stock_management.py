@@ -1,9 +1,28 @@
+import threading
+import time
+import traceback
+import uuid
 import pandas as pd
 from abc import ABC, abstractmethod
 from payment_strategy import CreditCardPayment, DigitalWalletPayment
+from storage import ROW_VERSION, TABLE_COLUMNS, get_storage, retry_on_conflict
+from aggregates import get_aggregates
+from data_cache import get_data_cache
+from instrumentation import timed
+from payment_engine import get_payment_engine
+from event_log import get_event_log, records
+from jobs import get_job_runner
+
+# Masa berlaku reservasi stok di keranjang (detik) dan jeda pembersihan hold kedaluwarsa
+RESERVATION_TTL = 15 * 60
+SWEEP_INTERVAL = 5.0
 
 # Abstract Class: StockManagement
 class StockManagement(ABC):
+    def __init__(self, storage=None):
+        # Backend penyimpanan (CSV atau SQLite), default mengikuti konfigurasi storage.py
+        self.storage = storage or get_storage()
+
     def manage_stock(self, item=None, quantity=None, price=None):
         self.view_stock()
         if self.can_add_stock():
@@ -14,11 +33,14 @@ class StockManagement(ABC):
         if self.can_delete_stock():
             self.delete_stock()
 
+    @timed("stock.load_data")
     def load_data(self):
-        return pd.read_csv("data_stock.csv")
+        # Dibaca dari cache bersama; salinan agar pemanggil bebas mengubahnya
+        return get_data_cache().load_table("stock", self.storage).copy()
 
+    @timed("stock.save_data")
     def save_data(self, data):
-        data.to_csv("data_stock.csv", index=False)
+        self.storage.save_table("stock", data)
 
     def view_stock(self):
         print("Viewing Stock")
@@ -38,33 +60,196 @@ class StockManagement(ABC):
         pass
 
     def add_stock(self, item, quantity, price):
-        data = self.load_data()
+        events = get_event_log(self.storage)
         new_data = pd.DataFrame({"Item": [item], "Quantity": [quantity], "Price": [price]})
-        data = pd.concat([data, new_data], ignore_index=True)
-        self.save_data(data)
+        with events.recording():
+            self.storage.append_rows("stock", new_data)
+            events.append([("stock_added", {"item": item, "quantity": quantity, "price": price})])
         return "Produk berhasil ditambahkan"
 
-    def edit_stock(self, product_name, updated_quantity, updated_price):
-        data = self.load_data()
-        data.loc[data["Item"] == product_name, "Quantity"] = updated_quantity
-        data.loc[data["Item"] == product_name, "Price"] = updated_price
-        self.save_data(data)
+    def edit_stock(self, product_name, updated_quantity, updated_price, expected_version=None):
+        # expected_version: versi baris saat data ditampilkan; ConflictError jika sudah diubah sesi lain
+        events = get_event_log(self.storage)
+        with events.recording():
+            updated = self.storage.update_rows(
+                "stock", "Item", product_name, {"Quantity": updated_quantity, "Price": updated_price},
+                expected_version=expected_version,
+            )
+            if not updated:
+                # Tidak ada baris yang berubah (misalnya sudah dihapus sesi lain): jangan catat event
+                return f"Produk {product_name} tidak ditemukan"
+            events.append([("stock_updated", {"item": product_name, "quantity": updated_quantity, "price": updated_price})])
         return "Produk berhasil diperbarui"
 
-    def delete_stock(self, product_name):
-        data = self.load_data()
-        data = data[data["Item"] != product_name]
-        self.save_data(data)
+    def delete_stock(self, product_name, expected_version=None):
+        events = get_event_log(self.storage)
+        with events.recording():
+            if not self.storage.delete_rows("stock", "Item", product_name, expected_version=expected_version):
+                return f"Produk {product_name} tidak ditemukan"
+            events.append([("stock_removed", {"item": product_name})])
         return "Produk berhasil dihapus"
 
+    def decrement_stock(self, product_name, quantity):
+        # Pengurangan stok bersifat komutatif: compare-and-set diulang otomatis jika
+        # baris berubah di antara pembacaan dan penulisan. False jika stok tidak cukup
+        events = get_event_log(self.storage)
+
+        def attempt():
+            row = self.storage.load_rows("stock", "Item", [product_name])
+            if row.empty or row["Quantity"].iloc[0] < quantity:
+                return False
+            self.storage.update_rows(
+                "stock", "Item", product_name, {"Quantity": int(row["Quantity"].iloc[0]) - quantity},
+                expected_version=int(row[ROW_VERSION].iloc[0]),
+            )
+            return True
+        with events.recording():
+            if not retry_on_conflict(attempt):
+                return False
+            events.append([("stock_decremented", {"items": {product_name: quantity}})])
+        return True
+
     def update_stock_after_payment(self, product_name, quantity):
-        data = self.load_data()
-        data.loc[data["Item"] == product_name, "Quantity"] -= quantity  # Mengurangi stok berdasarkan jumlah yang dibeli
-        self.save_data(data)
-        print(f"Stok {product_name} telah diperbarui.")
+        # Mengurangi stok berdasarkan jumlah yang dibeli
+        if self.decrement_stock(product_name, quantity):
+            print(f"Stok {product_name} telah diperbarui.")
+        else:
+            print(f"Stok {product_name} tidak mencukupi.")
+
+def _now():
+    # Waktu pesanan/pembayaran dibuat sebagai teks ISO (sama dengan timestamp penjualan)
+    return pd.Timestamp.now().isoformat(timespec="seconds")
+
+
+class CheckoutResult:
+    """Hasil checkout: status, total pembayaran, dan kegagalan per baris keranjang."""
+    def __init__(self, success, total_amount=0, failures=None, message="", payment=None):
+        self.success = success
+        self.total_amount = total_amount
+        self.failures = failures or []
+        self.message = message
+        self.payment = payment
+
+
+def payment_record(payment):
+    # Satu baris tabel payments dari hasil otorisasi gateway
+    return pd.DataFrame([{
+        "payment_id": payment.idempotency_key,
+        "method": payment.method,
+        "amount": payment.amount,
+        "status": payment.status,
+        "reference": payment.reference,
+        "timestamp": _now(),
+    }])
+
+
+class StockReservations:
+    """Reservasi (hold) stok per produk di memori dengan masa berlaku.
+
+    Stok tersedia = stok tersimpan - hold aktif. Hold dibuat dengan lock per produk,
+    jadi reseller yang memesan produk berbeda tidak saling menunggu. Hold kedaluwarsa
+    dilepas oleh thread pembersih di latar belakang.
+    """
+    def __init__(self, ttl=RESERVATION_TTL, sweep_interval=SWEEP_INTERVAL):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._holds = {}  # hold_id -> {"owner", "product_name", "quantity", "expires"}
+        self._held = {}  # product_name -> jumlah yang sedang di-hold
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._quantities = (None, {})
+        self._sweeper = None
+
+    def _lock_for(self, product_name):
+        with self._locks_lock:
+            return self._locks.setdefault(product_name, threading.Lock())
+
+    def _stock_quantity(self, product_name, storage):
+        # Jumlah stok per produk dari cache data, dihitung ulang hanya jika tabel stok berubah
+        storage = storage or get_storage()
+        key = (id(storage), storage.version("stock"))
+        cached_key, quantities = self._quantities
+        if cached_key != key:
+            stock = get_data_cache().load_table("stock", storage)
+            quantities = stock.groupby("Item", observed=True)["Quantity"].sum().to_dict()
+            self._quantities = (key, quantities)
+        return quantities.get(product_name)
+
+    def available(self, product_name, storage=None):
+        quantity = self._stock_quantity(product_name, storage)
+        if quantity is None:
+            return None
+        return int(quantity) - self._held.get(product_name, 0)
+
+    def reserve(self, owner, product_name, quantity, storage=None):
+        # Mengembalikan hold_id, atau None jika stok tersedia tidak mencukupi
+        self._start_sweeper()
+        quantity = int(quantity)
+        with self._lock_for(product_name):
+            available = self.available(product_name, storage)
+            if available is None or quantity > available:
+                return None
+            hold_id = uuid.uuid4().hex
+            self._holds[hold_id] = {
+                "owner": owner,
+                "product_name": product_name,
+                "quantity": quantity,
+                "expires": time.time() + self.ttl,
+            }
+            self._held[product_name] = self._held.get(product_name, 0) + quantity
+            return hold_id
+
+    def active(self, hold_id, owner=None):
+        hold = self._holds.get(hold_id)
+        return hold is not None and hold["expires"] > time.time() and owner in (None, hold["owner"])
+
+    def release(self, hold_id):
+        # Melepas hold (dibatalkan, kedaluwarsa, atau sudah menjadi pengurangan stok)
+        hold = self._holds.pop(hold_id, None)
+        if hold is not None:
+            with self._lock_for(hold["product_name"]):
+                remaining = self._held.get(hold["product_name"], 0) - hold["quantity"]
+                if remaining > 0:
+                    self._held[hold["product_name"]] = remaining
+                else:
+                    self._held.pop(hold["product_name"], None)
+        return hold
+
+    def release_owner(self, owner):
+        for hold_id in [h for h, hold in list(self._holds.items()) if hold["owner"] == owner]:
+            self.release(hold_id)
+
+    def sweep(self, now=None):
+        now = time.time() if now is None else now
+        expired = [h for h, hold in list(self._holds.items()) if hold["expires"] <= now]
+        for hold_id in expired:
+            self.release(hold_id)
+        return len(expired)
+
+    def _start_sweeper(self):
+        with self._locks_lock:
+            if self._sweeper is None:
+                self._sweeper = threading.Thread(target=self._sweep_forever, name="stock-reservations", daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            self.sweep()
+
+
+_reservations = StockReservations()
+
+
+def get_reservations():
+    return _reservations
+
 
 class ResellerStockManagement(StockManagement):
-    def _init_(self):
+    def __init__(self, storage=None):
+        super().__init__(storage)
+        # Reservasi dipakai bersama oleh semua sesi dalam proses yang sama
+        self.reservations = get_reservations()
         self.cart = []
         self.transactions_file = "reseller_products.csv"  # File untuk menyimpan transaksi reseller
 
@@ -93,16 +278,149 @@ class ResellerStockManagement(StockManagement):
         return total_amount
 
     def select_payment_method(self, payment_method, total_amount):
-        payment_method.pay(total_amount)
-        for item in self.cart:
-            self.update_stock_after_payment(item["product_name"], item["quantity"])
-        self.record_transaction()
+        return self.checkout(None, self.cart, payment_method)
+
+    def check_availability(self, cart_df, stock_data):
+        # Bandingkan total permintaan per produk dengan stok dalam satu operasi vektor
+        requested = cart_df.groupby("product_name")["quantity"].transform("sum")
+        available = cart_df["product_name"].map(stock_data.groupby("Item", observed=True)["Quantity"].sum())
+        failures = []
+        for idx in cart_df.index[available.isna() | (requested > available)]:
+            product_name = cart_df.at[idx, "product_name"]
+            if pd.isna(available[idx]):
+                reason = f"Produk {product_name} tidak ditemukan."
+            else:
+                reason = (
+                    f"Stok {product_name} tidak mencukupi "
+                    f"(diminta {int(requested[idx])}, tersedia {int(available[idx])})."
+                )
+            failures.append({"line": int(idx), "product_name": product_name, "reason": reason})
+        return failures
+
+    def reserve(self, email, product_name, quantity):
+        return self.reservations.reserve(email, product_name, quantity, self.storage)
+
+    def available_quantity(self, product_name):
+        return self.reservations.available(product_name, self.storage)
+
+    def confirm_holds(self, email, cart):
+        # Pastikan setiap baris keranjang punya hold aktif; hold yang kedaluwarsa
+        # dibuat ulang selama stok tersedia masih mencukupi
+        failures = []
+        for line, item in enumerate(cart):
+            if self.reservations.active(item.get("hold_id"), email):
+                continue
+            self.reservations.release(item.get("hold_id"))
+            hold_id = self.reserve(email, item["product_name"], item["quantity"])
+            if hold_id is None:
+                failures.append({
+                    "line": line,
+                    "product_name": item["product_name"],
+                    "reason": f"Reservasi {item['product_name']} kedaluwarsa dan stok tidak lagi mencukupi.",
+                })
+            else:
+                item["hold_id"] = hold_id
+        return failures
+
+    def checkout(self, email, cart, payment_method=None, payment=None):
+        # Seluruh keranjang diperiksa sekaligus, lalu pengurangan stok dan pencatatan
+        # pesanan diterapkan dalam satu commit (semua berhasil atau tidak sama sekali).
+        # Keranjang dengan hold tetap dicek ulang terhadap stok saat commit: hold hanya ada
+        # di memori proses ini, sedangkan stok bisa diturunkan admin atau proses lain
+        if not cart:
+            return CheckoutResult(False, message="Keranjang kosong.")
+        cart_df = pd.DataFrame(cart).reset_index(drop=True)
+        total_amount = cart_df["total_harga"].sum()
+        held = "hold_id" in cart_df
+        if held:
+            failures = self.confirm_holds(email, cart)
+            if failures:
+                return CheckoutResult(False, total_amount, failures, "Checkout dibatalkan.")
+        events = get_event_log(self.storage)
+        before = self.storage.version("orders")
+        with events.recording():
+            with self.storage.transaction():
+                stock_data = self.storage.load_rows("stock", "Item", cart_df["product_name"].unique())
+                failures = self.check_availability(cart_df, stock_data)
+                if failures:
+                    return CheckoutResult(False, total_amount, failures, "Checkout dibatalkan.")
+                if payment_method is not None:
+                    payment_method.pay(total_amount)
+                deltas = (-cart_df.groupby("product_name")["quantity"].sum()).to_dict()
+                self.storage.increment_many("stock", "Item", "Quantity", deltas)
+                orders = cart_df.assign(email=email, status="unpacked", created_at=_now())
+                if payment is not None:
+                    # Catatan pembayaran ditulis dalam commit yang sama dengan pesanannya
+                    orders["payment_id"] = payment.idempotency_key
+                    self.storage.append_rows("payments", payment_record(payment))
+                placed = self.storage.append_rows("orders", orders.reindex(columns=TABLE_COLUMNS["orders"]))
+            # Satu event per checkout: pengurangan stok dan pesanan baru dari log yang sama
+            events.append([("order_placed", {"orders": records(placed.drop(columns=["status", ROW_VERSION]))})])
+        if held:
+            # Hold sudah menjadi pengurangan stok
+            for item in cart:
+                self.reservations.release(item["hold_id"])
+        get_aggregates().record_orders(orders, before, self.storage.version("orders"))
+        return CheckoutResult(True, total_amount, message="Transaksi berhasil dicatat.")
+
+    def pay_and_checkout(self, email, cart, payment_method, idempotency_key, engine=None):
+        # Stok baru di-commit setelah otorisasi berhasil: cek ketersediaan, otorisasi
+        # lewat engine asinkron, lalu checkout; otorisasi dibatalkan jika commit gagal
+        if not cart:
+            return CheckoutResult(False, message="Keranjang kosong.")
+        engine = engine or get_payment_engine()
+        cart_df = pd.DataFrame(cart).reset_index(drop=True)
+        total_amount = cart_df["total_harga"].sum()
+        if "hold_id" in cart_df:
+            failures = self.confirm_holds(email, cart)
+        else:
+            stock_data = self.storage.load_rows("stock", "Item", cart_df["product_name"].unique())
+            failures = self.check_availability(cart_df, stock_data)
+        if failures:
+            return CheckoutResult(False, total_amount, failures, "Checkout dibatalkan.")
+
+        payment = engine.submit(payment_method.pay_async(total_amount, idempotency_key, engine)).result()
+        if not payment.authorized:
+            return CheckoutResult(False, total_amount, message=payment.message, payment=payment)
+
+        try:
+            result = self.checkout(email, cart, payment=payment)
+        except Exception as error:
+            traceback.print_exc()
+            if self._payment_recorded(payment):
+                # Pesanan dan pembayaran sudah di-commit (misalnya penulisan event yang gagal):
+                # jangan dibatalkan; log event dilengkapi dari tabel (event_log.reconcile)
+                result = CheckoutResult(True, total_amount, message="Transaksi berhasil dicatat.")
+            else:
+                result = CheckoutResult(False, total_amount, message=f"Checkout gagal: {error or type(error).__name__}.")
+        if not result.success:
+            # Stok berubah di antara pengecekan dan commit, atau commit gagal
+            result.message += self._void(payment, engine)
+        result.payment = payment
+        return result
+
+    def _payment_recorded(self, payment):
+        try:
+            return not self.storage.load_rows("payments", "payment_id", [payment.idempotency_key]).empty
+        except FileNotFoundError:
+            return False
+
+    def _void(self, payment, engine):
+        # Batalkan otorisasi lalu catat pembayarannya; mengembalikan keterangan untuk pesan hasil
+        try:
+            engine.void_sync(payment)
+            message = " Otorisasi pembayaran dibatalkan."
+        except Exception as error:
+            # Status tetap "authorized" di tabel payments sehingga muncul saat rekonsiliasi
+            traceback.print_exc()
+            message = f" Otorisasi pembayaran gagal dibatalkan ({error or type(error).__name__}) dan dicatat untuk rekonsiliasi."
+        self.storage.append_rows("payments", payment_record(payment))
+        return message
 
     def update_stock_after_payment(self, product_name, quantity):
-        # Contoh implementasi: Kurangi stok berdasarkan produk yang dibeli
-        stock_data = pd.read_csv("data_stock.csv")  # Memuat data stok
-        stock_data.loc[stock_data["Item"] == product_name, "Quantity"] -= quantity
-        stock_data.to_csv("data_stock.csv", index=False)  # Simpan perubahan
+        # Kurangi stok berdasarkan produk yang dibeli
+        if not self.decrement_stock(product_name, quantity):
+            return f"Stok untuk {product_name} tidak mencukupi."
         return f"Stok untuk {product_name} berhasil diperbarui."
 
     def record_transaction(self):
@@ -115,14 +433,14 @@ class ResellerStockManagement(StockManagement):
         # Menambahkan kolom 'total_harga' sudah dihitung di add_to_cart
         # Tidak perlu lagi menambahkan total_harga dengan apply function
 
-        # Jika file transaksi sudah ada, tambahkan data baru ke dalamnya
-        try:
-            existing_data = pd.read_csv(self.transactions_file)
-            new_data = pd.concat([existing_data, transaction_data], ignore_index=True)
-            new_data.to_csv(self.transactions_file, index=False)
-        except FileNotFoundError:
-            # Jika file transaksi belum ada, buat file baru
-            transaction_data.to_csv(self.transactions_file, index=False)
+        # Tambahkan data baru ke tabel transaksi (file dibuat jika belum ada)
+        events = get_event_log(self.storage)
+        before = self.storage.version("orders")
+        # Pesanan baru selalu mulai dari antrian pengemasan
+        with events.recording():
+            placed = self.storage.append_rows("orders", transaction_data.assign(status="unpacked", created_at=_now()))
+            events.append([("order_placed", {"orders": records(placed.drop(columns=["status", ROW_VERSION]))})])
+        get_aggregates().record_orders(transaction_data, before, self.storage.version("orders"))
 
         print(f"Transaksi berhasil dicatat dengan total pengeluaran {total_amount}.")
 
@@ -137,19 +455,18 @@ class AdminStockManagement(StockManagement):
         return True
 
     def get_total_expenditure(self):
-        try:
-            # Membaca file transaksi yang telah disimpan oleh reseller
-            transaction_data = pd.read_csv("reseller_products.csv")
-            total_expenditure = transaction_data["price"].sum()
-            return total_expenditure
-        except FileNotFoundError:
-            return 0
+        # Diambil dari agregat yang diperbarui inkremental, bukan dari seluruh file transaksi
+        return get_aggregates().total_expenditure()
 
     def view_transactions(self):
         try:
             # Membaca file transaksi
-            transaction_data = pd.read_csv("reseller_products.csv")
+            transaction_data = get_data_cache().load_table("orders", self.storage)
             return transaction_data
         except FileNotFoundError:
             return pd.DataFrame()  # Jika tidak ada transaksi
 
+    def export_transactions(self, owner=None, fmt="csv", **filters):
+        # Ekspor riwayat transaksi per potongan di tugas latar belakang (filter: email,
+        # status, product_name); mengembalikan ID tugas
+        return get_job_runner().submit("export_table", owner=owner, table="orders", fmt=fmt, **filters)
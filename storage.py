@@ -0,0 +1,903 @@
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+import warnings
+from abc import ABC, abstractmethod
+from contextlib import contextmanager, nullcontext
+import numpy as np
+import pandas as pd
+from instrumentation import instrumented
+from write_behind import DURABILITY, WriteBehindWriter
+from snapshots import COMPACT_TAIL_BYTES, SNAPSHOT_DIR, SNAPSHOT_TABLES, ColumnarSnapshot
+from schema import apply_schema, read_dtypes
+
+# Lokasi data dan backend penyimpanan (bisa diganti lewat environment variable)
+DATA_DIR = os.environ.get("HARMON_DATA_DIR", ".")
+STORAGE_BACKEND = os.environ.get("HARMON_STORAGE", "csv")
+DB_FILE = "harmon.db"
+
+# Nama tabel -> file CSV
+TABLE_FILES = {
+    "stock": "data_stock.csv",
+    "users": "resellers.csv",
+    "orders": "reseller_products.csv",
+    "sales": "sales_ledger.csv",
+    "payments": "payment_records.csv",
+}
+
+# Nama tabel -> kolom yang disimpan
+TABLE_COLUMNS = {
+    "stock": ["Item", "Quantity", "Price", "row_version"],
+    "users": ["email", "password", "name", "address", "contact", "status", "role"],
+    "orders": [
+        "order_id", "email", "product_name", "quantity", "price", "status", "total_harga", "payment_id", "created_at",
+        "row_version",
+    ],
+    "sales": ["email", "product_name", "quantity", "price", "total_penghasilan", "timestamp"],
+    "payments": ["payment_id", "method", "amount", "status", "reference", "timestamp"],
+}
+
+# Kolom ID auto-increment yang stabil (tidak bergeser saat file ditulis ulang)
+TABLE_KEYS = {
+    "orders": "order_id",
+}
+
+# Tabel dengan versi per baris untuk compare-and-set; setiap mutasi baris menaikkan versinya
+ROW_VERSION = "row_version"
+VERSIONED_TABLES = ("stock", "orders")
+# Jumlah percobaan ulang dan jeda awal (detik) untuk perubahan komutatif yang kalah
+# balapan compare-and-set
+CONFLICT_RETRIES = 8
+CONFLICT_BACKOFF = 0.005
+
+
+class ConflictError(Exception):
+    """Baris sudah diubah sesi lain sejak dibaca (compare-and-set gagal)."""
+    def __init__(self, table, key, expected, actual):
+        self.table = table
+        self.key = key
+        self.expected = expected
+        self.actual = actual
+        super().__init__(
+            f"Data {key} sudah diubah oleh pengguna lain (versi {expected}, sekarang {actual}). "
+            "Muat ulang halaman lalu coba lagi."
+        )
+
+
+def retry_on_conflict(operation, attempts=CONFLICT_RETRIES):
+    # Ulangi operasi baca-ubah-tulis yang komutatif (misalnya pengurangan stok)
+    # sampai compare-and-set berhasil
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except ConflictError:
+            if attempt == attempts - 1:
+                raise
+            # Jeda acak yang makin panjang agar sesi yang bersaing tidak bertabrakan lagi
+            time.sleep(random.uniform(0, CONFLICT_BACKOFF * 2 ** attempt))
+
+
+def _fill_row_versions(table, df):
+    # Baris baru atau data lama tanpa kolom versi dimulai dari versi 1
+    if table not in VERSIONED_TABLES:
+        return df
+    if ROW_VERSION not in df:
+        df[ROW_VERSION] = 1
+    else:
+        df[ROW_VERSION] = df[ROW_VERSION].fillna(1).astype("int64")
+    return df
+
+
+def _assign_keys(table, df, start=None):
+    # Isi ID yang belum ada (baris baru, atau data lama sebelum kolom ID diperkenalkan)
+    key = TABLE_KEYS.get(table)
+    if key is None:
+        return df
+    if key not in df:
+        df.insert(0, key, pd.NA)
+    missing = df[key].isna()
+    if missing.any():
+        if start is None:
+            start = int(df[key].max()) + 1 if (~missing).any() else 1
+        df.loc[missing, key] = range(start, start + int(missing.sum()))
+    df[key] = df[key].astype("int64")
+    return df
+
+
+def _to_records(df, columns):
+    # Konversi DataFrame ke list tuple Python (NaN -> None) untuk sqlite3
+    df = df.reindex(columns=columns).astype(object)
+    return df.where(df.notna(), None).values.tolist()
+
+
+def _read_csv(path, table, usecols=None):
+    # Parse CSV dengan tipe dari registry skema; file lama dengan sel angka kosong dibaca ulang
+    try:
+        with warnings.catch_warnings():
+            # Sel kosong di kolom int64 memicu RuntimeWarning sebelum ValueError-nya
+            warnings.simplefilter("ignore", RuntimeWarning)
+            return pd.read_csv(path, usecols=usecols, dtype=read_dtypes(table))
+    except ValueError as exc:
+        if usecols is not None and "Usecols" in str(exc):
+            raise
+        return pd.read_csv(path, usecols=usecols, dtype=read_dtypes(table, strict=False))
+
+
+def query_frame(df, equals=None, contains=None, sort=None, descending=False, offset=0, limit=None):
+    # Filter, urutkan, lalu potong DataFrame; hanya baris halaman yang disalin.
+    # equals: kolom -> nilai persis, contains: kolom -> teks (tanpa beda huruf besar/kecil).
+    # Mengembalikan (halaman, jumlah baris yang cocok)
+    mask = np.ones(len(df), dtype=bool)
+    for column, value in (equals or {}).items():
+        mask &= (df[column] == value).to_numpy()
+    for column, text in (contains or {}).items():
+        if text:
+            mask &= df[column].astype(object).str.contains(text, case=False, regex=False, na=False).to_numpy(dtype=bool)
+    positions = np.flatnonzero(mask)
+    if sort is not None:
+        keys = df[sort].iloc[positions].reset_index(drop=True)
+        positions = positions[keys.sort_values(ascending=not descending, kind="stable").index.to_numpy()]
+    end = None if limit is None else offset + limit
+    return df.iloc[positions[offset:end]], len(positions)
+
+
+class StorageBackend(ABC):
+    """Abstract Base Class for Storage Backends."""
+    @abstractmethod
+    def load_table(self, table, columns=None):
+        # columns: hanya kolom ini yang dibaca (proyeksi kolom)
+        pass
+
+    @abstractmethod
+    def save_table(self, table, df):
+        pass
+
+    @abstractmethod
+    def append_rows(self, table, df):
+        # Mengembalikan baris yang disimpan, termasuk ID dan versi yang diisi backend
+        pass
+
+    @abstractmethod
+    def update_rows(self, table, key_column, key, updates, expected_version=None):
+        pass
+
+    @abstractmethod
+    def update_many(self, table, key_column, keys, updates, expected_versions=None):
+        # Nilai yang sama untuk banyak baris dalam satu penulisan; expected_versions:
+        # key -> versi baris untuk compare-and-set (semua atau tidak sama sekali)
+        pass
+
+    @abstractmethod
+    def delete_rows(self, table, key_column, key, expected_version=None):
+        pass
+
+    @abstractmethod
+    def increment(self, table, key_column, key, column, delta):
+        pass
+
+    @abstractmethod
+    def increment_many(self, table, key_column, column, deltas):
+        pass
+
+    @abstractmethod
+    def load_rows(self, table, key_column, keys):
+        pass
+
+    @abstractmethod
+    def transaction(self):
+        pass
+
+    @abstractmethod
+    def version(self, table):
+        # Penanda perubahan murah untuk cache di memori; hanya berarti di dalam proses ini
+        pass
+
+    @abstractmethod
+    def fingerprint(self, table):
+        # Identitas isi tabel yang sama di semua proses dan setelah restart, untuk data
+        # turunan yang disimpan ke disk; None jika tabel belum ada
+        pass
+
+    def size(self, table):
+        # Ukuran data di disk dalam byte (0 jika tidak diketahui), untuk instrumentasi
+        return 0
+
+    def iter_table(self, table, chunksize=100000):
+        # Tabel per potongan DataFrame (ekspor dengan memori terbatas); backend bisa
+        # membaca per potongan tanpa memuat seluruh tabel
+        data = self.load_table(table)
+        for start in range(0, len(data), chunksize):
+            yield data.iloc[start:start + chunksize]
+
+    # True jika query() dijalankan langsung oleh backend (tanpa memuat seluruh tabel)
+    native_query = False
+
+    def query(self, table, equals=None, contains=None, sort=None, descending=False, offset=0, limit=None):
+        # Satu halaman baris yang cocok beserta jumlah totalnya (lihat query_frame)
+        return query_frame(self.load_table(table), equals, contains, sort, descending, offset, limit)
+
+
+class CsvBackend(StorageBackend):
+    """Concrete Backend yang menyimpan setiap tabel sebagai file CSV."""
+    name = "csv"
+
+    def __init__(self, data_dir=None, durability=None):
+        self.data_dir = data_dir or DATA_DIR
+        self.durability = durability or DURABILITY
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._nesting = 0
+        # Tabel yang diubah di dalam transaksi, ditulis ke disk saat commit
+        self._staged = {}
+        # Baris yang hanya ditambahkan di dalam transaksi, di-append ke file saat commit
+        self._appends = {}
+        # Jumlah penulisan per tabel oleh proses ini dan stat file setelah penulisan terakhir,
+        # dipakai version() untuk membedakan tulisan sendiri dari perubahan proses lain
+        self._generation = {}
+        self._own_stat = {}
+        # Penulis latar belakang yang menggabungkan mutasi (kecuali durabilitas "sync")
+        self._writer = None
+        if self.durability != "sync":
+            self._writer = WriteBehindWriter(self._write_now, self._append_now, self.durability)
+        # Snapshot kolumnar (memory-mapped) untuk tabel riwayat yang besar
+        self._snapshots = {
+            table: ColumnarSnapshot(os.path.join(self.data_dir, SNAPSHOT_DIR, table), self.path(table))
+            for table in SNAPSHOT_TABLES
+        }
+
+    def path(self, table):
+        return os.path.join(self.data_dir, TABLE_FILES[table])
+
+    @instrumented("load_table")
+    def load_table(self, table, columns=None):
+        with self._lock:
+            if self._depth and table in self._appends:
+                # Gabungkan baris tertunda agar transaksi membaca tulisannya sendiri
+                pending = self._appends.pop(table)
+                try:
+                    data = _assign_keys(table, self._read(table))
+                except FileNotFoundError:
+                    data = None
+                self._staged[table] = pd.concat([data, *pending], ignore_index=True)
+            if self._depth and table in self._staged:
+                data = self._staged[table]
+                return (data if columns is None else data.reindex(columns=columns)).copy()
+        if columns is None:
+            return _fill_row_versions(table, _assign_keys(table, self._read(table)))
+        try:
+            data = self._read(table, list(columns))
+        except ValueError:
+            data = None
+        key = TABLE_KEYS.get(table)
+        if data is None or (key in data and data[key].isna().any()):
+            # File lama tanpa sebagian kolom atau ID: baca lengkap lalu pilih kolomnya
+            return self.load_table(table).reindex(columns=columns)
+        return _fill_row_versions(table, data) if ROW_VERSION in data else data
+
+    def _read(self, table, usecols=None):
+        # Isi file ditambah mutasi yang masih antre di penulis latar belakang
+        if self._writer is None:
+            return apply_schema(table, self._read_file(table, usecols))
+        with self._writer.io_lock:
+            frame, appends = self._writer.overlay(table)
+            if frame is None:
+                try:
+                    frame = self._read_file(table, usecols)
+                except FileNotFoundError:
+                    if not appends:
+                        raise
+        frames = [f if usecols is None else f.reindex(columns=usecols) for f in [frame, *appends] if f is not None]
+        return apply_schema(table, pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0].copy())
+
+    def _read_file(self, table, usecols=None):
+        # Snapshot kolumnar + ekor CSV jika ada; selain itu parse seluruh CSV
+        snapshot = self._snapshots.get(table)
+        if snapshot is None:
+            return _read_csv(self.path(table), table, usecols)
+        data = snapshot.read(usecols)
+        if data is not None:
+            return data
+        info = os.stat(self.path(table))
+        data = _read_csv(self.path(table), table, usecols)
+        if usecols is None and info.st_size >= COMPACT_TAIL_BYTES:
+            # File besar tanpa snapshot (misalnya diubah proses lain): buat snapshot dari
+            # hasil parse ini, asalkan file tidak berubah selama dibaca
+            after = os.stat(self.path(table))
+            if (after.st_ino, after.st_size, after.st_mtime_ns) == (info.st_ino, info.st_size, info.st_mtime_ns):
+                snapshot.write(data, info)
+        return data
+
+    def compact(self, table):
+        # Gabungkan ekor CSV ke snapshot kolumnar tabel
+        snapshot = self._snapshots.get(table)
+        if snapshot is None or not os.path.exists(self.path(table)):
+            return 0
+        with self._lock, (self._writer.io_lock if self._writer is not None else nullcontext()):
+            return self._compact(table)
+
+    def _compact(self, table):
+        # Dipanggil saat file tidak sedang ditulis (kunci backend atau io_lock penulis dipegang)
+        info = os.stat(self.path(table))
+        data = self._read_file(table)
+        self._snapshots[table].write(data, info)
+        return len(data)
+
+    def _next_key(self, table):
+        key = TABLE_KEYS[table]
+        try:
+            if self._depth and table in self._staged:
+                ids = self._staged[table][key]
+            else:
+                try:
+                    ids = self._read(table, usecols=[key])[key]
+                except FileNotFoundError:
+                    ids = pd.Series(dtype="int64")
+                if self._depth and table in self._appends:
+                    ids = pd.concat([ids, *(df[key] for df in self._appends[table])])
+        except (ValueError, KeyError):
+            # File belum memiliki kolom ID: ID dibuat dari seluruh tabel
+            ids = self.load_table(table)[key]
+        return int(ids.max()) + 1 if len(ids) else 1
+
+    def size(self, table):
+        try:
+            return os.path.getsize(self.path(table))
+        except FileNotFoundError:
+            return 0
+
+    def iter_table(self, table, chunksize=100000):
+        # Parse CSV per potongan; mutasi yang masih antre ditulis dulu agar file lengkap.
+        # Perubahan dalam transaksi yang belum di-commit tidak ikut dibaca
+        self.flush()
+        key = TABLE_KEYS.get(table)
+        next_key = 1
+        with pd.read_csv(self.path(table), dtype=read_dtypes(table, strict=False), chunksize=chunksize) as reader:
+            for chunk in reader:
+                chunk = apply_schema(table, chunk)
+                if key is not None:
+                    # ID kosong (data lama) diisi berurutan setelah ID terbesar sejauh ini
+                    if key in chunk and chunk[key].notna().any():
+                        next_key = max(next_key, int(chunk[key].max()) + 1)
+                    chunk = _assign_keys(table, chunk, next_key)
+                    next_key = int(chunk[key].max()) + 1
+                yield _fill_row_versions(table, chunk)
+
+    def version(self, table):
+        # (jumlah penulisan oleh proses ini, stat file jika diubah proses lain);
+        # tidak berubah saat penulis latar belakang menulis mutasi yang sudah dihitung.
+        # Dimulai ulang di setiap proses: untuk data yang disimpan ke disk pakai fingerprint()
+        try:
+            info = os.stat(self.path(table))
+            stat = (info.st_mtime_ns, info.st_size)
+        except FileNotFoundError:
+            stat = None
+        own = self._own_stat.setdefault(table, stat)
+        generation = self._generation.get(table, 0)
+        if stat is None and generation == 0:
+            return None
+        return (generation, None if stat == own else stat)
+
+    def fingerprint(self, table):
+        # Stat file setelah mutasi yang antre ditulis: berubah pada setiap penulisan
+        self.flush()
+        try:
+            info = os.stat(self.path(table))
+        except FileNotFoundError:
+            return None
+        return (info.st_ino, info.st_mtime_ns, info.st_size)
+
+    def _mark_written(self, table):
+        self._generation[table] = self._generation.get(table, 0) + 1
+
+    def _record_stat(self, table):
+        info = os.stat(self.path(table))
+        self._own_stat[table] = (info.st_mtime_ns, info.st_size)
+
+    @contextmanager
+    def _mutation(self):
+        # Kunci untuk setiap mutasi. Pada durabilitas "group", pemanggil terluar menunggu
+        # flush yang memuat perubahannya setelah kunci dilepas, sehingga sesi lain tetap
+        # bisa mengantrikan mutasi ke flush yang sama
+        with self._lock:
+            self._nesting += 1
+            try:
+                yield
+            finally:
+                self._nesting -= 1
+                outermost = self._writer is not None and self._nesting == 0 and self._depth == 0
+                ticket = self._writer.sequence if outermost else None
+        if ticket is not None and self.durability == "group":
+            self._writer.wait(ticket)
+
+    def flush(self):
+        # Tulis semua mutasi yang masih antre sekarang juga
+        if self._writer is not None:
+            self._writer.flush()
+
+    @instrumented("load_rows")
+    def load_rows(self, table, key_column, keys):
+        data = self.load_table(table)
+        return data[data[key_column].isin(list(keys))]
+
+    @instrumented("save_table")
+    def save_table(self, table, df):
+        with self._mutation():
+            if self._depth:
+                self._appends.pop(table, None)
+                self._staged[table] = df.reset_index(drop=True)
+            else:
+                self._write(table, df)
+
+    def _write(self, table, df):
+        self._mark_written(table)
+        if self._writer is not None:
+            self._writer.submit(frames={table: df.copy()})
+        else:
+            self._write_now(table, df)
+
+    def _write_now(self, table, df):
+        # Tulis ke file sementara lalu rename agar pembaca tidak melihat file setengah jadi
+        path = self.path(table)
+        df.to_csv(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        self._record_stat(table)
+        self._write_snapshot(table, df)
+
+    def _write_snapshot(self, table, df):
+        # Tabel riwayat: snapshot kolumnar ditulis ulang bersama file CSV-nya
+        if table in self._snapshots:
+            self._snapshots[table].write(df)
+
+    @instrumented("append_rows")
+    def append_rows(self, table, df):
+        with self._mutation():
+            if table in TABLE_KEYS:
+                df = _assign_keys(table, df.copy(), self._next_key(table))
+            df = _fill_row_versions(table, df.copy())
+            if self._depth:
+                if table in self._staged:
+                    self._staged[table] = pd.concat([self._staged[table], df], ignore_index=True)
+                else:
+                    self._appends.setdefault(table, []).append(df)
+            else:
+                self._append_file(table, df)
+            return df
+
+    def _append_file(self, table, df):
+        self._mark_written(table)
+        if self._writer is not None:
+            self._writer.submit(appends={table: df})
+        else:
+            self._append_now(table, df)
+
+    def _append_now(self, table, df):
+        path = self.path(table)
+        if not os.path.exists(path):
+            df.to_csv(path, index=False)
+        else:
+            header = list(pd.read_csv(path, nrows=0).columns)
+            if set(df.columns) <= set(header):
+                # Kolom sesuai header: cukup tambahkan baris di akhir file
+                df.reindex(columns=header).to_csv(path, mode="a", header=False, index=False)
+            else:
+                # Ada kolom baru: tulis ulang file dengan header gabungan
+                existing = _fill_row_versions(table, _assign_keys(table, apply_schema(table, self._read_file(table))))
+                self._write_now(table, pd.concat([existing, df], ignore_index=True))
+        self._record_stat(table)
+        snapshot = self._snapshots.get(table)
+        if snapshot is not None and snapshot.tail_bytes() >= COMPACT_TAIL_BYTES:
+            self._compact(table)
+
+    def _check_version(self, table, data, mask, key, expected_version):
+        if expected_version is None or table not in VERSIONED_TABLES:
+            return
+        actual = data.loc[mask, ROW_VERSION]
+        if (actual != expected_version).any():
+            raise ConflictError(table, key, expected_version, int(actual.max()))
+
+    @instrumented("update_rows")
+    def update_rows(self, table, key_column, key, updates, expected_version=None):
+        with self._mutation():
+            data = self.load_table(table)
+            mask = data[key_column] == key
+            self._check_version(table, data, mask, key, expected_version)
+            for column, value in updates.items():
+                data.loc[mask, column] = value
+            if table in VERSIONED_TABLES:
+                data.loc[mask, ROW_VERSION] += 1
+            self.save_table(table, data)
+            return int(mask.sum())
+
+    @instrumented("update_many")
+    def update_many(self, table, key_column, keys, updates, expected_versions=None):
+        with self._mutation():
+            data = self.load_table(table)
+            mask = data[key_column].isin(keys)
+            if expected_versions and table in VERSIONED_TABLES:
+                expected = data.loc[mask, key_column].map(expected_versions)
+                stale = expected.notna() & (data.loc[mask, ROW_VERSION] != expected)
+                if stale.any():
+                    row = stale.idxmax()
+                    raise ConflictError(table, data.at[row, key_column], int(expected[row]), int(data.at[row, ROW_VERSION]))
+            for column, value in updates.items():
+                data.loc[mask, column] = value
+            if table in VERSIONED_TABLES:
+                data.loc[mask, ROW_VERSION] += 1
+            self.save_table(table, data)
+            return int(mask.sum())
+
+    @instrumented("delete_rows")
+    def delete_rows(self, table, key_column, key, expected_version=None):
+        with self._mutation():
+            data = self.load_table(table)
+            mask = data[key_column] == key
+            self._check_version(table, data, mask, key, expected_version)
+            self.save_table(table, data[~mask])
+            return int(mask.sum())
+
+    def increment(self, table, key_column, key, column, delta):
+        return self.increment_many(table, key_column, column, {key: delta})
+
+    @instrumented("increment_many")
+    def increment_many(self, table, key_column, column, deltas):
+        with self._mutation():
+            data = self.load_table(table)
+            change = data[key_column].map(deltas)
+            mask = change.notna()
+            data.loc[mask, column] += change[mask].astype(data[column].dtype)
+            if table in VERSIONED_TABLES:
+                data.loc[mask, ROW_VERSION] += 1
+            self.save_table(table, data)
+            return int(mask.sum())
+
+    @contextmanager
+    def transaction(self):
+        # Perubahan ditahan di memori lalu ditulis sekaligus (file sementara + rename) saat commit
+        with self._mutation():
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._staged = {}
+                    self._appends = {}
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                staged, self._staged = self._staged, {}
+                appends = {table: pd.concat(frames, ignore_index=True) for table, frames in self._appends.items()}
+                self._appends = {}
+                for table in [*staged, *appends]:
+                    self._mark_written(table)
+                if not staged and not appends:
+                    # Transaksi tanpa perubahan: tidak ada yang perlu ditulis atau ditunggu
+                    return
+                if self._writer is not None:
+                    # Seluruh commit masuk ke antrian dalam satu langkah (satu flush)
+                    self._writer.submit(frames=staged, appends=appends)
+                else:
+                    for table, df in staged.items():
+                        df.to_csv(self.path(table) + ".tmp", index=False)
+                    for table in staged:
+                        os.replace(self.path(table) + ".tmp", self.path(table))
+                        self._record_stat(table)
+                        self._write_snapshot(table, staged[table])
+                    # Tabel yang hanya ditambah cukup di-append, tanpa menulis ulang file
+                    for table, df in appends.items():
+                        self._append_now(table, df)
+
+
+class SqliteBackend(StorageBackend):
+    """Concrete Backend berbasis SQLite dengan tabel terindeks dan transaksi."""
+    name = "sqlite"
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS stock ("Item" TEXT, "Quantity" INTEGER, "Price" INTEGER, '
+        "row_version INTEGER NOT NULL DEFAULT 1)",
+        'CREATE INDEX IF NOT EXISTS idx_stock_item ON stock ("Item")',
+        "CREATE TABLE IF NOT EXISTS users (email TEXT, password TEXT, name TEXT, address TEXT, "
+        "contact TEXT, status TEXT, role TEXT)",
+        "CREATE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+        "CREATE TABLE IF NOT EXISTS orders (order_id INTEGER PRIMARY KEY AUTOINCREMENT, email TEXT, "
+        "product_name TEXT, quantity INTEGER, price REAL, status TEXT, total_harga REAL, payment_id TEXT, "
+        "created_at TEXT, row_version INTEGER NOT NULL DEFAULT 1)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_email ON orders (email)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders (status)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_product ON orders (product_name)",
+        "CREATE TABLE IF NOT EXISTS sales (email TEXT, product_name TEXT, quantity INTEGER, price REAL, "
+        "total_penghasilan REAL, timestamp TEXT)",
+        "CREATE INDEX IF NOT EXISTS idx_sales_email ON sales (email)",
+        "CREATE TABLE IF NOT EXISTS payments (payment_id TEXT, method TEXT, amount REAL, status TEXT, "
+        "reference TEXT, timestamp TEXT)",
+        "CREATE INDEX IF NOT EXISTS idx_payments_id ON payments (payment_id)",
+        "CREATE INDEX IF NOT EXISTS idx_payments_reference ON payments (reference)",
+    ]
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(DATA_DIR, DB_FILE)
+        self.data_dir = os.path.dirname(self.db_path) or "."
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._versions = dict.fromkeys(TABLE_FILES, 0)
+        # Satu koneksi dipakai bersama oleh semua sesi Streamlit, diserialisasi dengan lock
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self.transaction():
+            for statement in self.SCHEMA:
+                self._conn.execute(statement)
+            self._add_missing_columns()
+
+    def _add_missing_columns(self):
+        # Database lama: tambahkan kolom yang diperkenalkan setelah tabel dibuat
+        for table, columns in TABLE_COLUMNS.items():
+            existing = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            for column in columns:
+                if column not in existing:
+                    definition = " INTEGER NOT NULL DEFAULT 1" if column == ROW_VERSION else ""
+                    self._conn.execute(f'ALTER TABLE {table} ADD COLUMN "{column}"{definition}')
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self._conn.execute("COMMIT")
+
+    def _columns(self, table):
+        return TABLE_COLUMNS[table]
+
+    def version(self, table):
+        # Penghitung lokal + data_version (berubah jika proses lain melakukan commit);
+        # keduanya dimulai ulang di setiap koneksi, jadi tidak untuk disimpan ke disk
+        with self._lock:
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            return (self._versions[table], data_version)
+
+    def fingerprint(self, table):
+        # Jumlah baris, rowid terbesar, dan total versi baris: setiap append, delete,
+        # dan mutasi tabel berversi mengubah salah satunya
+        versions = f", total({ROW_VERSION})" if table in VERSIONED_TABLES else ""
+        with self._lock:
+            return tuple(self._conn.execute(f"SELECT count(*), max(rowid){versions} FROM {table}").fetchone())
+
+    def _touch(self, table):
+        self._versions[table] += 1
+
+    @instrumented("load_table")
+    def load_table(self, table, columns=None):
+        names = ", ".join(f'"{c}"' for c in (columns or self._columns(table)))
+        with self._lock:
+            return apply_schema(table, pd.read_sql_query(f"SELECT {names} FROM {table} ORDER BY rowid", self._conn))
+
+    def iter_table(self, table, chunksize=100000):
+        # Koneksi baca sendiri (WAL): satu snapshot konsisten tanpa menahan kunci
+        # koneksi bersama selama potongan diproses pemanggil
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            names = ", ".join(f'"{c}"' for c in self._columns(table))
+            for chunk in pd.read_sql_query(f"SELECT {names} FROM {table} ORDER BY rowid", conn, chunksize=chunksize):
+                yield apply_schema(table, chunk)
+        finally:
+            conn.close()
+
+    @instrumented("load_rows")
+    def load_rows(self, table, key_column, keys):
+        keys = list(keys)
+        columns = ", ".join(f'"{c}"' for c in self._columns(table))
+        params = ", ".join("?" for _ in keys)
+        with self._lock:
+            return apply_schema(table, pd.read_sql_query(
+                f'SELECT {columns} FROM {table} WHERE "{key_column}" IN ({params}) ORDER BY rowid',
+                self._conn,
+                params=keys,
+            ))
+
+    native_query = True
+
+    @instrumented("query")
+    def query(self, table, equals=None, contains=None, sort=None, descending=False, offset=0, limit=None):
+        # Filter, urutan, dan LIMIT/OFFSET dijalankan SQLite; hanya baris halaman yang dibaca
+        columns = self._columns(table)
+        unknown = {*(equals or {}), *(contains or {}), *([sort] if sort else [])} - set(columns)
+        if unknown:
+            raise ValueError(f"Kolom tidak dikenal: {', '.join(sorted(unknown))}")
+        where, params = [], []
+        for column, value in (equals or {}).items():
+            where.append(f'"{column}" = ?')
+            params.append(value)
+        for column, text in (contains or {}).items():
+            if text:
+                escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+                where.append(f'"{column}" LIKE ? ESCAPE \'\\\'')
+                params.append(f"%{escaped}%")
+        clause = f" WHERE {' AND '.join(where)}" if where else ""
+        order = f' ORDER BY "{sort}" {"DESC" if descending else "ASC"}, rowid' if sort else " ORDER BY rowid"
+        names = ", ".join(f'"{c}"' for c in columns)
+        with self._lock:
+            total = self._conn.execute(f"SELECT COUNT(*) FROM {table}{clause}", params).fetchone()[0]
+            page = pd.read_sql_query(
+                f"SELECT {names} FROM {table}{clause}{order} LIMIT ? OFFSET ?",
+                self._conn,
+                params=[*params, -1 if limit is None else limit, offset],
+            )
+        return apply_schema(table, page), total
+
+    @instrumented("save_table")
+    def save_table(self, table, df):
+        with self.transaction():
+            self._touch(table)
+            self._conn.execute(f"DELETE FROM {table}")
+            self.append_rows(table, df)
+
+    @instrumented("append_rows")
+    def append_rows(self, table, df):
+        columns = self._columns(table)
+        names = ", ".join(f'"{c}"' for c in columns)
+        params = ", ".join("?" for _ in columns)
+        df = _fill_row_versions(table, df.copy())
+        with self.transaction():
+            self._touch(table)
+            if table in TABLE_KEYS:
+                # ID diisi di dalam transaksi agar baris yang disimpan bisa dikembalikan
+                key = TABLE_KEYS[table]
+                start = self._conn.execute(f"SELECT COALESCE(MAX({key}), 0) + 1 FROM {table}").fetchone()[0]
+                if key in df and df[key].notna().any():
+                    start = max(start, int(df[key].max()) + 1)
+                df = _assign_keys(table, df, start)
+            self._conn.executemany(
+                f"INSERT INTO {table} ({names}) VALUES ({params})",
+                _to_records(df, columns),
+            )
+        return df
+
+    def _versioned(self, table, expected_version):
+        # Klausa WHERE tambahan untuk compare-and-set dan SET untuk menaikkan versi baris
+        if table not in VERSIONED_TABLES:
+            return "", [], ""
+        bump = f", {ROW_VERSION} = {ROW_VERSION} + 1"
+        if expected_version is None:
+            return "", [], bump
+        return f" AND {ROW_VERSION} = ?", [int(expected_version)], bump
+
+    def _raise_conflict(self, table, key_column, key, expected_version):
+        # Dipanggil jika compare-and-set tidak mengubah baris: konflik jika barisnya masih ada
+        row = self._conn.execute(
+            f'SELECT MAX({ROW_VERSION}) FROM {table} WHERE "{key_column}" = ?', (key,)
+        ).fetchone()
+        if row[0] is not None:
+            raise ConflictError(table, key, expected_version, row[0])
+
+    @instrumented("update_rows")
+    def update_rows(self, table, key_column, key, updates, expected_version=None):
+        assignments = ", ".join(f'"{c}" = ?' for c in updates)
+        condition, params, bump = self._versioned(table, expected_version)
+        with self.transaction():
+            self._touch(table)
+            cursor = self._conn.execute(
+                f'UPDATE {table} SET {assignments}{bump} WHERE "{key_column}" = ?{condition}',
+                [*updates.values(), key, *params],
+            )
+            if cursor.rowcount == 0 and condition:
+                self._raise_conflict(table, key_column, key, expected_version)
+            return cursor.rowcount
+
+    @instrumented("update_many")
+    def update_many(self, table, key_column, keys, updates, expected_versions=None):
+        assignments = ", ".join(f'"{c}" = ?' for c in updates)
+        expected_versions = expected_versions or {}
+        count = 0
+        with self.transaction():
+            self._touch(table)
+            for key in keys:
+                condition, params, bump = self._versioned(table, expected_versions.get(key))
+                cursor = self._conn.execute(
+                    f'UPDATE {table} SET {assignments}{bump} WHERE "{key_column}" = ?{condition}',
+                    [*updates.values(), key, *params],
+                )
+                if cursor.rowcount == 0 and condition:
+                    # Rollback seluruh batch
+                    self._raise_conflict(table, key_column, key, expected_versions[key])
+                count += cursor.rowcount
+        return count
+
+    @instrumented("delete_rows")
+    def delete_rows(self, table, key_column, key, expected_version=None):
+        condition, params, _ = self._versioned(table, expected_version)
+        with self.transaction():
+            self._touch(table)
+            cursor = self._conn.execute(
+                f'DELETE FROM {table} WHERE "{key_column}" = ?{condition}', [key, *params]
+            )
+            if cursor.rowcount == 0 and condition:
+                self._raise_conflict(table, key_column, key, expected_version)
+            return cursor.rowcount
+
+    @instrumented("increment")
+    def increment(self, table, key_column, key, column, delta):
+        _, _, bump = self._versioned(table, None)
+        with self.transaction():
+            self._touch(table)
+            cursor = self._conn.execute(
+                f'UPDATE {table} SET "{column}" = "{column}" + ?{bump} WHERE "{key_column}" = ?',
+                (delta, key),
+            )
+            return cursor.rowcount
+
+    @instrumented("increment_many")
+    def increment_many(self, table, key_column, column, deltas):
+        _, _, bump = self._versioned(table, None)
+        with self.transaction():
+            self._touch(table)
+            for key, delta in deltas.items():
+                self._conn.execute(
+                    f'UPDATE {table} SET "{column}" = "{column}" + ?{bump} WHERE "{key_column}" = ?',
+                    (delta, key),
+                )
+        return len(deltas)
+
+
+BACKENDS = {
+    "csv": CsvBackend,
+    "sqlite": SqliteBackend,
+}
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage():
+    # Backend dipakai bersama oleh seluruh proses (semua sesi Streamlit)
+    global _storage
+    with _storage_lock:
+        if _storage is None:
+            _storage = BACKENDS[STORAGE_BACKEND]()
+        return _storage
+
+
+def set_storage(backend):
+    # Mengganti backend aktif, misalnya untuk membandingkan CSV dan SQLite
+    global _storage
+    with _storage_lock:
+        _storage = backend
+    return backend
+
+
+def migrate_csv_to_sqlite(data_dir=None, db_path=None):
+    # Migrasi satu kali: salin isi semua file CSV ke database SQLite
+    source = CsvBackend(data_dir)
+    target = SqliteBackend(db_path or os.path.join(source.data_dir, DB_FILE))
+    counts = {}
+    with target.transaction():
+        for table in TABLE_FILES:
+            try:
+                df = source.load_table(table)
+            except FileNotFoundError:
+                df = pd.DataFrame(columns=TABLE_COLUMNS[table])
+            target.save_table(table, df)
+            counts[table] = len(df)
+    return counts
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["migrate"]:
+        for table, count in migrate_csv_to_sqlite().items():
+            print(f"{table}: {count} baris dimigrasikan")
+    elif sys.argv[1:] == ["compact"]:
+        backend = CsvBackend()
+        for table in SNAPSHOT_TABLES:
+            print(f"{table}: {backend.compact(table)} baris di snapshot")
+    else:
+        print("Penggunaan: python storage.py migrate|compact")
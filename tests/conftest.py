@@ -0,0 +1,70 @@
+import os
+import sys
+import threading
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import aggregates
+import jobs
+import storage as storage_module
+from storage import CsvBackend, SqliteBackend, TABLE_FILES, set_storage
+
+STOCK = pd.DataFrame({"Item": ["Sneaker A", "Boot B"], "Quantity": [5, 2], "Price": [120000, 200000]})
+USERS = pd.DataFrame([{"email": "halo@gmail.com", "password": "x", "name": "Halo", "address": "Jl. Mawar 1",
+                       "contact": "0812", "status": "active", "role": "reseller"}])
+
+
+def seed(data_dir):
+    # Data awal minimal: stok dua produk dan satu reseller
+    STOCK.to_csv(os.path.join(data_dir, TABLE_FILES["stock"]), index=False)
+    USERS.to_csv(os.path.join(data_dir, TABLE_FILES["users"]), index=False)
+
+
+@pytest.fixture
+def make_storage(tmp_path, monkeypatch):
+    # Backend di direktori sementara, dipasang sebagai storage aktif dengan agregatnya sendiri
+    previous = storage_module._storage
+    # Agregat proses dengan path default (di direktori aplikasi) tidak boleh tersentuh tes
+    default_aggregates = aggregates._aggregates
+    created = []
+
+    def make(kind="csv", durability="sync", directory="data"):
+        data_dir = tmp_path / directory
+        data_dir.mkdir(exist_ok=True)
+        if kind == "csv":
+            seed(data_dir)
+            storage = CsvBackend(str(data_dir), durability=durability)
+        else:
+            storage = SqliteBackend(str(data_dir / "harmon.db"))
+            storage.save_table("stock", STOCK)
+            storage.save_table("users", USERS)
+        set_storage(storage)
+        monkeypatch.setattr(aggregates, "_aggregates", aggregates.SalesAggregates(storage))
+        created.append(storage)
+        return storage
+
+    yield make
+    for storage in created:
+        if isinstance(storage, CsvBackend):
+            storage.flush()
+    set_storage(previous)
+    assert not default_aggregates._dirty, "tes menulis ke agregat default di luar tmp_path"
+
+
+@pytest.fixture
+def job_runner(tmp_path, monkeypatch):
+    # Runner tugas dengan direktori sementara, dipasang sebagai runner aktif
+    runner = jobs.JobRunner(str(tmp_path / "jobs"))
+    monkeypatch.setattr(jobs, "_runner", runner)
+    return runner
+
+
+def finishes(func, timeout=5.0):
+    # Jalankan func di thread terpisah; (selesai, hasil) agar tes tidak ikut macet
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault("value", func()), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    return not thread.is_alive(), result.get("value")
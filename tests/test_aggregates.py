@@ -0,0 +1,57 @@
+import pandas as pd
+import pytest
+from aggregates import SalesAggregates
+from storage import CsvBackend, SqliteBackend, get_storage
+
+
+def order(price):
+    return pd.DataFrame([{"email": "halo@gmail.com", "product_name": "Sneaker A", "quantity": 1, "price": price,
+                          "status": "unpacked", "total_harga": price}])
+
+
+def reopen(storage):
+    # Backend baru pada data yang sama, seperti proses lain (versi di memori mulai dari awal)
+    return CsvBackend(storage.data_dir, durability="sync") if isinstance(storage, CsvBackend) else SqliteBackend(storage.db_path)
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_saved_aggregates_stale_after_other_process_writes(make_storage, kind):
+    storage = make_storage(kind)
+    storage.append_rows("orders", order(120000.0))
+    path = str(storage.data_dir) + "/aggregates.json"
+    assert SalesAggregates(reopen(storage), path).rebuild()["total"]["price"] == 120000.0
+
+    reopen(storage).append_rows("orders", order(999999.0))
+
+    later = SalesAggregates(reopen(storage), path)
+    assert later.total_expenditure() == 1119999.0
+    assert later.verify()
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_unsaved_increment_is_not_trusted_after_restart(make_storage, kind):
+    make_storage(kind).append_rows("orders", order(120000.0))
+    storage = reopen(get_storage())
+    path = str(storage.data_dir) + "/aggregates.json"
+    first = SalesAggregates(storage, path)
+    first.rebuild()
+    # Pesanan tercatat inkremental tapi proses berhenti sebelum file agregat disimpan
+    before = storage.version("orders")
+    storage.append_rows("orders", order(50000.0))
+    first.record_orders(order(50000.0), before, storage.version("orders"))
+
+    later = SalesAggregates(reopen(storage), path)
+    assert later.total_expenditure() == 170000.0
+
+
+def test_saved_aggregates_reused_when_unchanged(make_storage):
+    storage = make_storage()
+    storage.append_rows("orders", order(120000.0))
+    path = str(storage.data_dir) + "/aggregates.json"
+    SalesAggregates(storage, path).rebuild()
+    with open(path) as f:
+        saved = f.read()
+    later = SalesAggregates(reopen(storage), path)
+    assert later.total_expenditure() == 120000.0
+    with open(path) as f:
+        assert f.read() == saved
@@ -0,0 +1,49 @@
+import pytest
+from conftest import finishes
+from stock_management import AdminStockManagement, ResellerStockManagement, StockReservations
+
+CART = [{"product_name": "Sneaker A", "price": 120000, "quantity": 2, "total_harga": 240000}]
+
+
+def order_count(storage):
+    try:
+        return len(storage.load_table("orders"))
+    except FileNotFoundError:
+        return 0
+
+
+@pytest.mark.parametrize("durability", ["sync", "group", "async"])
+def test_oversell_checkout_reports_failure(make_storage, durability):
+    storage = make_storage(durability=durability)
+    cart = [{"product_name": "Boot B", "quantity": 3, "total_harga": 600000}]
+    done, result = finishes(lambda: ResellerStockManagement(storage).checkout("halo@gmail.com", cart))
+    assert done
+    assert not result.success
+    assert "tidak mencukupi" in result.failures[0]["reason"]
+    assert storage.load_table("stock").set_index("Item").at["Boot B", "Quantity"] == 2
+
+
+def test_checkout_records_order(make_storage):
+    storage = make_storage(durability="group")
+    result = ResellerStockManagement(storage).checkout("halo@gmail.com", [dict(line) for line in CART])
+    assert result.success
+    storage.flush()
+    assert storage.load_table("stock").set_index("Item").at["Sneaker A", "Quantity"] == 3
+    assert storage.load_table("orders")["status"].tolist() == ["unpacked"]
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_held_checkout_rechecks_stock_lowered_after_hold(make_storage, kind):
+    storage = make_storage(kind=kind)
+    reseller = ResellerStockManagement(storage)
+    reseller.reservations = StockReservations()
+    hold_id = reseller.reserve("halo@gmail.com", "Boot B", 2)
+    assert hold_id is not None
+    # Admin menurunkan stok setelah hold dibuat; hold di memori masih aktif
+    AdminStockManagement(storage).edit_stock("Boot B", 1, 200000)
+    cart = [{"product_name": "Boot B", "price": 200000, "quantity": 2, "total_harga": 400000, "hold_id": hold_id}]
+    result = reseller.checkout("halo@gmail.com", cart)
+    assert not result.success
+    assert "tidak mencukupi" in result.failures[0]["reason"]
+    assert storage.load_table("stock").set_index("Item").at["Boot B", "Quantity"] == 1
+    assert order_count(storage) == 0
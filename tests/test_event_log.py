@@ -0,0 +1,158 @@
+import threading
+import pytest
+import stock_management
+from event_log import ANY, ROLLUP_GRAINS, EventLog, bucket_of, get_event_log, get_projections, verify
+from order_queue import OrderQueue
+from sales_ledger import SalesLedger
+from stock_management import ResellerStockManagement
+
+CART = [{"product_name": "Sneaker A", "price": 120000, "quantity": 2, "total_harga": 240000}]
+
+
+@pytest.fixture
+def lose_events():
+    # Penulisan event gagal setelah tabel di-commit (misalnya disk penuh atau proses berhenti).
+    # Patch terpisah dari monkeypatch tes: mengembalikan fungsi yang hanya memulihkan append
+    patch = pytest.MonkeyPatch()
+
+    def lose():
+        def fail(self, events):
+            raise OSError("log event tidak bisa ditulis")
+        patch.setattr(EventLog, "append", fail)
+        return patch.undo
+    yield lose
+    patch.undo()
+
+
+def test_rebuild_repairs_order_missing_from_log(make_storage, lose_events):
+    storage = make_storage()
+    projections = get_projections(storage)
+    restore = lose_events()
+    with pytest.raises(OSError):
+        ResellerStockManagement(storage).checkout("halo@gmail.com", [dict(line) for line in CART])
+    restore()
+    assert len(storage.load_table("orders")) == 1
+    assert set(verify(projections, storage)) >= {"stock", "queues"}
+
+    assert projections.rebuild(storage) > 0
+    assert verify(projections, storage) == []
+    assert OrderQueue(storage=storage).transition_many([1], "packed") == [1]
+
+
+def test_rebuild_repairs_lost_status_change(make_storage, lose_events):
+    storage = make_storage()
+    projections = get_projections(storage)
+    ResellerStockManagement(storage).checkout("halo@gmail.com", [dict(line) for line in CART])
+    queue = OrderQueue(storage=storage)
+    restore = lose_events()
+    with pytest.raises(OSError):
+        queue.transition_many([1], "packed")
+    restore()
+    # Versi baris di tabel sudah naik: compare-and-set dari proyeksi selalu gagal
+    assert queue.transition_many([1], "packed") == []
+    assert "queues" in verify(projections, storage)
+
+    projections.rebuild(storage)
+    assert verify(projections, storage) == []
+    assert queue.transition_many([1], "delivered") == [1]
+    with projections.current():
+        assert projections.inventory.items("halo@gmail.com")["Sneaker A"]["delivered"] == 2
+
+
+def test_reconcile_reports_missing_sales(make_storage, lose_events):
+    storage = make_storage()
+    projections = get_projections(storage)
+    ResellerStockManagement(storage).checkout("halo@gmail.com", [dict(line) for line in CART])
+    queue = OrderQueue(storage=storage)
+    queue.transition_many([1], "packed")
+    queue.transition_many([1], "delivered")
+    restore = lose_events()
+    with pytest.raises(OSError):
+        SalesLedger(storage).record_sales("halo@gmail.com", [{"product_name": "Sneaker A", "quantity": 1}])
+    restore()
+    assert "inventory" in verify(projections, storage)
+
+    assert projections.rebuild(storage) == 1
+    assert verify(projections, storage) == []
+    assert projections.rebuild(storage) == 0
+
+
+def test_appends_from_two_processes_keep_sequence(make_storage):
+    storage = make_storage()
+    path = get_event_log(storage).path
+    logs = [EventLog(path), EventLog(path)]
+
+    def write(log):
+        for i in range(50):
+            log.append([("stock_added", {"item": f"X{i}", "quantity": 1, "price": 1})])
+    threads = [threading.Thread(target=write, args=(log,)) for log in logs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seqs = [event["seq"] for _, event in logs[0].read()]
+    assert seqs == list(range(1, len(seqs) + 1))
+
+
+def test_exclusive_waits_for_writers(make_storage):
+    log = get_event_log(make_storage())
+    order = []
+    entered = threading.Event()
+
+    def writer():
+        with log.recording():
+            entered.set()
+            threading.Event().wait(0.2)
+            order.append("writer")
+    thread = threading.Thread(target=writer)
+    thread.start()
+    entered.wait()
+    with log.exclusive():
+        order.append("reconcile")
+    thread.join()
+    assert order == ["writer", "reconcile"]
+
+
+def expected_cube(frame, when, amount):
+    # Kubus rollup yang dihitung ulang dari tabel dengan groupby biasa
+    frame = frame.astype({"product_name": object, "email": object})
+    frame = frame.assign(day=frame[when].astype(str).str[:10], amount=frame[amount].astype(float))
+    cube = {}
+    for grain in ROLLUP_GRAINS:
+        frame["bucket"] = frame["day"].map(lambda day: bucket_of(grain, day))
+        cube[grain] = {}
+        for product, email in [("product_name", "email"), ("product_name", None), (None, "email"), (None, None)]:
+            keys = [frame["bucket"], frame[product] if product else ANY, frame[email] if email else ANY]
+            grouped = frame.assign(product=keys[1], reseller=keys[2]).groupby(["bucket", "product", "reseller"])
+            totals = grouped.agg(count=("quantity", "size"), quantity=("quantity", "sum"), amount=("amount", "sum"))
+            for (bucket, product_name, reseller), row in totals.iterrows():
+                cube[grain].setdefault(bucket, {})[f"{product_name}\t{reseller}"] = [
+                    int(row["count"]), int(row["quantity"]), float(row["amount"])]
+    return cube
+
+
+def test_rollups_match_tables_after_checkout_status_changes_and_rebuild(make_storage, monkeypatch):
+    storage = make_storage()
+    projections = get_projections(storage)
+    times = iter(["2024-06-02T09:00:00", "2024-06-03T10:00:00", "2024-06-30T23:59:59", "2024-07-01T08:00:00"])
+    monkeypatch.setattr(stock_management, "_now", lambda: next(times))
+    reseller = ResellerStockManagement(storage)
+    for email, product, quantity in [("halo@gmail.com", "Sneaker A", 2), ("lain@gmail.com", "Boot B", 1),
+                                     ("halo@gmail.com", "Boot B", 1), ("halo@gmail.com", "Sneaker A", 1)]:
+        price = 120000 if product == "Sneaker A" else 200000
+        assert reseller.checkout(email, [{"product_name": product, "price": price, "quantity": quantity,
+                                          "total_harga": price * quantity}]).success
+    queue = OrderQueue(storage=storage)
+    assert queue.transition_many([1, 3], "packed") == [1, 3]
+    assert queue.transition_many([1], "delivered") == [1]
+    assert SalesLedger(storage).record_sales("halo@gmail.com", [{"product_name": "Sneaker A", "quantity": 1}])[0]
+
+    def check():
+        with projections.current():
+            state = projections.rollups.state
+            assert state["orders"] == expected_cube(storage.load_table("orders"), "created_at", "total_harga")
+            assert state["sales"] == expected_cube(storage.load_table("sales"), "timestamp", "total_penghasilan")
+    check()
+    projections.rebuild(storage)
+    check()
+    assert verify(projections, storage) == []
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from exports import export_columns, export_file
+from stock_management import AdminStockManagement
+
+ORDERS = pd.DataFrame([
+    {"email": "halo@gmail.com", "product_name": "Sneaker A", "quantity": 1, "price": 120000,
+     "status": "unpacked", "total_harga": 120000, "created_at": "2024-06-01T09:00:00"},
+    {"email": "halo@gmail.com", "product_name": "Boot B", "quantity": 2, "price": 200000,
+     "status": "delivered", "total_harga": 400000, "created_at": "2024-06-15T10:00:00"},
+    {"email": "lain@gmail.com", "product_name": "Sneaker A", "quantity": 3, "price": 120000,
+     "status": "unpacked", "total_harga": 360000, "created_at": "2024-06-20T11:00:00"},
+    {"email": "halo@gmail.com", "product_name": "Sneaker A", "quantity": 4, "price": 120000,
+     "status": "unpacked", "total_harga": 480000, "created_at": "2024-07-02T12:00:00"},
+])
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_filtered_csv_export_round_trip(make_storage, tmp_path, kind):
+    storage = make_storage(kind)
+    storage.append_rows("orders", ORDERS)
+    path = tmp_path / "orders.csv"
+    progress = []
+    rows = export_file(str(path), "orders", "csv", storage, progress.append, chunksize=1,
+                       email="halo@gmail.com", status="unpacked", start="2024-06-01", end="2024-06-30")
+    exported = pd.read_csv(path)
+    assert rows == 1 and progress == [1]
+    assert exported.columns.tolist() == export_columns("orders")
+    assert exported[["order_id", "quantity", "total_harga"]].values.tolist() == [[1, 1, 120000]]
+
+
+def test_export_job_writes_downloadable_artifact(make_storage, job_runner):
+    storage = make_storage()
+    storage.append_rows("orders", ORDERS)
+    job_id = AdminStockManagement(storage).export_transactions("admin@gmail.com", "csv", product_name="Sneaker A")
+    job = job_runner.wait(job_id, timeout=10)
+    assert job["status"] == "done" and job["artifact"] == "orders.csv"
+    exported = pd.read_csv(job_runner.artifact_path(job_id))
+    assert exported["order_id"].tolist() == [1, 3, 4]
+    assert "row_version" not in exported
+
+
+def test_xlsx_export_matches_csv(make_storage, tmp_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    storage = make_storage()
+    storage.append_rows("orders", ORDERS)
+    path = tmp_path / "orders.xlsx"
+    assert export_file(str(path), "orders", "xlsx", storage, chunksize=2, status="unpacked") == 3
+    sheet = openpyxl.load_workbook(path, read_only=True).worksheets[0]
+    values = list(sheet.values)
+    assert list(values[0]) == export_columns("orders")
+    assert [row[0] for row in values[1:]] == [1, 3, 4]
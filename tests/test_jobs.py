@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import pytest
+import jobs
+
+
+@pytest.fixture
+def blocking_job(monkeypatch):
+    # Tugas uji yang melapor progres sampai dilepas lewat event
+    release = threading.Event()
+    started = threading.Event()
+
+    def run(context, steps=3):
+        started.set()
+        for i in range(steps):
+            context.progress(i, steps, f"langkah {i}")
+            release.wait(0.05)
+        with open(context.path("hasil.txt"), "w") as f:
+            f.write("ok")
+        return "hasil.txt"
+
+    monkeypatch.setitem(jobs.JOB_TYPES, "uji", ("Tugas uji", run))
+    return started, release
+
+
+def test_cancel_stops_running_job_at_next_progress(job_runner, blocking_job):
+    started, _ = blocking_job
+    job_id = job_runner.submit("uji", owner="admin@gmail.com", steps=10000)
+    assert started.wait(5)
+    assert job_runner.cancel(job_id)
+    job = job_runner.wait(job_id, timeout=5)
+    assert job["status"] == "cancelled"
+    assert job_runner.artifact_path(job_id) is None
+    # Tugas yang sudah selesai tidak bisa dibatalkan lagi
+    assert not job_runner.cancel(job_id)
+    assert not job_runner.active("admin@gmail.com")
+
+
+def test_cancel_queued_job_never_runs(tmp_path, blocking_job):
+    started, release = blocking_job
+    runner = jobs.JobRunner(str(tmp_path / "jobs"), workers=1)
+    first = runner.submit("uji", steps=10000)
+    assert started.wait(5)
+    queued = runner.submit("uji")
+    assert runner.cancel(queued)
+    assert runner.get(queued)["status"] == "cancelled"
+    runner.cancel(first)
+    runner.wait(first, timeout=5)
+    assert runner.get(queued)["started"] is None
+
+
+def test_restart_fails_running_jobs_and_resumes_queued(tmp_path, blocking_job):
+    directory = tmp_path / "jobs"
+    directory.mkdir()
+    base = {"kind": "uji", "label": "Tugas uji", "owner": None, "params": {"steps": 1}, "progress": 0.0,
+            "message": "", "artifact": None, "error": None, "created": 1.0, "started": None, "finished": None}
+    saved = {"berjalan": {**base, "id": "berjalan", "status": "running", "started": 2.0},
+             "menunggu": {**base, "id": "menunggu", "status": "queued"}}
+    for job_id in saved:
+        (directory / job_id).mkdir()
+    (directory / jobs.JOBS_FILE).write_text(json.dumps(saved))
+
+    # Runner baru pada direktori yang sama, seperti setelah aplikasi dimulai ulang
+    runner = jobs.JobRunner(str(directory))
+    interrupted = runner.get("berjalan")
+    assert interrupted["status"] == "failed"
+    assert interrupted["error"] == "Terhenti karena aplikasi dimulai ulang."
+    resumed = runner.wait("menunggu", timeout=5)
+    assert resumed["status"] == "done"
+    with open(runner.artifact_path("menunggu")) as f:
+        assert f.read() == "ok"
+    with open(directory / jobs.JOBS_FILE) as f:
+        assert {j["id"]: j["status"] for j in json.load(f).values()} == {"berjalan": "failed", "menunggu": "done"}
+
+
+def test_finished_jobs_are_pruned_with_their_files(job_runner, blocking_job, monkeypatch):
+    monkeypatch.setattr(jobs, "KEEP_FINISHED", 2)
+    job_ids = []
+    for _ in range(4):
+        job_ids.append(job_runner.submit("uji", steps=1))
+        assert job_runner.wait(job_ids[-1], timeout=5)["status"] == "done"
+    assert [job["id"] for job in job_runner.jobs()] == job_ids[:1:-1]
+    for job_id in job_ids[:2]:
+        assert job_runner.get(job_id) is None
+        assert not os.path.exists(os.path.join(job_runner.directory, job_id))
+    assert os.path.exists(job_runner.artifact_path(job_ids[-1]))
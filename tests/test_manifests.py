@@ -0,0 +1,47 @@
+import pandas as pd
+from manifests import UNKNOWN_ADDRESS, build_manifests, pending_manifests
+from stock_management import ResellerStockManagement
+
+USERS = pd.DataFrame([
+    {"email": "halo@gmail.com", "name": "Halo", "address": "Jl. Mawar 1", "contact": "0812"},
+    {"email": "budi@gmail.com", "name": "Budi", "address": "Jl. Anggrek 2", "contact": "0813"},
+])
+
+
+def order(order_id, email, product_name, quantity, price):
+    return {"order_id": order_id, "email": email, "product_name": product_name, "quantity": quantity,
+            "price": price, "total_harga": quantity * price, "status": "packed"}
+
+
+def test_build_manifests_groups_by_reseller_and_address():
+    orders = pd.DataFrame([
+        order(3, "halo@gmail.com", "Boot B", 1, 200000),
+        order(1, "halo@gmail.com", "Sneaker A", 2, 120000),
+        order(2, "budi@gmail.com", "Sneaker A", 1, 120000),
+        order(4, "asing@gmail.com", "Boot B", 1, 200000),
+    ])
+    shipments, lines = build_manifests(orders, USERS)
+    # Urut alamat lalu email; reseller tanpa data pengguna tetap dikirim dengan alamat penanda
+    assert shipments[["shipment_id", "email", "address", "orders", "quantity", "total_harga"]].values.tolist() == [
+        [1, "asing@gmail.com", UNKNOWN_ADDRESS, 1, 1, 200000],
+        [2, "budi@gmail.com", "Jl. Anggrek 2", 1, 1, 120000],
+        [3, "halo@gmail.com", "Jl. Mawar 1", 2, 3, 440000],
+    ]
+    assert lines[["shipment_id", "order_id", "name"]].values.tolist() == [
+        [1, 4, "asing@gmail.com"], [2, 2, "Budi"], [3, 1, "Halo"], [3, 3, "Halo"]]
+
+
+def test_build_manifests_empty_queue():
+    shipments, lines = build_manifests(pd.DataFrame(), USERS)
+    assert shipments.empty and lines.empty
+
+
+def test_pending_manifests_reads_orders_from_given_storage(make_storage):
+    storage = make_storage()
+    cart = [{"product_name": "Sneaker A", "price": 120000, "quantity": 2, "total_harga": 240000}]
+    assert ResellerStockManagement(storage).checkout("halo@gmail.com", cart).success
+    # Backend lain (tanpa pesanan) menjadi storage aktif
+    make_storage(directory="lain")
+    shipments, lines = pending_manifests("unpacked", storage)
+    assert shipments[["email", "address", "orders"]].values.tolist() == [["halo@gmail.com", "Jl. Mawar 1", 1]]
+    assert lines["order_id"].tolist() == [1]
@@ -0,0 +1,50 @@
+import io
+import pytest
+from bulk_onboarding import onboard_from_csv
+from handlers import PASSWORD_RULE_MESSAGE
+
+SHEET = """email,password,name,address,contact
+baru1@gmail.com,Rahasia123,Baru,Jl. A,0811
+halo@gmail.com,Rahasia123,Halo,Jl. B,0812
+baru1@gmail.com,Rahasia123,Dobel,Jl. C,0813
+salah-email,Rahasia123,X,Jl. D,0814
+baru2@gmail.com,lemah,Y,Jl. E,0815
+baru3@gmail.com,Rahasia123,,Jl. F,0816
+baru4@gmail.com,Rahasia123,Z,Jl. G,0817
+baru1@gmail.com,Rahasia123,Lagi,Jl. H,0818
+"""
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_batch_onboarding_reports_each_invalid_row(make_storage, kind):
+    storage = make_storage(kind=kind)
+    # Tiga baris per potongan: baris 8 mengulang email yang disimpan potongan pertama
+    saved, report = onboard_from_csv(io.StringIO(SHEET), chunksize=3)
+    assert saved == 2
+    assert report.values.tolist() == [
+        [2, "halo@gmail.com", "Email sudah terdaftar."],
+        [3, "baru1@gmail.com", "Email ganda di dalam batch."],
+        [4, "salah-email", "Format email tidak valid."],
+        [5, "baru2@gmail.com", PASSWORD_RULE_MESSAGE],
+        [6, "baru3@gmail.com", "Name tidak boleh kosong."],
+        [8, "baru1@gmail.com", "Email sudah terdaftar."],
+    ]
+    users = storage.load_table("users").astype(object).set_index("email")
+    assert users.index.tolist() == ["halo@gmail.com", "baru1@gmail.com", "baru4@gmail.com"]
+    assert users.loc["baru1@gmail.com", ["name", "role", "status"]].tolist() == ["Baru", "reseller", "unverified"]
+
+
+def test_duplicate_email_keeps_the_row_that_is_saved(make_storage):
+    storage = make_storage()
+    # Baris pertama gagal di validasi berikutnya (nama kosong), jadi baris kedua yang disimpan
+    saved, report = onboard_from_csv(io.StringIO(
+        "email,password,name,address,contact\n"
+        "x@gmail.com,Rahasia123,,Jl. A,0811\n"
+        "x@gmail.com,Rahasia123,Benar,Jl. B,0812\n"
+        "x@gmail.com,Rahasia123,Ketiga,Jl. C,0813\n"
+    ))
+    assert saved == 1
+    assert report[["row", "error"]].values.tolist() == [
+        [1, "Name tidak boleh kosong."], [3, "Email ganda di dalam batch."]]
+    users = storage.load_table("users").astype(object).set_index("email")
+    assert users.loc["x@gmail.com", "name"] == "Benar"
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from paginated_table import table_source
+
+# 23 produk: nama dengan karakter wildcard LIKE dan huruf besar/kecil campuran
+ITEMS = [f"Sepatu {i:02d}" for i in range(20)] + ["Diskon 50%", "Kaos_Polos", "SEPATU besar"]
+STOCK = pd.DataFrame({"Item": ITEMS, "Quantity": [i % 4 for i in range(len(ITEMS))],
+                      "Price": [1000 * (len(ITEMS) - i) for i in range(len(ITEMS))]})
+
+
+def page(source, **criteria):
+    rows, total = source(**criteria)
+    return rows.astype({"Item": object})["Item"].tolist(), total
+
+
+@pytest.fixture(params=["csv", "sqlite"])
+def source(request, make_storage):
+    storage = make_storage(kind=request.param)
+    storage.save_table("stock", STOCK)
+    return table_source("stock", storage)
+
+
+def test_pages_cover_filtered_rows_in_order(source):
+    # Filter persis + urutan menurun, dibaca per 4 baris sampai habis
+    expected = STOCK[STOCK["Quantity"] == 1].sort_values("Price", ascending=False)["Item"].tolist()
+    seen = []
+    for offset in range(0, 8, 4):
+        items, total = page(source, equals={"Quantity": 1}, sort="Price", descending=True, offset=offset, limit=4)
+        assert total == len(expected) == 6
+        seen += items
+    assert seen == expected
+    assert page(source, sort="Item", offset=21, limit=5) == (sorted(ITEMS)[21:], len(ITEMS))
+
+
+def test_search_is_case_insensitive_and_literal(source):
+    assert page(source, contains={"Item": "sepatu 1"}, sort="Item", limit=3) == (
+        ["Sepatu 10", "Sepatu 11", "Sepatu 12"], 10)
+    assert page(source, contains={"Item": "sepatu b"})[1] == 1
+    # % dan _ dicari sebagai teks biasa, bukan wildcard
+    assert page(source, contains={"Item": "%"}) == (["Diskon 50%"], 1)
+    assert page(source, contains={"Item": "u_0"}) == ([], 0)
+    assert page(source, contains={"Item": "_"}) == (["Kaos_Polos"], 1)
+
+
+def test_paginated_table_resets_page_when_filter_changes(make_storage):
+    from streamlit.testing.v1 import AppTest
+
+    def app():
+        from paginated_table import paginated_table, table_source
+        paginated_table("stok", table_source("stock"), ["Item", "Quantity", "Price"], search=["Item"])
+
+    items = [f"Produk {i:03d}" for i in range(120)]
+    make_storage().save_table("stock", pd.DataFrame({"Item": items, "Quantity": 1, "Price": 1000}))
+    at = AppTest.from_function(app, default_timeout=30).run()
+    assert at.caption[0].value == "Baris 1–25 dari 120"
+    at.number_input(key="stok_page").set_value(3).run()
+    assert at.caption[0].value == "Baris 51–75 dari 120"
+    assert at.dataframe[0].value["Item"].astype(object).tolist() == items[50:75]
+    # Pencarian baru selalu mulai dari halaman pertama
+    at.text_input(key="stok_search_Item").set_value("produk 0").run()
+    assert at.caption[0].value == "Baris 1–25 dari 100"
+    at.text_input(key="stok_search_Item").set_value("tidak ada").run()
+    assert at.warning[0].value == "Tidak ada data yang cocok."
+    assert not at.exception
@@ -0,0 +1,123 @@
+import os
+import time
+import pytest
+from event_log import EventLog, get_event_log
+from payment_engine import PaymentEngine, SimulatedGateway
+from payment_strategy import CreditCardPayment
+from stock_management import ResellerStockManagement
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CART = [{"product_name": "Sneaker A", "price": 120000, "quantity": 2, "total_harga": 240000}]
+
+
+@pytest.fixture
+def engine():
+    return PaymentEngine(SimulatedGateway(latency=0, failure_rate=0, decline_rate=0), backoff=0)
+
+
+def pay(storage, engine, key="bayar-1"):
+    return ResellerStockManagement(storage).pay_and_checkout(
+        "halo@gmail.com", [dict(line) for line in CART], CreditCardPayment(), key, engine)
+
+
+def broken_checkout(self, *args, **kwargs):
+    raise OSError("disk penuh")
+
+
+def payment_statuses(storage):
+    return storage.load_table("payments")["status"].tolist()
+
+
+def test_pay_and_checkout_records_order_and_payment(make_storage, engine):
+    storage = make_storage()
+    result = pay(storage, engine)
+    assert result.success and result.payment.status == "authorized"
+    assert payment_statuses(storage) == ["authorized"]
+    assert storage.load_table("orders")["payment_id"].tolist() == ["bayar-1"]
+
+
+def test_stock_sold_during_authorization_voids_payment(make_storage, engine, monkeypatch):
+    storage = make_storage()
+    checkout = ResellerStockManagement.checkout
+
+    def sold_meanwhile(self, *args, **kwargs):
+        # Sesi lain membeli stok di antara pengecekan awal dan commit
+        storage.update_rows("stock", "Item", "Sneaker A", {"Quantity": 1})
+        return checkout(self, *args, **kwargs)
+    monkeypatch.setattr(ResellerStockManagement, "checkout", sold_meanwhile)
+    result = pay(storage, engine)
+    assert not result.success
+    assert "tidak mencukupi" in result.failures[0]["reason"]
+    assert result.payment.status == "voided"
+    assert payment_statuses(storage) == ["voided"]
+    assert storage.load_table("stock").set_index("Item").at["Sneaker A", "Quantity"] == 1
+
+
+def test_checkout_error_voids_authorization(make_storage, engine, monkeypatch):
+    storage = make_storage()
+    monkeypatch.setattr(ResellerStockManagement, "checkout", broken_checkout)
+    result = pay(storage, engine)
+    assert not result.success
+    assert "disk penuh" in result.message and "dibatalkan" in result.message
+    assert result.payment.status == "voided"
+    assert payment_statuses(storage) == ["voided"]
+
+
+def test_failed_void_is_still_recorded(make_storage, engine, monkeypatch):
+    storage = make_storage()
+    monkeypatch.setattr(ResellerStockManagement, "checkout", broken_checkout)
+
+    def unreachable(payment):
+        raise ConnectionError("gateway tidak bisa dihubungi")
+    monkeypatch.setattr(engine, "void_sync", unreachable)
+    result = pay(storage, engine)
+    assert not result.success
+    assert "gagal dibatalkan" in result.message
+    assert payment_statuses(storage) == ["authorized"]
+
+
+def test_error_after_commit_keeps_payment(make_storage, engine, monkeypatch):
+    storage = make_storage()
+    get_event_log(storage)
+
+    def lost(self, events):
+        raise OSError("log event tidak bisa ditulis")
+    monkeypatch.setattr(EventLog, "append", lost)
+    result = pay(storage, engine)
+    assert result.success
+    assert result.payment.status == "authorized"
+    assert payment_statuses(storage) == ["authorized"]
+    assert len(storage.load_table("orders")) == 1
+
+
+def test_payment_key_follows_cart_total(make_storage, engine, monkeypatch):
+    from streamlit.testing.v1 import AppTest
+    import payment_engine
+    storage = make_storage()
+    monkeypatch.setattr(payment_engine, "_engine", engine)
+    app = AppTest.from_file(os.path.join(ROOT, "harmonCorp.py"), default_timeout=30)
+    app.session_state["logged_in"] = True
+    app.session_state["user_data"] = {"email": "halo@gmail.com", "name": "Halo", "role": "reseller",
+                                      "address": "Jl. Mawar 1", "contact": "0812", "status": "active"}
+    # Key dari percobaan sebelumnya (gateway tidak merespons) untuk keranjang dengan total lain
+    app.session_state["payment_key"] = ("bayar-lama", 120000)
+    app.session_state["cart"] = [dict(line) for line in CART]
+    app.run()
+    [button for button in app.button if button.label == "Lakukan Pembayaran"][0].click().run()
+    assert not app.exception
+    assert any("berhasil dilakukan" in message.value for message in app.success)
+    payment_ids = storage.load_table("payments")["payment_id"].tolist()
+    assert len(payment_ids) == 1 and payment_ids[0] != "bayar-lama"
+
+
+def test_engine_result_cache_is_bounded(engine, monkeypatch):
+    import payment_engine
+    monkeypatch.setattr(payment_engine, "RESULT_CACHE_SIZE", 2)
+    for key in ["a", "b", "c"]:
+        assert engine.authorize_sync(CreditCardPayment(), 1000, key).authorized
+    assert list(engine._results) == ["b", "c"]
+    monkeypatch.setattr(payment_engine, "RESULT_TTL", 0.05)
+    time.sleep(0.1)
+    assert engine._cached("c") is None
+    engine.authorize_sync(CreditCardPayment(), 1000, "d")
+    assert list(engine._results) == ["d"]
@@ -0,0 +1,70 @@
+import os
+import pandas as pd
+from reconciliation import CATEGORIES, reconcile, reconcile_file
+
+PAYMENTS = pd.DataFrame([
+    # payment_id, method, amount, status, reference
+    ("p1", "credit_card", 100000, "authorized", "R1"),
+    ("p2", "credit_card", 200000, "authorized", "R2"),
+    ("p3", "digital_wallet", 50000, "voided", "R3"),
+    ("p4", "credit_card", 70000, "authorized", "R4"),
+    ("p5", "credit_card", 80000, "authorized", "R5"),
+    ("p6", "credit_card", 10000, "authorized", "R6"),
+    ("p7", "credit_card", 10000, "authorized", "R6"),
+], columns=["payment_id", "method", "amount", "status", "reference"]).assign(timestamp="2024-06-01T09:00:00")
+ORDER_TOTALS = {"p1": 100000, "p2": 200000, "p3": 50000, "p4": 70000, "p5": 90000, "p6": 10000}
+# Dibaca per dua baris: R1 dan R9 muncul lagi di potongan berikutnya
+SETTLEMENT = pd.DataFrame([
+    ("R1", 100000, "credit_card"),
+    ("R2", 150000, "credit_card"),
+    ("R3", 50000, "digital_wallet"),
+    ("R9", 30000, "credit_card"),
+    ("R5", 80000, "credit_card"),
+    ("R1", 100000, "credit_card"),
+    ("R9", 30000, "credit_card"),
+    ("R6", 10000, "credit_card"),
+], columns=["reference", "amount", "method"])
+EXPECTED = {"matched": 3, "mismatched": 3, "missing_in_settlement": 1, "missing_in_records": 1, "duplicates": 3}
+
+
+def seed_payments(storage):
+    storage.append_rows("payments", PAYMENTS)
+    storage.append_rows("orders", pd.DataFrame([
+        {"email": "halo@gmail.com", "product_name": "Sneaker A", "quantity": 1, "price": total,
+         "status": "unpacked", "total_harga": total, "payment_id": payment_id}
+        for payment_id, total in ORDER_TOTALS.items()
+    ]))
+
+
+def test_reconcile_file_writes_each_category(make_storage, tmp_path):
+    storage = make_storage()
+    seed_payments(storage)
+    path = tmp_path / "settlement.csv"
+    SETTLEMENT.to_csv(path, index=False)
+    counts = reconcile_file(str(path), str(tmp_path), storage=storage, chunksize=2)
+    assert counts == EXPECTED
+
+    def reasons(category):
+        frame = pd.read_csv(tmp_path / f"reconciliation_{category}.csv", dtype={"reference": str})
+        return sorted(zip(frame["reference"].fillna(""), frame["reason"]))
+    assert not os.path.exists(tmp_path / "reconciliation_matched.csv")
+    assert reasons("mismatched") == [
+        ("R2", "Nominal berbeda dengan settlement"),
+        ("R3", "Pembayaran sudah dibatalkan tetapi diselesaikan gateway"),
+        ("R5", "Nominal berbeda dengan total pesanan"),
+    ]
+    assert reasons("missing_in_settlement") == [("R4", "Tidak ada di settlement")]
+    assert reasons("missing_in_records") == [("R9", "Tidak ada catatan pembayaran")]
+    assert reasons("duplicates") == [
+        ("R1", "Reference muncul lebih dari sekali di settlement"),
+        ("R6", "Reference ganda di catatan pembayaran"),
+        ("R9", "Reference muncul lebih dari sekali di settlement"),
+    ]
+
+
+def test_in_memory_reconcile_matches_chunked(make_storage):
+    storage = make_storage("sqlite")
+    seed_payments(storage)
+    results = reconcile(SETTLEMENT, storage=storage)
+    assert {category: len(results[category]) for category in CATEGORIES} == EXPECTED
+    assert sorted(results["matched"]["reference"]) == ["R1", "R5", "R6"]
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+from schema import ORDER_STATUSES, ROLES, USER_STATUSES
+
+USERS = pd.DataFrame([
+    {"email": "a@gmail.com", "password": "x", "name": "A", "address": "Jl. A", "contact": "081234567890",
+     "status": "verified", "role": "reseller"},
+    # Nomor dari data lama yang pernah tersimpan sebagai float
+    {"email": "b@gmail.com", "password": "x", "name": "B", "address": "Jl. B", "contact": "98528135127.0",
+     "status": "unverified", "role": "jasa pengiriman"},
+])
+ORDERS = pd.DataFrame([
+    {"email": "a@gmail.com", "product_name": "Sneaker A", "quantity": 2, "price": 120000.4, "status": "unpacked",
+     "total_harga": 240000.6, "created_at": "2024-06-01T09:00:00"},
+    {"email": "a@gmail.com", "product_name": "Boot B", "quantity": 1, "price": 200000, "status": "returned",
+     "total_harga": 200000, "created_at": "2024-06-02T09:00:00"},
+])
+
+
+def reload(storage, table):
+    # Simpan ulang hasil baca lalu baca lagi: tipe harus bertahan bolak-balik
+    storage.save_table(table, storage.load_table(table))
+    return storage.load_table(table)
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_users_keep_text_contact_and_categories(make_storage, kind):
+    storage = make_storage(kind=kind)
+    storage.save_table("users", USERS)
+    for users in (storage.load_table("users"), reload(storage, "users")):
+        assert users["contact"].dtype == object
+        assert users["contact"].tolist() == ["081234567890", "98528135127"]
+        assert users["status"].dtype == USER_STATUSES
+        assert users["role"].dtype == ROLES
+        assert users["role"].tolist() == ["reseller", "jasa pengiriman"]
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_orders_round_rupiah_and_keep_unknown_status(make_storage, kind):
+    storage = make_storage(kind=kind)
+    storage.append_rows("orders", ORDERS)
+    for orders in (storage.load_table("orders"), reload(storage, "orders")):
+        for column in ("order_id", "quantity", "price", "total_harga", "row_version"):
+            assert orders[column].dtype == "int64", column
+        assert orders[["price", "total_harga"]].values.tolist() == [[120000, 240001], [200000, 200000]]
+        assert isinstance(orders["product_name"].dtype, pd.CategoricalDtype)
+        # Kategori tetap lebih dulu, nilai yang belum dikenal tidak hilang
+        assert list(orders["status"].cat.categories) == [*ORDER_STATUSES.categories, "returned"]
+        assert orders["status"].tolist() == ["unpacked", "returned"]
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_stock_dtypes_survive_mutations(make_storage, kind):
+    storage = make_storage(kind=kind)
+    storage.update_rows("stock", "Item", "Boot B", {"Quantity": 4, "Price": 210000})
+    storage.increment_many("stock", "Item", "Quantity", {"Sneaker A": -1})
+    stock = storage.load_table("stock")
+    assert isinstance(stock["Item"].dtype, pd.CategoricalDtype)
+    assert stock[["Quantity", "Price", "row_version"]].dtypes.tolist() == ["int64"] * 3
+    assert stock.astype({"Item": object})[["Item", "Quantity", "Price"]].values.tolist() == [
+        ["Sneaker A", 4, 120000], ["Boot B", 4, 210000]]
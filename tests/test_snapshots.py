@@ -0,0 +1,27 @@
+import pandas as pd
+import pytest
+import snapshots
+
+
+def orders(count):
+    return pd.DataFrame({"email": ["halo@gmail.com"] * count, "product_name": ["Sneaker A"] * count,
+                         "quantity": 1, "price": 120000.0, "status": ["unpacked"] * count, "total_harga": 120000.0})
+
+
+@pytest.mark.parametrize("fmt", ["feather", "npy"])
+def test_mutations_in_a_row_on_snapshotted_table(make_storage, monkeypatch, fmt):
+    if fmt == "npy":
+        monkeypatch.setattr(snapshots, "feather", None)
+    elif snapshots.feather is None:
+        pytest.skip("pyarrow tidak terpasang")
+    storage = make_storage()
+    storage.append_rows("orders", orders(20))
+    assert storage.compact("orders") == 20
+    for order_id in (1, 2, 3):
+        # Setiap mutasi membaca snapshot yang baru ditulis oleh mutasi sebelumnya
+        assert storage.update_many("orders", "order_id", [order_id], {"status": "packed"}) == 1
+        storage.compact("orders")
+    assert storage.update_rows("orders", "order_id", 4, {"status": "delivered"}) == 1
+    statuses = storage.load_table("orders").set_index("order_id")["status"]
+    assert statuses.loc[[1, 2, 3, 4]].tolist() == ["packed", "packed", "packed", "delivered"]
+    assert (statuses.loc[5:] == "unpacked").all()
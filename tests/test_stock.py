@@ -0,0 +1,86 @@
+import io
+import pytest
+from bulk_stock import apply_stock_diff, diff_stock, read_stock_sheet
+from event_log import get_event_log, get_projections, verify
+from stock_management import AdminStockManagement
+from storage import ConflictError
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_edit_and_delete_missing_product_write_no_event(make_storage, kind):
+    storage = make_storage(kind=kind)
+    projections = get_projections(storage)
+    events = get_event_log(storage)
+    size = events.size()
+    admin = AdminStockManagement(storage)
+    assert admin.edit_stock("Sandal C", 4, 50000) == "Produk Sandal C tidak ditemukan"
+    assert admin.delete_stock("Sandal C") == "Produk Sandal C tidak ditemukan"
+    assert events.size() == size
+    assert verify(projections, storage) == []
+    assert "Sandal C" not in storage.load_table("stock")["Item"].tolist()
+
+
+def test_edit_existing_product_records_event(make_storage):
+    storage = make_storage()
+    events = get_event_log(storage)
+    size = events.size()
+    assert AdminStockManagement(storage).edit_stock("Boot B", 7, 210000) == "Produk berhasil diperbarui"
+    assert [event["type"] for _, event in events.read(size)] == ["stock_updated"]
+
+
+def sheet(text):
+    return read_stock_sheet(io.StringIO(text))
+
+
+def stock_rows(storage):
+    stock = storage.load_table("stock").astype({"Item": object}).sort_values("Item")
+    return stock[["Item", "Quantity", "Price"]].values.tolist()
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_bulk_diff_applies_new_changed_and_deleted_skus(make_storage, kind):
+    storage = make_storage(kind=kind)
+    projections = get_projections(storage)
+    desired = sheet("Item,Quantity,Price\nSneaker A,7,120000\nSandal C,3,50000\n")
+    diff = diff_stock(storage.load_table("stock"), desired, delete_missing=True)
+    assert diff.summary() == {"tambah": 1, "ubah": 1, "hapus": 1, "error": 0}
+    assert diff.preview()[["aksi", "Item"]].values.tolist() == [
+        ["tambah", "Sandal C"], ["ubah", "Sneaker A"], ["hapus", "Boot B"]]
+
+    assert apply_stock_diff(diff, storage) == "Stok diperbarui: 1 ditambah, 1 diubah, 1 dihapus."
+    assert stock_rows(storage) == [["Sandal C", 3, 50000], ["Sneaker A", 7, 120000]]
+    assert verify(projections, storage) == []
+
+
+def test_bulk_diff_reports_invalid_rows(make_storage):
+    storage = make_storage()
+    desired = sheet("Item,Quantity,Price\n,1,1000\nBoot B,-1,\nSandal C,2,\nSandal D,1,100\nSandal D,2,100\n")
+    diff = diff_stock(storage.load_table("stock"), desired)
+    assert diff.errors[["row", "error"]].values.tolist() == [
+        [1, "Nama produk kosong"],
+        [2, "Quantity harus bilangan bulat >= 0"],
+        [3, "Price wajib diisi untuk produk baru"],
+        [4, "Nama produk duplikat di file"],
+        [5, "Nama produk duplikat di file"],
+    ]
+    with pytest.raises(ValueError):
+        apply_stock_diff(diff, storage)
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_bulk_apply_rejects_rows_changed_since_diff(make_storage, kind):
+    storage = make_storage(kind=kind)
+    before = stock_rows(storage)
+    # Tanpa kolom Price: harga produk yang ada tidak diubah
+    diff = diff_stock(storage.load_table("stock"), sheet("Item,Quantity\nBoot B,9\n"))
+    # Sesi lain mengubah Boot B setelah pratinjau dihitung
+    AdminStockManagement(storage).edit_stock("Boot B", 1, 200000)
+    with pytest.raises(ConflictError):
+        apply_stock_diff(diff, storage)
+    assert stock_rows(storage) == [row if row[0] != "Boot B" else ["Boot B", 1, 200000] for row in before]
+
+    # Produk baru yang sudah ditambahkan sesi lain juga konflik
+    diff = diff_stock(storage.load_table("stock"), sheet("Item,Quantity,Price\nSandal C,3,50000\n"))
+    AdminStockManagement(storage).add_stock("Sandal C", 1, 40000)
+    with pytest.raises(ConflictError):
+        apply_stock_diff(diff, storage)
@@ -0,0 +1,72 @@
+import pandas as pd
+import pytest
+from conftest import finishes
+from storage import ConflictError, CsvBackend, SqliteBackend
+
+# Backend CSV per tingkat durabilitas, ditambah SQLite (durabilitas tidak berlaku)
+BACKENDS = [("csv", "sync"), ("csv", "group"), ("csv", "async"), ("sqlite", "sync")]
+
+
+def flush(storage):
+    # Tunggu penulis latar belakang CSV; SQLite sudah menulis saat commit
+    if isinstance(storage, CsvBackend):
+        storage.flush()
+
+
+@pytest.mark.parametrize("kind, durability", BACKENDS)
+def test_empty_transaction_returns(make_storage, kind, durability):
+    storage = make_storage(kind, durability)
+
+    def empty():
+        with storage.transaction():
+            pass
+        return True
+    assert finishes(empty) == (True, True)
+
+
+@pytest.mark.parametrize("kind, durability", BACKENDS)
+def test_nested_transaction_commits_once(make_storage, kind, durability):
+    storage = make_storage(kind, durability)
+    with storage.transaction():
+        storage.increment_many("stock", "Item", "Quantity", {"Sneaker A": -1})
+        with storage.transaction():
+            storage.append_rows("orders", pd.DataFrame([{"email": "halo@gmail.com", "product_name": "Sneaker A",
+                                                         "quantity": 1, "price": 120000, "status": "unpacked",
+                                                         "total_harga": 120000}]))
+    flush(storage)
+    assert storage.load_table("stock").set_index("Item").at["Sneaker A", "Quantity"] == 4
+    assert storage.load_table("orders")["order_id"].tolist() == [1]
+
+
+@pytest.mark.parametrize("kind, durability", BACKENDS)
+def test_transaction_rollback(make_storage, kind, durability):
+    storage = make_storage(kind, durability)
+    with pytest.raises(RuntimeError):
+        with storage.transaction():
+            storage.increment_many("stock", "Item", "Quantity", {"Sneaker A": -1})
+            raise RuntimeError("batal")
+    flush(storage)
+    assert storage.load_table("stock").set_index("Item").at["Sneaker A", "Quantity"] == 5
+
+
+def test_conflict_on_stale_version(make_storage):
+    storage = make_storage()
+    storage.update_rows("stock", "Item", "Boot B", {"Quantity": 3}, expected_version=1)
+    with pytest.raises(ConflictError):
+        storage.update_rows("stock", "Item", "Boot B", {"Quantity": 4}, expected_version=1)
+
+
+def reopen(storage):
+    # Instance kedua pada data yang sama, seperti proses lain
+    return CsvBackend(storage.data_dir, durability="sync") if isinstance(storage, CsvBackend) else SqliteBackend(storage.db_path)
+
+
+@pytest.mark.parametrize("kind", ["csv", "sqlite"])
+def test_fingerprint_is_shared_across_processes(make_storage, kind):
+    storage = make_storage(kind, durability="group")
+    storage.update_rows("stock", "Item", "Boot B", {"Quantity": 3})
+    before = storage.fingerprint("stock")
+    other = reopen(storage)
+    assert other.fingerprint("stock") == before
+    other.update_rows("stock", "Item", "Boot B", {"Quantity": 4})
+    assert storage.fingerprint("stock") != before
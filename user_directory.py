@@ -0,0 +1,80 @@
+import threading
+import pandas as pd
+from storage import get_storage
+from data_cache import get_data_cache
+
+
+class UserDirectory:
+    """Direktori pengguna dengan indeks hash pada email, di-cache di memori."""
+    def __init__(self, storage=None):
+        self._storage = storage
+        self._lock = threading.Lock()
+        self._version = None
+        self._frames = None
+        # email -> (nomor frame, posisi baris); frame tambahan berasal dari append_users
+        self._index = {}
+
+    @property
+    def storage(self):
+        return self._storage or get_storage()
+
+    def _refresh(self):
+        # Muat ulang tabel pengguna hanya jika versinya berubah sejak dibaca terakhir
+        storage = self.storage
+        version = (id(storage), storage.version("users"))
+        with self._lock:
+            if self._frames is None or version != self._version:
+                users = get_data_cache().load_table("users", storage)
+                emails = users["email"].tolist()
+                # Iterasi terbalik agar baris pertama yang menang jika email ganda
+                self._index = {email: (0, i) for i, email in zip(range(len(emails) - 1, -1, -1), reversed(emails))}
+                self._frames = [users]
+                self._version = version
+            return self._frames, self._index
+
+    def invalidate(self):
+        with self._lock:
+            self._frames = None
+
+    def get(self, email):
+        # Mengembalikan baris pengguna (pd.Series) atau None jika email tidak terdaftar
+        frames, index = self._refresh()
+        location = index.get(email)
+        return None if location is None else frames[location[0]].iloc[location[1]]
+
+    def exists(self, email):
+        return email in self._refresh()[1]
+
+    def exists_many(self, emails):
+        # Versi vektor dari exists(): satu kali refresh untuk seluruh Series email
+        index = self._refresh()[1]
+        return pd.Series([email in index for email in emails], index=emails.index, dtype=bool)
+
+    def append_users(self, users):
+        # Simpan banyak pengguna sekaligus lalu perbarui indeks secara inkremental,
+        # tanpa membaca ulang seluruh tabel pengguna
+        storage = self.storage
+        with self._lock:
+            before = (id(storage), storage.version("users"))
+            storage.append_rows("users", users)
+            after = (id(storage), storage.version("users"))
+            if self._frames is None or self._version != before:
+                return
+            # Simpan sebagai frame tambahan agar tidak menyalin seluruh tabel
+            frame_number = len(self._frames)
+            self._frames.append(users.reset_index(drop=True))
+            for position, email in enumerate(users["email"].tolist()):
+                self._index.setdefault(email, (frame_number, position))
+            self._version = after
+
+    def is_verified(self, email):
+        user = self.get(email)
+        return user is not None and user["status"] == "verified"
+
+
+_directory = UserDirectory()
+
+
+def get_user_directory():
+    # Satu direktori dipakai bersama oleh login dan seluruh handler
+    return _directory
@@ -0,0 +1,12 @@
+import importlib
+
+# Modul halaman per peran; diimpor saat peran tersebut pertama kali membuka aplikasi
+ROLE_VIEWS = {
+    "reseller": "views.reseller",
+    "admin": "views.admin",
+    "jasa pengiriman": "views.courier",
+}
+
+
+def render(user):
+    importlib.import_module(ROLE_VIEWS[user["role"]]).render(user)
@@ -0,0 +1,370 @@
+import pandas as pd
+import streamlit as st
+from stock_management import AdminStockManagement
+from storage import ROW_VERSION, TABLE_COLUMNS, ConflictError, get_storage
+from bulk_onboarding import onboard_from_csv
+from bulk_stock import STOCK_FIELDS, apply_stock_diff, diff_stock, read_stock_sheet
+from order_queue import ORDER_STATUSES
+from aggregates import get_aggregates
+from data_cache import get_data_cache
+from instrumentation import get_metrics
+from reconciliation import reconcile
+from event_log import ROLLUP_FACTS, ROLLUP_GRAINS, get_event_log, get_projections
+from schema import memory_report
+from jobs import get_job_runner
+from paginated_table import ALL, paginated_table, table_source
+from exports import DATE_COLUMNS, EXPORT_FORMATS
+from views.common import STOCK_COLUMNS, fragment, job_panel, order_queue_view, profile_sidebar, rerun_fragment
+
+# Tabel yang bisa diekspor dari halaman admin
+EXPORT_TABLES = {"orders": "Transaksi", "sales": "Laporan Penjualan", "payments": "Pembayaran", "stock": "Stok"}
+# Dasbor penjualan: label dan rentang default per satuan waktu
+FACT_LABELS = {"orders": "Pembelian reseller (pesanan)", "sales": "Penjualan reseller (laporan)"}
+GRAIN_LABELS = {"day": "Harian", "week": "Mingguan", "month": "Bulanan"}
+DASHBOARD_SPANS = {"day": pd.Timedelta(days=29), "week": pd.Timedelta(weeks=11), "month": pd.DateOffset(months=11)}
+TRANSACTION_COLUMNS = ["order_id", "email", "product_name", "quantity", "price", "status", "total_harga", "payment_id"]
+
+
+def render(user):
+    profile_sidebar(user)
+    reseller_verification()
+
+    # Admin: Registrasi massal reseller dari spreadsheet mitra
+    with st.expander("Registrasi Massal Reseller"):
+        bulk_onboarding()
+
+    # Admin: Rekonsiliasi pembayaran dengan file settlement gateway
+    with st.expander("Rekonsiliasi Pembayaran"):
+        payment_reconciliation()
+
+    stock_editor()
+    reports()
+
+    # Admin: Grafik penjualan dari kubus rollup (tidak membaca tabel pesanan)
+    with st.expander("Dasbor Penjualan"):
+        sales_dashboard()
+    transactions()
+
+    # Admin: Ekspor dan pemeliharaan yang berjalan di latar belakang
+    with st.expander("Tugas Latar Belakang"):
+        background_jobs(user)
+        job_panel()
+
+    # Admin: Riwayat siklus hidup satu pesanan dari log event
+    with st.expander("Riwayat Pesanan"):
+        order_history()
+
+    st.subheader("Pengemasan Barang")
+    order_queue_view(
+        "unpacked", "packed", "Kemas", "dikemas",
+        "Tidak ada barang yang perlu dikemas",
+    )
+
+
+@fragment("verification")
+def reseller_verification():
+    st.subheader("Verifikasi Reseller")
+    try:
+        df = get_data_cache().load_table("users")
+        unverified_resellers = df[df["status"] == "unverified"]
+
+        if not unverified_resellers.empty:
+            st.write("Reseller yang perlu diverifikasi:")
+            st.dataframe(unverified_resellers[["email", "name", "contact", "status"]])
+
+            selected_reseller = st.selectbox(
+                "Pilih reseller untuk verifikasi", unverified_resellers["email"]
+            )
+
+            if st.button("Verifikasi"):
+                get_storage().update_rows("users", "email", selected_reseller, {"status": "verified"})
+                st.success(f"Reseller {selected_reseller} berhasil diverifikasi.")
+                rerun_fragment()
+
+        else:
+            st.info("Tidak ada reseller yang perlu diverifikasi.")
+    except FileNotFoundError:
+        st.error("File data reseller tidak ditemukan.")
+
+
+@fragment("bulk_onboarding")
+def bulk_onboarding():
+    uploaded_file = st.file_uploader("Unggah file CSV reseller", type="csv")
+    if uploaded_file is not None and st.button("Proses Registrasi Massal"):
+        saved, report = onboard_from_csv(uploaded_file)
+        st.success(f"{saved} reseller berhasil diregistrasi.")
+        if not report.empty:
+            st.warning(f"{len(report)} baris gagal diproses.")
+            st.dataframe(report)
+            st.download_button(
+                "Unduh Laporan Error", report.to_csv(index=False), "laporan_registrasi.csv", "text/csv"
+            )
+
+
+@fragment("reconciliation")
+def payment_reconciliation():
+    settlement_file = st.file_uploader("Unggah file settlement gateway", type="csv")
+    # File besar diproses per potongan di latar belakang; hasilnya diunduh dari Tugas Latar Belakang
+    if settlement_file is not None and st.button("Proses di Latar Belakang"):
+        get_job_runner().submit(
+            "reconcile", owner=st.session_state.user_data["email"],
+            files={"settlement.csv": settlement_file.getvalue()}, settlement="settlement.csv",
+        )
+        st.rerun()
+    if settlement_file is not None and st.button("Proses Rekonsiliasi"):
+        try:
+            results = reconcile(pd.read_csv(settlement_file, dtype={"reference": str}))
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(f"{len(results['matched'])} pembayaran cocok.")
+            for category, label in [
+                ("mismatched", "Tidak cocok"),
+                ("missing_in_settlement", "Tidak ada di settlement"),
+                ("missing_in_records", "Tidak ada di catatan"),
+                ("duplicates", "Duplikat"),
+            ]:
+                report = results[category]
+                if not report.empty:
+                    st.warning(f"{label}: {len(report)}")
+                    st.dataframe(report)
+                    st.download_button(
+                        f"Unduh {label}", report.to_csv(index=False), f"rekonsiliasi_{category}.csv", "text/csv"
+                    )
+
+
+@fragment("stock_editor")
+def stock_editor():
+    admin = AdminStockManagement()
+
+    # Admin melihat dan mengelola stok (cache bersama, hanya dibaca)
+    stock_data = get_data_cache().load_table("stock")
+    # Versi baris yang dilihat admin pada tampilan sebelumnya, untuk compare-and-set saat menyimpan
+    seen_versions = st.session_state.get("stock_versions", {})
+    st.session_state.stock_versions = dict(zip(stock_data["Item"], stock_data[ROW_VERSION]))
+    st.subheader("\nManajemen Stok")
+    st.write("Data Stok untuk Admin:")
+    paginated_table("admin_stock", table_source("stock"), STOCK_COLUMNS, search=["Item"])  # Menampilkan tabel data stok
+    items = stock_data["Item"].tolist()
+
+    # Admin: Tambah Stok Barang
+    with st.expander("Tambah Stok Barang"):
+        product_name = st.text_input("Nama Produk")
+        stock_quantity = st.number_input("Jumlah Stok", min_value=0)
+        price = st.number_input("Harga", min_value=0)
+        if st.button("Tambah Produk"):
+            if product_name and stock_quantity > 0 and price > 0:
+                response = admin.add_stock(item=product_name, quantity=stock_quantity, price=price)  # Memanggil add_stock langsung
+                st.success(response)
+                rerun_fragment()
+
+            else:
+                st.warning("Semua data harus diisi dengan benar!")
+
+    # Admin: Edit Stok Barang
+    with st.expander("Edit Stok Barang"):
+        product_name_to_edit = st.selectbox("Pilih Produk yang akan diubah", items)
+        updated_quantity = st.number_input("Jumlah Stok Baru", min_value=0)
+        updated_price = st.number_input("Harga Baru", min_value=0)
+        if st.button("Update Produk"):
+            try:
+                response = admin.edit_stock(
+                    product_name_to_edit, updated_quantity, updated_price,
+                    expected_version=seen_versions.get(product_name_to_edit),
+                )
+            except ConflictError as e:
+                st.error(str(e))
+            else:
+                if response == "Produk berhasil diperbarui":
+                    st.success(response)
+                    rerun_fragment()
+                else:
+                    # Produk sudah tidak ada (misalnya dihapus sesi lain)
+                    st.error(response)
+
+    # Admin: Edit massal lewat tabel atau file; diff dipratinjau lalu diterapkan sekali tulis
+    with st.expander("Edit Massal Stok"):
+        bulk_stock_editor(stock_data)
+
+    # Admin: Hapus Stok Barang
+    with st.expander("Hapus Stok Barang"):
+        product_name_to_delete = st.selectbox("Pilih Produk yang akan dihapus", items)
+        if st.button("Hapus Produk"):
+            try:
+                response = admin.delete_stock(
+                    product_name_to_delete, expected_version=seen_versions.get(product_name_to_delete)
+                )
+            except ConflictError as e:
+                st.error(str(e))
+            else:
+                if response == "Produk berhasil dihapus":
+                    st.success(response)
+                    rerun_fragment()
+                else:
+                    # Produk sudah tidak ada (misalnya dihapus sesi lain)
+                    st.error(response)
+
+
+def bulk_stock_editor(stock_data):
+    editor_tab, upload_tab = st.tabs(["Edit di Tabel", "Unggah File"])
+    with editor_tab:
+        # Key baru setelah diterapkan agar editan lama tidak diterapkan ulang di atas data baru
+        grid_key = f"stock_grid_{st.session_state.get('stock_grid_version', 0)}"
+        edited = st.data_editor(
+            stock_data[["Item", *STOCK_FIELDS]].astype({"Item": str}), num_rows="dynamic", hide_index=True, key=grid_key,
+        )
+        if st.button("Pratinjau Perubahan Tabel"):
+            st.session_state.stock_diff = diff_stock(stock_data, edited, delete_missing=True)
+    with upload_tab:
+        sheet_file = st.file_uploader("Unggah file stok (kolom Item, Quantity, Price)", type="csv")
+        delete_missing = st.checkbox("Hapus produk yang tidak ada di file")
+        if sheet_file is not None and st.button("Pratinjau Perubahan File"):
+            try:
+                st.session_state.stock_diff = diff_stock(stock_data, read_stock_sheet(sheet_file), delete_missing)
+            except ValueError as e:
+                st.error(str(e))
+
+    diff = st.session_state.get("stock_diff")
+    if diff is None:
+        return
+    summary = diff.summary()
+    st.write(f"Pratinjau: {summary['tambah']} ditambah, {summary['ubah']} diubah, {summary['hapus']} dihapus.")
+    if not diff.errors.empty:
+        st.error(f"{len(diff.errors)} baris gagal validasi, perbaiki lalu pratinjau ulang:")
+        st.dataframe(diff.errors, hide_index=True)
+    elif diff.empty:
+        st.info("Tidak ada perubahan stok.")
+    else:
+        st.dataframe(diff.preview(), hide_index=True)
+        if st.button("Terapkan Perubahan"):
+            try:
+                response = apply_stock_diff(diff)
+            except ConflictError as e:
+                st.error(str(e))
+            else:
+                del st.session_state["stock_diff"]
+                st.session_state.stock_grid_version = st.session_state.get("stock_grid_version", 0) + 1
+                st.success(response)
+                rerun_fragment()
+
+
+@fragment("background_jobs")
+def background_jobs(user):
+    owner = user["email"]
+    st.write("Ekspor Laporan (per potongan, dengan filter):")
+    controls = st.columns(3)
+    table = controls[0].selectbox("Tabel", list(EXPORT_TABLES), format_func=EXPORT_TABLES.get, key="export_table")
+    fmt = controls[1].selectbox("Format", EXPORT_FORMATS, key="export_format")
+    email = controls[2].text_input("Email reseller", key="export_email").strip()
+    filters = {"email": email}
+    controls = st.columns(3)
+    if "product_name" in TABLE_COLUMNS[table]:
+        filters["product_name"] = controls[0].text_input("Nama produk", key="export_product").strip()
+    if "status" in TABLE_COLUMNS[table]:
+        status = controls[1].selectbox("Status", [ALL, *ORDER_STATUSES], key="export_status")
+        filters["status"] = "" if status == ALL else status
+    if table in DATE_COLUMNS:
+        dates = controls[2].date_input("Rentang tanggal", value=(), key="export_dates")
+        if dates:
+            filters["start"] = dates[0].isoformat()
+            filters["end"] = dates[-1].isoformat()
+    filters = {column: value for column, value in filters.items() if value}
+    if st.button("Ekspor"):
+        if table == "orders":
+            AdminStockManagement().export_transactions(owner, fmt, **filters)
+        else:
+            get_job_runner().submit("export_table", owner=owner, table=table, fmt=fmt, **filters)
+        # Rerun seluruh halaman agar daftar tugas mulai diperbarui berkala
+        st.rerun()
+
+    st.write("Pemeliharaan:")
+    left, right = st.columns(2)
+    if left.button("Bangun Ulang Proyeksi"):
+        get_job_runner().submit("rebuild_projections", owner=owner)
+        st.rerun()
+    if right.button("Hitung Ulang Agregat"):
+        get_job_runner().submit("rebuild_aggregates", owner=owner)
+        st.rerun()
+
+
+@fragment("reports")
+def reports():
+    metrics = get_metrics()
+    # Admin melihat pengeluaran produk reseller
+    total_expenditure = AdminStockManagement().get_total_expenditure()
+    st.write(f"Jumlah Pengeluaran Produk oleh Reseller: {total_expenditure}")
+    with st.expander("Ringkasan Penjualan"):
+        aggregates = get_aggregates()
+        for label, name in [("Per Reseller", "per_reseller"), ("Per Produk", "per_product"), ("Per Status", "per_status")]:
+            st.write(label)
+            st.dataframe(aggregates.summary(name))
+
+    with st.expander("Statistik Cache Data"):
+        st.dataframe(pd.DataFrame.from_dict(get_data_cache().stats(), orient="index"))
+        # Membaca ulang semua CSV dengan inferensi default, jadi hanya dihitung saat diminta
+        if st.button("Hitung Pemakaian Memori"):
+            st.dataframe(memory_report(get_storage()), hide_index=True)
+
+    with st.expander("Performa Aplikasi"):
+        st.write("Operasi data per jenis:")
+        st.dataframe(pd.DataFrame(metrics.summary()), hide_index=True)
+        st.write("Operasi data per peran:")
+        st.dataframe(pd.DataFrame(metrics.summary(by_role=True)), hide_index=True)
+        st.write("Rerun terakhir (halaman penuh atau satu fragmen):")
+        st.dataframe(pd.DataFrame(metrics.rerun_summaries()), hide_index=True)
+        st.download_button("Ekspor Metrik (JSON Lines)", metrics.export_jsonl(), "metrics.jsonl", "application/jsonl")
+
+
+@fragment("dashboard")
+def sales_dashboard():
+    controls = st.columns(4)
+    fact = controls[0].selectbox("Data", ROLLUP_FACTS, format_func=FACT_LABELS.get, key="dashboard_fact")
+    grain = controls[1].selectbox("Periode", ROLLUP_GRAINS, format_func=GRAIN_LABELS.get, key="dashboard_grain")
+    product_name = controls[2].text_input("Produk", key="dashboard_product").strip() or None
+    email = controls[3].text_input("Email reseller", key="dashboard_email").strip() or None
+    today = pd.Timestamp.now().normalize()
+    dates = st.date_input(
+        "Rentang tanggal", value=((today - DASHBOARD_SPANS[grain]).date(), today.date()), key=f"dashboard_dates_{grain}"
+    )
+    if len(dates) < 2:
+        st.info("Pilih tanggal awal dan akhir.")
+        return
+
+    # Satu sel kubus per bucket, jadi waktu baca tidak bergantung pada panjang riwayat
+    by = "email" if product_name else "product_name"
+    with get_projections().current() as projections:
+        series = projections.rollups.series(fact, grain, dates[0], dates[1], product_name, email)
+        top = projections.rollups.breakdown(fact, grain, dates[0], dates[1], by, product_name, email).head(10)
+    totals = series.sum()
+    left, middle, right = st.columns(3)
+    left.metric("Transaksi", f"{int(totals['count']):,}")
+    middle.metric("Jumlah Barang", f"{int(totals['quantity']):,}")
+    right.metric("Nilai (Rp)", f"{totals['amount']:,.0f}")
+    st.bar_chart(series["amount"], x_label=GRAIN_LABELS[grain], y_label="Nilai (Rp)")
+    st.write("Reseller teratas:" if product_name else "Produk teratas:")
+    st.dataframe(top, column_config={"count": "Transaksi", "quantity": "Jumlah", "amount": "Nilai (Rp)"})
+
+
+@fragment("transactions")
+def transactions():
+    # Admin melihat daftar transaksi reseller; filter dan urutan dijalankan di server
+    st.write("Daftar Transaksi Reseller:")
+    paginated_table(
+        "transactions", table_source("orders"), TRANSACTION_COLUMNS,
+        search=["email", "product_name"], choices={"status": ORDER_STATUSES},
+        empty_message="Belum ada transaksi yang tercatat.",
+    )
+
+
+@fragment("order_history")
+def order_history():
+    history_id = st.number_input("ID Pesanan", min_value=1, step=1, key="history_order_id")
+    if st.button("Tampilkan Riwayat"):
+        history = get_event_log().history(history_id)
+        if history:
+            st.dataframe(
+                pd.DataFrame([{"seq": e["seq"], "event": e["type"], "waktu": e["timestamp"]} for e in history]),
+                hide_index=True,
+            )
+        else:
+            st.info(f"Tidak ada event untuk pesanan {history_id}.")
@@ -0,0 +1,91 @@
+import streamlit as st
+from handlers import (
+    EmailValidationHandler,
+    PasswordValidationHandler,
+    ConfirmPasswordHandler,
+    EmailExistsHandler,
+    SaveUserHandler,
+    VerificationStatusHandler,
+)
+from user_directory import get_user_directory
+
+
+def render():
+    # Halaman registrasi dan login untuk pengguna yang belum masuk
+    role = st.sidebar.radio("Pilih Peran", ["Reseller", "Admin", "Jasa Pengiriman"])
+    action = st.sidebar.radio("Pilih Aksi", ["Registrasi", "Login"])
+
+    if action == "Registrasi":
+        registration(role)
+    elif action == "Login":
+        login(role)
+
+
+def registration(role):
+    st.subheader(f"Formulir Registrasi {role}")
+    st.info("Setelah registrasi, akun Anda harus diverifikasi oleh admin sebelum bisa login.")
+    with st.form(f"form_register_{role.lower()}"):
+        email = st.text_input("Email")
+        password = st.text_input("Password", type="password")
+        confirm_password = st.text_input("Konfirmasi Password", type="password")
+        name = st.text_input("Nama Lengkap")
+        address = st.text_area("Alamat")
+        contact = st.text_input("Nomor Kontak")
+        submitted = st.form_submit_button("Registrasi")
+
+        if submitted:
+            # Chain of Responsibility
+            handler = (
+                EmailValidationHandler()
+                .set_next(PasswordValidationHandler())
+                .set_next(ConfirmPasswordHandler())
+                .set_next(EmailExistsHandler())
+                .set_next(SaveUserHandler())
+            )
+
+            # Buat request data
+            request_data = {
+                "email": email.strip(),
+                "password": password.strip(),
+                "confirm_password": confirm_password.strip(),
+                "name": name.strip(),
+                "address": address.strip(),
+                "contact": contact.strip(),
+                "role": role.lower(),
+                "status": "unverified" if role == "Reseller" else "verified"
+            }
+
+            # Eksekusi handler
+            result = handler.handle(request_data)
+            if result == "Registrasi berhasil.":
+                st.success(result)
+            else:
+                st.error(result)
+
+
+def login(role):
+    st.subheader(f"Login {role}")
+    email = st.text_input("Email")
+    password = st.text_input("Password", type="password")
+    if st.button("Login"):
+        try:
+            user = get_user_directory().get(email)
+
+            if user is None or user["password"] != password or user["role"] != role.lower():
+                st.error("Email atau password salah.")
+            else:
+                # Handler untuk memeriksa status verifikasi
+                handler = VerificationStatusHandler()
+                result = handler.handle({"email": email})
+
+                if result:
+                    st.error(result)
+                else:
+                    # Login berhasil jika semua validasi lolos
+                    st.session_state.logged_in = True
+                    st.session_state.user_data = user
+                    st.success(f"Selamat datang, {user['name']}!")
+                    st.rerun()
+
+        except FileNotFoundError:
+            st.error("Database pengguna tidak ditemukan.")
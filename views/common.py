@@ -0,0 +1,186 @@
+import functools
+import threading
+import pandas as pd
+import streamlit as st
+from instrumentation import get_metrics
+from order_queue import get_order_queue
+from data_cache import get_data_cache
+from manifests import LINE_COLUMNS, SHIPMENT_COLUMNS, build_manifests, manifest_csv
+from paginated_table import frame_source, paginated_table
+from jobs import FINISHED, STATUS_LABELS, get_job_runner
+from stock_management import get_reservations
+
+STOCK_COLUMNS = ["Item", "Quantity", "Price"]
+# Jeda (detik) pembaruan daftar tugas latar belakang selama ada tugas yang berjalan
+JOB_POLL_SECONDS = 2
+JOB_LIST_SIZE = 10
+
+# True selama fragmen berjalan sendiri (bukan bagian dari rerun seluruh halaman)
+_local = threading.local()
+
+
+def fragment(name, run_every=None):
+    """st.fragment yang mencatat metrik rerun-nya sendiri.
+
+    Widget di dalam fragmen hanya menjalankan ulang fungsi ini beserta data yang
+    dibacanya. Saat fragmen ikut dijalankan bersama seluruh halaman, operasinya masuk
+    ke rerun halaman tersebut.
+    """
+    def decorator(func):
+        @st.fragment(run_every=run_every)
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = get_metrics()
+            if metrics.current_rerun() is not None:
+                return func(*args, **kwargs)
+            user = st.session_state.get("user_data")
+            metrics.start_rerun(user["role"] if user is not None else "anonymous", fragment=name)
+            _local.fragment_run = True
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _local.fragment_run = False
+                metrics.end_rerun()
+        return wrapper
+    return decorator
+
+
+def rerun_fragment():
+    # Muat ulang fragmen yang sedang berjalan saja (atau seluruh halaman jika fragmen
+    # sedang dijalankan sebagai bagian rerun halaman)
+    st.rerun(scope="fragment" if getattr(_local, "fragment_run", False) else "app")
+
+
+def profile_sidebar(user):
+    with st.sidebar:
+        st.write(f"**PROFIL PENGGUNA**")
+        st.write(f"**Nama:** {user['name']}")
+        st.write(f"**Email:** {user['email']}")
+        st.write(f"**Alamat:** {user['address']}")
+        st.write(f"**Nomor Kontak:** {user['contact']}")
+        if st.button("Logout"):
+            # Lepaskan reservasi stok dari keranjang yang ditinggalkan
+            get_reservations().release_owner(user["email"])
+            st.session_state.logged_in = False
+            st.session_state.clear()
+            st.rerun()
+
+
+@fragment("order_queue")
+def order_queue_view(status, next_status, button_label, success_label, empty_label):
+    # Antrian pesanan dikelompokkan per reseller dan alamat tujuan (manifest pengiriman);
+    # pesanan terpilih dipindahkan ke status berikutnya dalam satu penulisan
+    queue = get_order_queue()
+    orders = pd.DataFrame(queue.orders(status))
+    if orders.empty:
+        st.info(empty_label)
+        return
+    shipments, lines = build_manifests(orders, get_data_cache().load_table("users"))
+    st.write(f"{len(orders)} pesanan dalam {len(shipments)} pengiriman:")
+    paginated_table(f"shipments_{status}", frame_source(shipments), SHIPMENT_COLUMNS, search=["name", "address"])
+    with st.expander("Rincian Pesanan"):
+        paginated_table(f"lines_{status}", frame_source(lines), LINE_COLUMNS, search=["name", "address", "product_name"])
+
+    labels = dict(zip(
+        shipments["shipment_id"],
+        shipments["name"] + " - " + shipments["address"] + " (" + shipments["orders"].astype(str) + " pesanan)",
+    ))
+    # Key pilihan diganti setelah diproses agar pesanan yang sudah pindah tidak tetap terpilih
+    batch = st.session_state.get(f"batch_{status}", 0)
+    selected_shipments = st.multiselect(
+        "Pilih pengiriman (semua pesanan reseller ke alamat tersebut)", shipments["shipment_id"],
+        format_func=labels.get, key=f"shipments_{status}_{batch}",
+    )
+    selected_orders = st.multiselect("Pilih ID pesanan", orders["order_id"], key=f"orders_{status}_{batch}")
+    order_ids = [*lines.loc[lines["shipment_id"].isin(selected_shipments), "order_id"], *selected_orders]
+
+    left, right = st.columns(2)
+    if left.button(f"{button_label} Terpilih", disabled=not order_ids, key=f"advance_{status}"):
+        _advance(queue, order_ids, status, next_status, success_label)
+    if right.button(f"{button_label} Semua ({len(orders)})", key=f"advance_all_{status}"):
+        _advance(queue, orders["order_id"].tolist(), status, next_status, success_label)
+
+    # Manifest per pengiriman untuk dibawa kurir; arsip semua manifest dibuat di latar belakang
+    shipment_id = st.selectbox("Manifest pengiriman", shipments["shipment_id"], format_func=labels.get,
+                               key=f"manifest_{status}")
+    left, right = st.columns(2)
+    left.download_button("Unduh Manifest", manifest_csv(lines, shipment_id),
+                         f"manifest_{status}_{shipment_id:04d}.csv", "text/csv", key=f"download_{status}")
+    if right.button("Buat Arsip Semua Manifest", key=f"archive_{status}"):
+        get_job_runner().submit("manifests", owner=st.session_state.user_data["email"], status=status)
+        # Rerun seluruh halaman agar daftar tugas mulai diperbarui berkala
+        st.rerun()
+
+
+def _advance(queue, order_ids, status, next_status, success_label):
+    moved = queue.transition_many(order_ids, next_status)
+    if moved:
+        st.session_state[f"batch_{status}"] = st.session_state.get(f"batch_{status}", 0) + 1
+        st.success(f"{len(moved)} pesanan berhasil {success_label}.")
+        rerun_fragment()
+    else:
+        st.error("Status pesanan yang dipilih sudah berubah. Muat ulang halaman.")
+
+
+def job_panel(owner=None):
+    # Daftar tugas latar belakang; diperbarui berkala hanya selama ada tugas yang belum selesai
+    if get_job_runner().active(owner):
+        _live_job_list(owner)
+    else:
+        _job_list(owner)
+
+
+@fragment("jobs")
+def _job_list(owner):
+    _render_jobs(owner)
+
+
+@fragment("jobs", run_every=JOB_POLL_SECONDS)
+def _live_job_list(owner):
+    if not get_job_runner().active(owner):
+        # Semua tugas selesai: kembali ke daftar statis
+        st.rerun()
+    _render_jobs(owner)
+
+
+def _render_jobs(owner):
+    runner = get_job_runner()
+    jobs = runner.jobs(owner)[:JOB_LIST_SIZE]
+    if not jobs:
+        st.caption("Belum ada tugas latar belakang.")
+        return
+    for job in jobs:
+        info, progress, action = st.columns([3, 3, 2])
+        info.write(f"**{job['label']}** ({STATUS_LABELS[job['status']]})")
+        if job["status"] == "failed":
+            progress.error(job["error"])
+        elif job["status"] in ("queued", "running"):
+            progress.progress(job["progress"], text=job["message"] or None)
+        else:
+            progress.caption(job["message"])
+        if job["status"] not in FINISHED:
+            if action.button("Batalkan", key=f"cancel_{job['id']}"):
+                runner.cancel(job["id"])
+                rerun_fragment()
+        elif job["status"] == "done" and job["artifact"]:
+            _artifact_download(action, runner, job)
+
+
+def _artifact_download(container, runner, job):
+    # File hasil baru dibaca setelah pengguna meminta unduhan, bukan di setiap rerun/poll
+    prepared = st.session_state.setdefault("job_downloads", set())
+    if job["id"] not in prepared:
+        if not container.button("Siapkan unduhan", key=f"job_prepare_{job['id']}"):
+            return
+        prepared.add(job["id"])
+    try:
+        with open(runner.artifact_path(job["id"]), "rb") as f:
+            data = f.read()
+    except (FileNotFoundError, TypeError):
+        prepared.discard(job["id"])
+        container.caption("File hasil tidak ditemukan.")
+        return
+    container.download_button(
+        "Unduh", data, job["artifact"], key=f"job_download_{job['id']}",
+        on_click=prepared.discard, args=(job["id"],),
+    )
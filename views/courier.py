@@ -0,0 +1,13 @@
+import streamlit as st
+from views.common import job_panel, order_queue_view, profile_sidebar
+
+
+def render(user):
+    profile_sidebar(user)
+    st.subheader("Data Pengiriman Barang Harmon Corp")
+    order_queue_view(
+        "packed", "delivered", "Kirim", "dikirim",
+        "Tidak ada barang yang perlu dikirim",
+    )
+    st.subheader("Arsip Manifest")
+    job_panel(user["email"])
@@ -0,0 +1,165 @@
+import pandas as pd
+import streamlit as st
+from stock_management import ResellerStockManagement, RESERVATION_TTL
+from payment_strategy import CreditCardPayment, DigitalWalletPayment
+from sales_ledger import get_sales_ledger
+from data_cache import get_data_cache
+from payment_engine import get_payment_engine
+from paginated_table import frame_source, paginated_table, table_source
+from views.common import STOCK_COLUMNS, fragment, profile_sidebar, rerun_fragment
+
+
+def render(user):
+    profile_sidebar(user)
+    # Inisialisasi session state untuk reseller
+    if "cart" not in st.session_state:
+        st.session_state.cart = []
+    if "selected_payment_method" not in st.session_state:
+        st.session_state.selected_payment_method = None
+
+    sales_report(user)
+
+    # Reseller: Memilih produk untuk dibeli
+    st.subheader("Pilih Produk untuk Dipesan")
+    catalog()
+    cart(user)
+
+
+@fragment("sales_report")
+def sales_report(user):
+    st.subheader("Produk Anda")
+    # Inventaris reseller = barang terkirim dikurangi penjualan yang sudah dilaporkan
+    ledger = get_sales_ledger()
+    user_products = ledger.inventory(user["email"])
+    user_products = user_products[user_products["quantity"] > 0]
+
+    paginated_table(
+        "reseller_products", frame_source(user_products), ["product_name", "quantity", "price"],
+        search=["product_name"], empty_message="Belum ada produk yang terdaftar.",
+    )
+
+    st.subheader("Pelaporan Harian Penjualan")
+    selected_product = st.selectbox("Pilih Produk", user_products['product_name'].unique())
+
+    # Menampilkan detail produk
+    product_details = user_products[user_products['product_name'] == selected_product]
+    if not product_details.empty:
+        max_quantity = int(product_details['quantity'].values[0])
+        quantity = st.number_input("Jumlah Produk Terjual", min_value=1, max_value=max_quantity, step=1)
+    else:
+        st.error("Produk tidak ditemukan.")
+
+    # Tambahkan ke tabel penjualan
+    if st.button("Masukkan ke Tabel Penjualan") and not product_details.empty:
+        price = product_details['price'].values[0]
+        total_harga = quantity * price
+
+        # Gunakan session_state.sales untuk penjualan
+        if "sales" not in st.session_state:
+            st.session_state.sales = []
+
+        st.session_state.sales.append({"product_name": selected_product, "quantity": quantity, "total_penghasilan": total_harga})
+        st.success(f"{selected_product} berhasil ditambahkan ke Tabel Penjualan.")
+
+    # Tampilkan tabel penjualan
+    st.subheader("Tabel Penjualan")
+    if "sales" in st.session_state and st.session_state.sales:
+        st.table(st.session_state.sales)
+
+    # Submit laporan penjualan
+    if st.button("Submit Laporan"):
+        if "sales" in st.session_state and st.session_state.sales:
+            # Laporan ditambahkan ke buku besar penjualan milik reseller ini saja
+            success, message = ledger.record_sales(user["email"], st.session_state.sales)
+            if success:
+                st.success(message)
+
+                # Reset tabel penjualan setelah submit
+                st.session_state.sales = []
+                rerun_fragment()
+            else:
+                st.error(message)
+        else:
+            st.warning("Tabel Penjualan kosong. Tambahkan produk terlebih dahulu.")
+
+
+@fragment("catalog")
+def catalog():
+    # Menampilkan data stok untuk reseller, per halaman
+    paginated_table("reseller_stock", table_source("stock"), STOCK_COLUMNS, search=["Item"])
+
+
+@fragment("cart")
+def cart(user):
+    reseller = ResellerStockManagement()
+    # Dibaca dari cache bersama tanpa disalin (hanya dibaca)
+    data = get_data_cache().load_table("stock")
+    selected_product = st.selectbox("Pilih Produk", data['Item'].tolist())
+
+    # Menampilkan detail produk
+    product_details = data[data['Item'] == selected_product]
+
+    # Menentukan jumlah yang ingin dibeli (stok dikurangi reservasi reseller lain)
+    available = reseller.available_quantity(selected_product) or 0
+    if available < 1:
+        st.warning(f"Stok {selected_product} sedang habis atau sedang direservasi reseller lain.")
+    else:
+        quantity = st.number_input("Jumlah Produk", min_value=1, max_value=available, step=1)
+        if st.button("Masukkan ke Keranjang"):
+            # Stok direservasi selama barang ada di keranjang
+            hold_id = reseller.reserve(user["email"], selected_product, quantity)
+            if hold_id is None:
+                st.error(f"Stok {selected_product} tidak lagi mencukupi.")
+            else:
+                price = product_details['Price'].values[0]
+                total_harga = quantity * price
+                st.session_state.cart.append({"product_name": selected_product,"price":price, "quantity": quantity, "total_harga": total_harga, "hold_id": hold_id})
+                # Keranjang berubah: pembayaran berikutnya memakai idempotency key baru
+                st.session_state.pop("payment_key", None)
+                st.success(f"{selected_product} berhasil ditambahkan ke keranjang.")
+
+    # Menampilkan keranjang belanja
+    st.write("Keranjang Anda:")
+    cart_df = pd.DataFrame(st.session_state.cart)
+    st.dataframe(cart_df.drop(columns="hold_id", errors="ignore"))
+    if st.session_state.cart:
+        st.caption(f"Stok di keranjang direservasi selama {RESERVATION_TTL // 60} menit.")
+
+    st.subheader("Metode Pembayaran")
+    payment_method = st.radio("Pilih Metode Pembayaran:", ["Kartu Kredit", "Dompet Digital"])
+    if payment_method == "Kartu Kredit":
+        st.session_state.selected_payment_method = CreditCardPayment()
+    elif payment_method == "Dompet Digital":
+        st.session_state.selected_payment_method = DigitalWalletPayment()
+
+    # Reseller: Melakukan pembayaran
+    if st.button("Lakukan Pembayaran"):
+        if st.session_state.selected_payment_method:
+            # Key terikat ke total keranjang: klik ulang untuk keranjang yang sama memakai key
+            # yang sama (tidak ditagih dua kali), total yang berubah selalu mendapat key baru
+            total_amount = sum(item["total_harga"] for item in st.session_state.cart)
+            payment_key, keyed_amount = st.session_state.get("payment_key", (None, None))
+            if payment_key is None or keyed_amount != total_amount:
+                payment_key = get_payment_engine().new_idempotency_key()
+                st.session_state.payment_key = (payment_key, total_amount)
+            # Otorisasi pembayaran dulu, stok dan pesanan di-commit setelah disetujui
+            with st.spinner("Menunggu otorisasi pembayaran..."):
+                result = reseller.pay_and_checkout(
+                    user["email"], st.session_state.cart,
+                    st.session_state.selected_payment_method, payment_key,
+                )
+            if result.success:
+                # Kosongkan keranjang setelah pembayaran
+                st.session_state.cart = []
+                st.session_state.pop("payment_key", None)
+                st.success(f"Pembayaran sebesar {result.total_amount} berhasil dilakukan dan transaksi telah dicatat.")
+            else:
+                st.error(result.message)
+                for failure in result.failures:
+                    st.error(failure["reason"])
+                # Key hanya dipertahankan jika gateway tidak merespons (status charge belum pasti);
+                # retry dengan total yang sama memakai key itu lagi
+                if result.payment is None or result.payment.status != "failed":
+                    st.session_state.pop("payment_key", None)
+        else:
+            st.warning("Pilih metode pembayaran terlebih dahulu.")
@@ -0,0 +1,154 @@
+import atexit
+import os
+import threading
+import time
+import pandas as pd
+from instrumentation import get_metrics
+
+# Tingkat durabilitas penulisan CSV (bisa diganti lewat environment variable):
+# - "sync": setiap mutasi langsung ditulis ke file oleh thread pemanggil
+# - "group": mutasi diantrikan ke penulis latar belakang; pemanggil menunggu sampai
+#   flush yang memuat mutasinya selesai (beberapa sesi berbagi satu penulisan)
+# - "async": pemanggil langsung kembali; data ditulis paling lambat satu interval kemudian
+DURABILITY_LEVELS = ("sync", "group", "async")
+DURABILITY = os.environ.get("HARMON_DURABILITY", "group")
+FLUSH_INTERVAL = float(os.environ.get("HARMON_FLUSH_INTERVAL", "0.5"))
+
+
+class WriteBehindWriter:
+    """Satu thread penulis latar belakang untuk mutasi tabel CSV dari semua sesi.
+
+    Mutasi diantrikan per tabel: frame lengkap terbaru menggantikan yang lama dan
+    baris tambahan dikumpulkan, lalu setiap flush menulis satu kali per tabel
+    (file sementara + rename, atau append di akhir file).
+    """
+    def __init__(self, write_table, append_rows, durability=DURABILITY, interval=FLUSH_INTERVAL):
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"Tingkat durabilitas tidak dikenal: {durability}")
+        self._write_table = write_table
+        self._append_rows = append_rows
+        self.durability = durability
+        self.interval = interval
+        # Dipegang selama file ditulis; pembaca yang menggabungkan antrian dengan isi file juga memegangnya
+        self.io_lock = threading.RLock()
+        self._cond = threading.Condition()
+        self._pending = {}  # tabel -> {"frame": DataFrame atau None, "appends": [DataFrame]}
+        self._inflight = {}
+        self.sequence = 0
+        self._flushed = 0
+        self._requested = 0
+        self._error = None
+        self._closed = False
+        self._thread = None
+
+    def submit(self, frames=None, appends=None):
+        # Antrikan frame pengganti dan/atau baris tambahan per tabel dalam satu langkah,
+        # sehingga satu commit transaksi selalu ditulis dalam flush yang sama
+        with self._cond:
+            for table, df in (frames or {}).items():
+                self._pending[table] = {"frame": df, "appends": []}
+            for table, df in (appends or {}).items():
+                self._pending.setdefault(table, {"frame": None, "appends": []})["appends"].append(df)
+            self.sequence += 1
+            sequence = self.sequence
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+            closed = self._closed
+        if closed:
+            # Penulis sudah dihentikan (proses sedang berhenti): tulis langsung
+            self.flush()
+        return sequence
+
+    def overlay(self, table):
+        # (frame pengganti atau None, baris tambahan) yang belum ada di file; panggil dengan io_lock
+        with self._cond:
+            frame, appends = None, []
+            for entry in (self._inflight.get(table), self._pending.get(table)):
+                if entry is None:
+                    continue
+                if entry["frame"] is not None:
+                    frame, appends = entry["frame"], []
+                appends = appends + entry["appends"]
+            return frame, appends
+
+    def wait(self, ticket):
+        # Tunggu sampai semua mutasi hingga nomor ticket sudah ditulis ke file
+        with self._cond:
+            self._requested = max(self._requested, ticket)
+            self._cond.notify_all()
+            while self._flushed < ticket:
+                if self._error is not None:
+                    raise self._error
+                self._cond.wait()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._closed or (self._pending and self._requested > self._flushed),
+                    timeout=self.interval,
+                )
+                if self._closed:
+                    return
+            self.flush()
+            if self._error is not None:
+                # Penulisan gagal (misalnya disk penuh): coba lagi setelah satu interval
+                time.sleep(self.interval)
+
+    def flush(self):
+        # Tulis semua mutasi yang antre: satu penulisan per tabel
+        with self.io_lock:
+            with self._cond:
+                if not self._pending:
+                    # Tidak ada yang antre: semua nomor yang sudah dibagikan dianggap tertulis
+                    self._flushed = self.sequence
+                    self._cond.notify_all()
+                    return
+                batch, self._pending = self._pending, {}
+                self._inflight = batch
+                sequence = self.sequence
+            written = set()
+            error = None
+            rows = 0
+            start = time.perf_counter()
+            try:
+                for table, entry in batch.items():
+                    if entry["frame"] is not None:
+                        df = pd.concat([entry["frame"], *entry["appends"]], ignore_index=True)
+                        self._write_table(table, df)
+                    else:
+                        df = pd.concat(entry["appends"], ignore_index=True)
+                        self._append_rows(table, df)
+                    rows += len(df)
+                    written.add(table)
+            except Exception as e:
+                error = e
+            with self._cond:
+                if error is not None:
+                    # Tabel yang belum tertulis dikembalikan ke antrian (di depan mutasi yang lebih baru)
+                    for table, entry in batch.items():
+                        newer = self._pending.get(table)
+                        if table in written:
+                            continue
+                        if newer is None:
+                            self._pending[table] = entry
+                        elif newer["frame"] is None:
+                            newer["frame"] = entry["frame"]
+                            newer["appends"] = entry["appends"] + newer["appends"]
+                else:
+                    self._flushed = sequence
+                self._inflight = {}
+                self._error = error
+                self._cond.notify_all()
+        get_metrics().record("write_behind.flush", rows=rows, seconds=time.perf_counter() - start)
+
+    def close(self):
+        # Dipanggil saat proses berhenti: hentikan thread lalu tulis sisa antrian
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self.flush()